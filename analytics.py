@@ -0,0 +1,54 @@
+"""
+Когортная аналитика по истории приемов воды
+
+Загружает историю из хранилища (STORAGE_BACKEND) в колонки NumPy и
+печатает показатели по всем пользователям: долю достигших нормы по дням,
+распределение серий, приемы по часам и конверсию напоминаний.
+Нужен пакет numpy.
+
+Запуск:
+    python analytics.py --days 30
+    python analytics.py --db water_reminder.db --json > cohort.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+
+from config import settings
+from src.database import db_manager
+from src.stats.cohort import CohortAnalytics, format_report
+
+
+async def run_analytics(args):
+    """Загрузка истории и расчет показателей"""
+    if args.db:
+        db_manager.db_path = args.db
+    since = date.today() - timedelta(days=args.days - 1)
+
+    started = time.perf_counter()
+    analytics = await CohortAnalytics.load(db_manager, since)
+    loaded = time.perf_counter()
+    report = analytics.report()
+    finished = time.perf_counter()
+    await db_manager.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report, args.days).replace("*", ""))
+        print(f"\nЗагрузка {analytics.rows} строк: {loaded - started:.2f} с, расчет: {finished - loaded:.2f} с")
+
+
+def main():
+    """Запуск аналитики"""
+    parser = argparse.ArgumentParser(description="Когортная аналитика по истории приемов воды")
+    parser.add_argument("--days", type=int, default=settings.ANALYTICS_DAYS, help="период отчета в днях")
+    parser.add_argument("--db", help="путь к базе SQLite (по умолчанию DATABASE_PATH)")
+    parser.add_argument("--json", action="store_true", help="вывести все показатели в JSON")
+    asyncio.run(run_analytics(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
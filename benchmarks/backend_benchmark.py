@@ -0,0 +1,113 @@
+"""
+Сравнение накладных расходов бэкендов БД на один вызов
+
+executor - соединение на каждый запрос в пуле потоков (run_in_executor),
+thread - постоянное соединение в выделенном потоке с очередью запросов.
+Замеряются пустой запрос (чистые накладные расходы), get_user и
+get_daily_intake последовательно и пачкой конкурентных вызовов.
+
+Запуск:
+    python benchmarks/backend_benchmark.py --users 1000 --calls 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from src.database import DatabaseManager
+from src.database.backends import BACKENDS
+
+
+def _noop(conn):
+    return conn.execute("SELECT 1").fetchone()
+
+
+async def sequential(calls: int, func) -> list:
+    """Время каждого из последовательных вызовов"""
+    samples = []
+    for i in range(calls):
+        started = time.perf_counter()
+        await func(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def concurrent(calls: int, batch: int, func) -> float:
+    """Пропускная способность при batch одновременных вызовах (вызовов в секунду)"""
+    started = time.perf_counter()
+    for offset in range(0, calls, batch):
+        await asyncio.gather(*(func(offset + i) for i in range(batch)))
+    return calls / (time.perf_counter() - started)
+
+
+def report(name: str, samples: list):
+    """Строка отчета по последовательным вызовам"""
+    samples.sort()
+    mean = statistics.mean(samples) * 1e6
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1e6
+    print(f"  {name:<22} mean {mean:8.1f} мкс  p99 {p99:8.1f} мкс")
+
+
+async def run_backend(backend: str, db_path: str, users: int, calls: int, batch: int):
+    """Прогнать замеры на одном бэкенде"""
+    db = DatabaseManager(db_path, backend=backend)
+    print(f"{backend}:")
+
+    benchmarks = {
+        "SELECT 1": lambda i: db.run_sync(_noop),
+        "get_user": lambda i: db.get_user(i % users + 1),
+        "get_daily_intake": lambda i: db.get_daily_intake(i % users + 1),
+    }
+    try:
+        # Прогрев: пул потоков и соединение создаются лениво
+        await sequential(50, benchmarks["SELECT 1"])
+        for name, func in benchmarks.items():
+            report(name, await sequential(calls, func))
+        throughput = await concurrent(calls, batch, benchmarks["get_user"])
+        print(f"  {'get_user x' + str(batch):<22} {throughput:8.0f} вызовов/с")
+    finally:
+        await db.close()
+
+
+async def seed(db_path: str, users: int):
+    """Создать схему и пользователей с приемами воды"""
+    db = DatabaseManager(db_path)
+    await db.init_db()
+
+    def _seed(conn):
+        conn.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)",
+                         ((user_id, f"user{user_id}") for user_id in range(1, users + 1)))
+        conn.executemany("INSERT INTO water_intake (user_id, volume) VALUES (?, ?)",
+                         ((user_id, 250) for user_id in range(1, users + 1) for _ in range(5)))
+
+    await db.run_sync(_seed)
+    await db.close()
+
+
+async def main():
+    """Запуск бенчмарка"""
+    parser = argparse.ArgumentParser(description="Бенчмарк бэкендов БД")
+    parser.add_argument("--users", type=int, default=1000, help="количество пользователей")
+    parser.add_argument("--calls", type=int, default=2000, help="вызовов на каждый замер")
+    parser.add_argument("--batch", type=int, default=50, help="одновременных вызовов в замере пропускной способности")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="water_backend_"), "bench.db")
+    await seed(db_path, args.users)
+
+    for backend in BACKENDS:
+        await run_backend(backend, db_path, args.users, args.calls, args.batch)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
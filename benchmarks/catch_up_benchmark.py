@@ -0,0 +1,152 @@
+"""
+Бенчмарк догона напоминаний, пропущенных за время простоя
+
+Создает базу SQLite, где у каждого пользователя накопились напоминания за
+несколько часов простоя, и применяет политику догона двумя способами:
+построчно в Python (выборка, группировка, UPDATE на каждую строку) и
+множественными UPDATE из DatabaseManager.catch_up_reminders. Отчет: время
+каждого способа и «толпа» - сколько напоминаний ушло бы в одну секунду
+до и после догона.
+
+Запуск: python benchmarks/catch_up_benchmark.py --users 20000 --downtime-hours 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from config import settings
+from src.database import db_manager
+from src.scheduler.suppression import SUPPRESSIBLE_TYPES
+
+SEED = 42
+
+
+def seed(path: str, users: int, downtime: timedelta, now: datetime):
+    """Напоминания каждого пользователя по его расписанию за время простоя"""
+    rng = random.Random(SEED)
+    interval = timedelta(minutes=settings.REMINDER_INTERVAL_MINUTES)
+    rows = []
+    for user_id in range(1, users + 1):
+        scheduled = now - downtime + timedelta(seconds=rng.randrange(int(interval.total_seconds())))
+        reminder_type = 'morning'
+        while scheduled <= now:
+            rows.append((user_id, scheduled, reminder_type))
+            scheduled += interval
+            reminder_type = 'regular'
+        # Часть пользователей не ответила на напоминание - повторное
+        if rng.random() < 0.3:
+            rows.append((user_id, now - timedelta(minutes=rng.randrange(1, 30)), 'follow_up'))
+
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO reminders (user_id, scheduled_time, reminder_type) VALUES (?, ?, ?)", rows
+        )
+    return len(rows)
+
+
+def catch_up_per_row(path: str, now: datetime, stale_before: datetime, ramp_seconds: int) -> dict:
+    """Та же политика построчно: выборка в Python и UPDATE на каждую строку"""
+    with sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES) as conn:
+        rows = conn.execute(
+            "SELECT id, user_id, scheduled_time, reminder_type FROM reminders "
+            "WHERE status = 'pending' AND scheduled_time <= ?",
+            (now,)
+        ).fetchall()
+
+        expired, kept = [], {}
+        for reminder_id, user_id, scheduled, reminder_type in rows:
+            if scheduled < stale_before:
+                expired.append(reminder_id)
+                continue
+            key = (reminder_type in SUPPRESSIBLE_TYPES, -scheduled.timestamp(), -reminder_id)
+            kept.setdefault(user_id, []).append((key, reminder_id, scheduled))
+
+        merged, survivors = [], []
+        for candidates in kept.values():
+            candidates.sort()
+            survivors.append(candidates[0])
+            merged.extend(reminder_id for _, reminder_id, _ in candidates[1:])
+
+        survivors.sort(key=lambda item: (item[2], item[1]))
+        for reminder_id in expired:
+            conn.execute("UPDATE reminders SET status = 'expired' WHERE id = ?", (reminder_id,))
+        for reminder_id in merged:
+            conn.execute("UPDATE reminders SET status = 'suppressed' WHERE id = ?", (reminder_id,))
+        for position, (_, reminder_id, _) in enumerate(survivors):
+            scheduled = now + timedelta(seconds=position * ramp_seconds // len(survivors))
+            conn.execute("UPDATE reminders SET send_after = ? WHERE id = ?", (scheduled.replace(microsecond=0), reminder_id))
+    return {'expired': len(expired), 'merged': len(merged), 'spread': len(survivors)}
+
+
+def peak_per_second(path: str, now: datetime) -> int:
+    """Наибольшее число ожидающих напоминаний, наступающих в одну секунду (все наступившие - сразу)"""
+    with sqlite3.connect(path) as conn:
+        row = conn.execute(
+            "SELECT MAX(due) FROM ("
+            "  SELECT COUNT(*) AS due FROM reminders WHERE status = 'pending'"
+            "  GROUP BY CASE WHEN COALESCE(send_after, scheduled_time) <= ? THEN 0"
+            "  ELSE strftime('%s', COALESCE(send_after, scheduled_time)) END"
+            ")",
+            (now,)
+        ).fetchone()
+    return row[0] or 0
+
+
+async def main():
+    """Запуск бенчмарка"""
+    parser = argparse.ArgumentParser(description="Бенчмарк догона пропущенных напоминаний")
+    parser.add_argument("--users", type=int, default=20000, help="количество пользователей")
+    parser.add_argument("--downtime-hours", type=float, default=3.0, help="длительность простоя (часы)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="water_catch_up_")
+    try:
+        now = datetime.now().replace(microsecond=0)
+        stale_before = now - timedelta(minutes=settings.REMINDER_CATCH_UP_STALE_MINUTES)
+        ramp_seconds = settings.REMINDER_CATCH_UP_RAMP_MINUTES * 60
+
+        db_manager.db_path = os.path.join(workdir, "set_based.db")
+        await db_manager.init_db()
+        total = seed(db_manager.db_path, args.users, timedelta(hours=args.downtime_hours), now)
+        per_row_path = os.path.join(workdir, "per_row.db")
+        shutil.copy(db_manager.db_path, per_row_path)
+
+        print(f"Пользователей: {args.users}, простой: {args.downtime_hours} ч, пропущено напоминаний: {total}")
+        print(f"Без догона в первую секунду после запуска: {peak_per_second(db_manager.db_path, now)}\n")
+
+        started = time.perf_counter()
+        baseline = catch_up_per_row(per_row_path, now, stale_before, ramp_seconds)
+        per_row_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = await db_manager.catch_up_reminders(now, stale_before, ramp_seconds)
+        set_based_elapsed = time.perf_counter() - started
+        await db_manager.close()
+
+        assert result == baseline, (result, baseline)
+        print(f"Устарело: {result['expired']}, объединено: {result['merged']}, распределено: {result['spread']}")
+        print(f"Построчно в Python:     {per_row_elapsed * 1000:8.1f} мс")
+        print(f"Множественные UPDATE:   {set_based_elapsed * 1000:8.1f} мс "
+              f"({per_row_elapsed / set_based_elapsed:.1f}x)")
+        print(f"После догона - пик в секунду: {peak_per_second(db_manager.db_path, now)} "
+              f"(окно {settings.REMINDER_CATCH_UP_RAMP_MINUTES} мин)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
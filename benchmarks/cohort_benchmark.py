@@ -0,0 +1,72 @@
+"""
+Бенчмарк когортной аналитики на синтетической истории
+
+Строит колонки приемов воды и отправленных напоминаний в памяти (без БД)
+и замеряет каждый показатель CohortAnalytics. Время загрузки из SQLite
+показывает analytics.py.
+
+Запуск: python benchmarks/cohort_benchmark.py --rows 5000000 --users 200000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+import numpy as np
+
+from src.stats.cohort import CohortAnalytics, IntakeColumns, ReminderColumns
+
+SECONDS_PER_DAY = 86400
+
+
+def build(rows: int, users: int, days: int) -> CohortAnalytics:
+    """Синтетическая история: приемы по 250-500 мл, треть - по напоминаниям"""
+    rng = np.random.default_rng(42)
+    start = int(time.time()) // SECONDS_PER_DAY * SECONDS_PER_DAY - days * SECONDS_PER_DAY
+    reminders = rows // 2
+
+    reminder_ids = np.arange(1, reminders + 1, dtype=np.int64)
+    intake_reminders = np.where(rng.random(rows) < 0.3, rng.integers(1, reminders + 1, rows), 0)
+    intake = IntakeColumns(
+        user_ids=rng.integers(1, users + 1, rows),
+        volumes=rng.choice(np.array([250, 300, 500], dtype=np.int64), rows),
+        timestamps=start + rng.integers(0, days * SECONDS_PER_DAY, rows),
+        reminder_ids=intake_reminders
+    )
+    sent = ReminderColumns(
+        ids=reminder_ids,
+        user_ids=rng.integers(1, users + 1, reminders),
+        scheduled=start + rng.integers(0, days * SECONDS_PER_DAY, reminders)
+    )
+    goal_ids = np.arange(1, users + 1, dtype=np.int64)
+    goals = np.column_stack([goal_ids, rng.choice(np.array([1000, 1500, 2000]), users)])
+    return CohortAnalytics(intake, sent, goals)
+
+
+def main():
+    """Запуск бенчмарка"""
+    parser = argparse.ArgumentParser(description="Бенчмарк когортной аналитики")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="приемов воды")
+    parser.add_argument("--users", type=int, default=200_000, help="пользователей")
+    parser.add_argument("--days", type=int, default=30, help="дней истории")
+    args = parser.parse_args()
+
+    analytics = build(args.rows, args.users, args.days)
+    print(f"{args.rows} приемов, {args.users} пользователей, {args.days} дней")
+
+    for name in ("daily_totals", "goal_attainment_by_day", "streak_distribution",
+                 "intake_by_hour", "reminder_conversion"):
+        started = time.perf_counter()
+        getattr(analytics, name)()
+        print(f"  {name:<24} {(time.perf_counter() - started) * 1000:8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
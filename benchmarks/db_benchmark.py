@@ -0,0 +1,195 @@
+"""
+Микробенчмарк горячих путей DatabaseManager и StatsManager
+
+Создает базу SQLite с заданным числом пользователей и реалистичной историей
+приемов воды, замеряет get_daily_intake, get_weekly_stats, get_daily_stats,
+get_achievements, get_pending_reminders и log_motivation и сохраняет
+результаты в JSON, чтобы сравнивать их между коммитами.
+
+Запуск:
+    python benchmarks/db_benchmark.py --users 1000
+    python benchmarks/db_benchmark.py --users 100000 --output results.json
+    python benchmarks/db_benchmark.py --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from src.database import db_manager
+from src.stats import stats_manager
+
+DATA_DIR = Path(__file__).parent / "data"
+SEED = 42
+
+
+def seed_database(path: Path, users: int, days: int):
+    """Заполнить базу пользователями, историей приемов и напоминаниями на сегодня"""
+    if path.exists():
+        return
+
+    rng = random.Random(SEED)
+    asyncio.run(_init_schema(path))
+    today = date.today()
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        conn.executemany(
+            "INSERT INTO users (user_id, username, daily_goal) VALUES (?, ?, ?)",
+            ((user_id, f"user{user_id}", rng.choice((1500, 2000, 2500, 3000))) for user_id in range(1, users + 1))
+        )
+
+        def intakes():
+            for user_id in range(1, users + 1):
+                # Часть пользователей неактивна, остальные пьют 3-10 раз в день
+                activity = rng.random()
+                for day in range(days):
+                    if rng.random() > activity:
+                        continue
+                    day_start = datetime.combine(today - timedelta(days=day), datetime.min.time())
+                    for _ in range(rng.randint(3, 10)):
+                        timestamp = day_start + timedelta(minutes=rng.randint(8 * 60, 22 * 60))
+                        yield user_id, rng.choice((150, 200, 250, 250, 300, 500)), timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+        conn.executemany("INSERT INTO water_intake (user_id, volume, timestamp) VALUES (?, ?, ?)", intakes())
+
+        def reminders():
+            for user_id in range(1, users + 1):
+                for hour in range(8, 22, 2):
+                    yield user_id, datetime.combine(today, datetime.min.time()) + timedelta(hours=hour)
+
+        conn.executemany("INSERT INTO reminders (user_id, scheduled_time, reminder_type) VALUES (?, ?, 'water_reminder')", reminders())
+        conn.commit()
+
+
+async def _init_schema(path: Path):
+    """Создать схему базы через DatabaseManager"""
+    db_manager.db_path = str(path)
+    await db_manager.init_db()
+
+
+async def measure(name: str, func, iterations: int, users: int, rng: random.Random) -> dict:
+    """Замерить вызов func(user_id) на случайных пользователях"""
+    samples = []
+    for _ in range(iterations):
+        user_id = rng.randint(1, users)
+        started = time.perf_counter()
+        await func(user_id)
+        samples.append(time.perf_counter() - started)
+
+    samples.sort()
+    result = {
+        "iterations": iterations,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p99_ms": samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000,
+    }
+    print(f"{name:<24} mean {result['mean_ms']:8.3f} мс  p50 {result['p50_ms']:8.3f} мс  p99 {result['p99_ms']:8.3f} мс")
+    return result
+
+
+async def run_benchmarks(path: Path, users: int, iterations: int) -> dict:
+    """Прогнать все замеры на подготовленной базе"""
+    db_manager.db_path = str(path)
+    rng = random.Random(SEED)
+    now = datetime.now()
+
+    benchmarks = {
+        "get_daily_intake": lambda user_id: db_manager.get_daily_intake(user_id),
+        "get_weekly_stats": lambda user_id: db_manager.get_weekly_stats(user_id),
+        "get_daily_stats": lambda user_id: stats_manager.get_daily_stats(user_id),
+        "get_achievements": lambda user_id: stats_manager.get_achievements(user_id),
+        "get_pending_reminders": lambda user_id: db_manager.get_pending_reminders(user_id, now),
+        "log_motivation": lambda user_id: db_manager.log_motivation(user_id, "benchmark", "💧"),
+    }
+
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = await measure(name, func, iterations, users, rng)
+
+    # Пишущие замеры не должны менять базу для следующих запусков
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM motivation_log WHERE message_type = 'benchmark'")
+        conn.commit()
+
+    return results
+
+
+def git_revision() -> str:
+    """Текущий коммит для привязки результатов"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str):
+    """Сравнить два файла результатов"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old['revision']} ({old['users']} польз.) -> {new['revision']} ({new['users']} польз.)")
+    for name, new_result in new["results"].items():
+        old_result = old["results"].get(name)
+        if not old_result:
+            continue
+        change = (new_result["mean_ms"] / old_result["mean_ms"] - 1) * 100
+        print(f"{name:<24} {old_result['mean_ms']:8.3f} -> {new_result['mean_ms']:8.3f} мс ({change:+.1f}%)")
+
+
+def main():
+    """Запуск бенчмарка"""
+    parser = argparse.ArgumentParser(description="Бенчмарк горячих путей БД")
+    parser.add_argument("--users", type=int, default=1000, help="количество пользователей (1000, 100000, 1000000)")
+    parser.add_argument("--days", type=int, default=30, help="дней истории приемов")
+    parser.add_argument("--iterations", type=int, default=200, help="вызовов каждого метода")
+    parser.add_argument("--output", help="файл для результатов (по умолчанию benchmarks/data/results_<users>_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="сравнить два файла результатов")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    DATA_DIR.mkdir(exist_ok=True)
+    db_path = DATA_DIR / f"bench_{args.users}_{args.days}d.db"
+
+    started = time.perf_counter()
+    seed_database(db_path, args.users, args.days)
+    print(f"База {db_path.name} готова за {time.perf_counter() - started:.1f} с\n")
+
+    results = asyncio.run(run_benchmarks(db_path, args.users, args.iterations))
+
+    revision = git_revision()
+    output = Path(args.output) if args.output else DATA_DIR / f"results_{args.users}_{revision}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "revision": revision,
+            "users": args.users,
+            "days": args.days,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {output}")
+
+
+if __name__ == "__main__":
+    main()
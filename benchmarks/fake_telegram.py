@@ -0,0 +1,170 @@
+"""
+Локальная замена Telegram Bot API для нагрузочного тестирования
+
+Реализует методы, которые использует бот: getMe, deleteWebhook, getUpdates,
+sendMessage, editMessageText, answerCallbackQuery. Поддерживает искусственную
+задержку ответа и случайные ошибки 429 (Too Many Requests).
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class FakeTelegramServer:
+    """Фейковый сервер Telegram Bot API"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081,
+                 latency_ms: float = 0.0, error_429_rate: float = 0.0, retry_after: int = 1):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.error_429_rate = error_429_rate
+        self.retry_after = retry_after
+
+        self.calls = Counter()
+        self.errors_429 = Counter()
+        # Время отправки каждого напоминания (для подсчета напоминаний в секунду)
+        self.reminder_sends: List[float] = []
+
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._updates_changed = asyncio.Condition()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        """Базовый адрес для TelegramAPIServer.from_base"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """Запустить сервер"""
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        """Остановить сервер"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def push_update(self, update: Dict[str, Any]):
+        """Поставить обновление в очередь getUpdates"""
+        async with self._updates_changed:
+            update["update_id"] = self._next_update_id
+            self._next_update_id += 1
+            self._updates.append(update)
+            self._updates_changed.notify_all()
+
+    def next_message_id(self) -> int:
+        """Выдать новый идентификатор сообщения"""
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        return message_id
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        """Обработать вызов метода Bot API"""
+        method = request.match_info["method"].lower()
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        if method == "getupdates":
+            return self._ok(await self._get_updates(params))
+
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        if method in ("sendmessage", "editmessagetext") and random.random() < self.error_429_rate:
+            self.errors_429[method] += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after}
+            })
+
+        if method == "getme":
+            return self._ok({"id": 1, "is_bot": True, "first_name": "WaterReminder", "username": "bench_bot"})
+        if method in ("deletewebhook", "answercallbackquery"):
+            return self._ok(True)
+        if method in ("sendmessage", "editmessagetext", "editmessagereplymarkup"):
+            if method == "sendmessage" and "postpone_" in params.get("reply_markup", ""):
+                self.reminder_sends.append(time.perf_counter())
+            return self._ok(self._message(params))
+
+        return web.json_response({"ok": False, "error_code": 404, "description": "Not Found: method not found"})
+
+    async def _get_updates(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Длинный опрос: вернуть обновления начиная с offset или дождаться их"""
+        offset = int(params.get("offset", 0))
+        timeout = float(params.get("timeout", 0))
+
+        async with self._updates_changed:
+            self._updates = [update for update in self._updates if update["update_id"] >= offset]
+            if not self._updates and timeout:
+                try:
+                    await asyncio.wait_for(self._updates_changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            limit = int(params.get("limit", 100))
+            return self._updates[:limit]
+
+    def _message(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Сформировать объект Message для ответа"""
+        chat_id = int(params.get("chat_id", 0))
+        message_id = int(params["message_id"]) if "message_id" in params else self.next_message_id()
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "WaterReminder"},
+            "text": params.get("text", "")
+        }
+        if "reply_markup" in params:
+            message["reply_markup"] = json.loads(params["reply_markup"])
+        return message
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        """Успешный ответ Bot API"""
+        return web.json_response({"ok": True, "result": result})
+
+
+def message_update(user_id: int, message_id: int, text: str) -> Dict[str, Any]:
+    """Обновление с текстовым сообщением пользователя"""
+    return {
+        "message": {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "username": f"user{user_id}"},
+            "text": text
+        }
+    }
+
+
+def callback_update(user_id: int, message_id: int, callback_id: str, data: str) -> Dict[str, Any]:
+    """Обновление с нажатием inline-кнопки на сообщении бота"""
+    return {
+        "callback_query": {
+            "id": callback_id,
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "WaterReminder"},
+                "text": "💧"
+            }
+        }
+    }
@@ -0,0 +1,85 @@
+"""
+Микробенчмарк клавиатур: создание на каждый запрос против готовых экземпляров
+и шаблонов клавиатур напоминаний
+
+Запуск: python benchmarks/keyboards_benchmark.py
+"""
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек, к Telegram бенчмарк не обращается
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from src.handlers.keyboards import SETTINGS_KEYBOARD, STATS_KEYBOARD, MOTIVATE_KEYBOARD, reminder_keyboard
+
+ITERATIONS = 20000
+
+
+def build_per_request(reminder_id: int):
+    """Клавиатуры так, как их создавали обработчики до кэширования"""
+    InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🎯 Изменить цель", callback_data="change_goal")],
+        [InlineKeyboardButton(text="⏰ Изменить время", callback_data="change_time")],
+        [InlineKeyboardButton(text="🔔 Уведомления", callback_data="toggle_notifications")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
+    ])
+    InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="📈 Недельная статистика", callback_data="weekly_stats"),
+            InlineKeyboardButton(text="🏆 Достижения", callback_data="achievements")
+        ],
+        [InlineKeyboardButton(text="📋 История приемов", callback_data="intake_history")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
+    ])
+    InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="💫 Еще мотивации", callback_data="motivate"),
+            InlineKeyboardButton(text="🔬 Научные факты", callback_data="scientific_facts")
+        ],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")]
+    ])
+    InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="✅ Выпил(250мл)", callback_data=f"water_intake_250_{reminder_id}"),
+            InlineKeyboardButton(text="🔄 Выпил больше", callback_data=f"water_intake_custom_{reminder_id}")
+        ],
+        [
+            InlineKeyboardButton(text="⏰ Напомнить позже", callback_data=f"postpone_{reminder_id}"),
+            InlineKeyboardButton(text="💫 Мотивация!", callback_data="motivate")
+        ]
+    ])
+
+
+def use_prebuilt(reminder_id: int):
+    """Клавиатуры из модуля keyboards"""
+    SETTINGS_KEYBOARD, STATS_KEYBOARD, MOTIVATE_KEYBOARD
+    reminder_keyboard(reminder_id)
+
+
+def run(name: str, func, reminder_ids: int):
+    """Замерить среднее время на одно обновление (4 клавиатуры)"""
+    counter = iter(range(ITERATIONS * 10))
+    seconds = timeit.timeit(lambda: func(next(counter) % reminder_ids), number=ITERATIONS)
+    per_update_us = seconds / ITERATIONS * 1e6
+    print(f"{name:<40} {per_update_us:8.2f} мкс/обновление")
+    return per_update_us
+
+
+def main():
+    """Запуск бенчмарка"""
+    print(f"Итераций: {ITERATIONS}\n")
+    baseline = run("Создание на каждый запрос", build_per_request, 100)
+    # У каждого напоминания свой id: клавиатура собирается из шаблона
+    fast = run("Готовые клавиатуры и шаблоны", use_prebuilt, ITERATIONS * 10)
+    print(f"\nЭкономия CPU на обновление: {baseline - fast:.2f} мкс ({baseline / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Сквозной нагрузочный тест бота против фейкового Telegram Bot API
+
+Синтетические пользователи проходят сценарий /start -> "Выпил(250мл)" ->
+/stats -> "Достижения". Затем планировщик рассылает накопившиеся напоминания.
+Отчет: обновлений в секунду, p50/p99 времени обработки, напоминаний в секунду.
+
+Запуск: python benchmarks/load_test.py --users 200 --latency-ms 20 --error-429-rate 0.01
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для формата запросов, к Telegram тест не обращается
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from config import settings
+from src.bot import bot, dp, on_startup, on_shutdown
+from src.database import db_manager, intake_buffer
+from src.scheduler import scheduler
+
+from fake_telegram import FakeTelegramServer, message_update, callback_update
+
+# Журнал каждого запроса и обновления искажает замеры
+logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
+logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+
+class HandlerTimer:
+    """Middleware, замеряющая время обработки каждого обновления"""
+
+    def __init__(self):
+        self.durations = []
+        self.processed = asyncio.Event()
+        self.expected = 0
+
+    async def __call__(self, handler, event, data):
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.durations.append(time.perf_counter() - started)
+            if self.expected and len(self.durations) >= self.expected:
+                self.processed.set()
+
+
+def percentile(values, q: float) -> float:
+    """Перцентиль в миллисекундах"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(len(ordered) * q), len(ordered) - 1)
+    return ordered[index] * 1000
+
+
+async def run_user_flows(server: FakeTelegramServer, timer: HandlerTimer, users: int, taps: int):
+    """Прогнать сценарии пользователей и дождаться обработки всех обновлений"""
+    updates = []
+    for user_id in range(1, users + 1):
+        updates.append(message_update(user_id, server.next_message_id(), "/start"))
+        for tap in range(taps):
+            # Каждое нажатие на своем сообщении, чтобы не попасть под защиту от двойных нажатий
+            updates.append(callback_update(user_id, server.next_message_id(), f"cb{user_id}_{tap}", "water_intake_250"))
+        updates.append(message_update(user_id, server.next_message_id(), "/stats"))
+        updates.append(callback_update(user_id, server.next_message_id(), f"cb{user_id}_ach", "achievements"))
+
+    timer.durations.clear()
+    timer.expected = len(updates)
+    timer.processed.clear()
+
+    started = time.perf_counter()
+    for update in updates:
+        await server.push_update(update)
+    await timer.processed.wait()
+    elapsed = time.perf_counter() - started
+
+    return len(updates), elapsed
+
+
+async def run_reminders(server: FakeTelegramServer, timeout: float):
+    """Перезапустить планировщик и замерить рассылку накопившихся напоминаний"""
+    with sqlite3.connect(db_manager.db_path) as conn:
+        due = conn.execute(
+            "SELECT COUNT(*) FROM reminders WHERE status = 'pending' AND scheduled_time <= ?",
+            (datetime.now(),)
+        ).fetchone()[0]
+
+    server.reminder_sends.clear()
+    started = time.perf_counter()
+    # Новый запуск планировщика сразу обрабатывает просроченные напоминания
+    await scheduler.stop()
+    await scheduler.start()
+
+    # Часть напоминаний планировщик подавляет (пользователь на графике) - ждем, пока каждое
+    # наступившее будет отправлено или подавлено
+    deadline = started + timeout
+    suppressed = 0
+    while time.perf_counter() < deadline:
+        with sqlite3.connect(db_manager.db_path) as conn:
+            suppressed = conn.execute("SELECT COUNT(*) FROM reminders WHERE status = 'suppressed'").fetchone()[0]
+        if len(server.reminder_sends) + server.errors_429["sendmessage"] + suppressed >= due:
+            break
+        await asyncio.sleep(0.05)
+
+    last = server.reminder_sends[-1] if server.reminder_sends else started
+    return due, len(server.reminder_sends), suppressed, max(last - started, 1e-9)
+
+
+async def main():
+    """Запуск нагрузочного теста"""
+    parser = argparse.ArgumentParser(description="Нагрузочный тест WaterReminder Bot")
+    parser.add_argument("--users", type=int, default=100, help="количество синтетических пользователей")
+    parser.add_argument("--taps", type=int, default=3, help="нажатий 'Выпил' на пользователя")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="задержка ответа фейкового API")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="доля ответов 429 на отправку/редактирование")
+    parser.add_argument("--port", type=int, default=8081, help="порт фейкового API")
+    parser.add_argument("--reminder-timeout", type=float, default=60.0, help="ожидание рассылки напоминаний (секунды)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="water_bench_")
+    db_manager.db_path = os.path.join(workdir, "bench.db")
+    intake_buffer.journal_path = os.path.join(workdir, "bench.journal")
+    settings.SCHEDULER_CHECKPOINT_PATH = os.path.join(workdir, "bench.checkpoint")
+    # Замеряется скорость рассылки всех наступивших напоминаний, без догона
+    # после простоя (его эффект - benchmarks/catch_up_benchmark.py)
+    settings.REMINDER_CATCH_UP_ENABLED = False
+
+    server = FakeTelegramServer(port=args.port, latency_ms=args.latency_ms, error_429_rate=args.error_429_rate)
+    await server.start()
+
+    # Направляем глобального бота на фейковый API
+    await bot.session.close()
+    bot.session = AiohttpSession(api=TelegramAPIServer.from_base(server.base_url))
+
+    timer = HandlerTimer()
+    dp.update.outer_middleware(timer)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=1, handle_signals=False))
+
+    try:
+        while not scheduler.running:
+            await asyncio.sleep(0.01)
+
+        total_updates, elapsed = await run_user_flows(server, timer, args.users, args.taps)
+        durations = list(timer.durations)
+        due, sent, suppressed, reminders_elapsed = await run_reminders(server, args.reminder_timeout)
+    finally:
+        await dp.stop_polling()
+        await polling
+        await server.stop()
+
+    print(f"Пользователей: {args.users}, задержка API: {args.latency_ms} мс, доля 429: {args.error_429_rate}")
+    print(f"Обновлений: {total_updates} за {elapsed:.2f} с -> {total_updates / elapsed:.1f} обновлений/с")
+    print(f"Время обработки: p50 {percentile(durations, 0.50):.1f} мс, "
+          f"p99 {percentile(durations, 0.99):.1f} мс, среднее {statistics.mean(durations) * 1000:.1f} мс")
+    print(f"Напоминаний: {sent}/{due} за {reminders_elapsed:.2f} с -> {sent / reminders_elapsed:.1f} напоминаний/с, "
+          f"подавлено: {suppressed}")
+    print(f"Вызовы API: {dict(server.calls)}")
+    print(f"Ответы 429: {dict(server.errors_429)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+"""
+Микробенчмарк отрисовки статистики: вычисление на каждый запрос против готовых таблиц
+
+Одно обновление - прогресс-бар, статус и мотивационное резюме за день
+плюс график недели, как их собирают /stats, недельная статистика и резюме.
+Отдельно замеряются шаблоны сообщений: str.format на каждый запрос против
+предкомпилированных шаблонов каталога src.texts.
+
+Запуск: python benchmarks/render_benchmark.py
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек, к Telegram бенчмарк не обращается
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from src.stats import render
+from src.texts import Template, texts
+
+ITERATIONS = 50000
+GOAL_ML = 2000
+
+
+def progress_bar_per_request(current_ml: int, goal_ml: int) -> str:
+    """Прогресс-бар так, как его строили до таблиц"""
+    percentage = min((current_ml / goal_ml) * 100, 100)
+    filled_blocks = int(percentage / 10)
+    bar = "💧" * filled_blocks + "⚪" * (10 - filled_blocks)
+    return f"[{bar}] {percentage:.0f}% ({current_ml}/{goal_ml} мл)"
+
+
+def status_per_request(percentage: float) -> tuple:
+    """Статус цепочкой условий"""
+    if percentage >= 100:
+        return "goal_achieved", "🎉 Цель достигнута!"
+    elif percentage >= 75:
+        return "almost_there", "🔥 Почти у цели!"
+    elif percentage >= 50:
+        return "halfway", "⚡ На полпути!"
+    elif percentage >= 25:
+        return "getting_started", "🌱 Начали путь!"
+    return "just_started", "💧 Только начинаем!"
+
+
+def summary_per_request(current_ml: int, goal_ml: int, percentage: float) -> str:
+    """Резюме цепочкой условий"""
+    if percentage >= 100:
+        return f"🎉 *Поздравляем!* Вы достигли цели дня! Ваше тело благодарит вас за заботу! ✨"
+    elif percentage >= 75:
+        return f"🔥 *Отлично!* Вы на финишной прямой! Осталось всего {goal_ml - current_ml}мл до цели! 💪"
+    elif percentage >= 50:
+        return f"⚡ *Хорошая работа!* Вы уже прошли половину пути! Продолжайте в том же духе! 🌟"
+    elif percentage >= 25:
+        return f"🌱 *Начали путь!* Каждый глоток воды приближает вас к здоровью! Не останавливайтесь! 💧"
+    return f"💧 *Время начать!* Ваше тело ждет первой порции живительной влаги! Давайте сделаем это! 🚀"
+
+
+def weekly_chart_per_request(days: list, goal_ml: int) -> str:
+    """График недели с пересчетом процентов и полос для каждого дня"""
+    lines = ["📊 *Прогресс за неделю:*", ""]
+    for day in days:
+        percentage = min((day['total'] / goal_ml) * 100, 100)
+        filled_blocks = int(percentage / 10)
+        bar = "█" * filled_blocks + "░" * (10 - filled_blocks)
+        weekday = ('Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс')[date.fromisoformat(day['date']).weekday()]
+        lines.append(f"{weekday}: {bar} {percentage:.0f}% ({day['total']}мл)")
+    return "\n".join(lines)
+
+
+def per_request(current_ml: int, days: list):
+    """Все вычисляется заново, процент - в каждой функции"""
+    percentage = min((current_ml / GOAL_ML) * 100, 100)
+    progress_bar_per_request(current_ml, GOAL_ML)
+    status_per_request(percentage)
+    summary_per_request(current_ml, GOAL_ML, percentage)
+    weekly_chart_per_request(days, GOAL_ML)
+
+
+def tables(current_ml: int, days: list):
+    """Процент считается один раз, строки берутся из таблиц render"""
+    value = render.level(current_ml, GOAL_ML)
+    render.progress_bar(current_ml, GOAL_ML, value)
+    render.status(value)
+    render.summary(current_ml, GOAL_ML, value)
+    render.weekly_chart(days, GOAL_ML)
+
+
+INTAKE_TEMPLATE = "✅ *Отлично!* Вы выпили 250мл. Всего сегодня: {current}/2000мл\n*Продолжайте в том же духе!* 💪"
+INTAKE_COMPILED = Template(INTAKE_TEMPLATE)
+STATS_COMPILED = texts.template("stats")
+STATS_SOURCE = STATS_COMPILED.source
+
+
+def messages_per_request(current_ml: int, stats: dict):
+    """Подтверждение приема и текст статистики через str.format"""
+    INTAKE_TEMPLATE.format(current=current_ml)
+    STATS_SOURCE.format(**stats)
+
+
+def messages_compiled(current_ml: int, stats: dict):
+    """Те же сообщения из предкомпилированных шаблонов"""
+    INTAKE_COMPILED.render(current=current_ml)
+    STATS_COMPILED.render(**stats)
+
+
+def make_stats(current_ml: int) -> dict:
+    """Словарь как у StatsManager.get_daily_stats"""
+    value = render.level(current_ml, GOAL_ML)
+    status, status_text = render.status(value)
+    return {
+        'current_ml': current_ml, 'goal_ml': GOAL_ML, 'percentage': value, 'level': value,
+        'progress_bar': render.progress_bar(current_ml, GOAL_ML, value), 'status': status,
+        'status_text': status_text, 'intake_count': 4, 'avg_per_intake': current_ml / 4,
+        'next_reminder': "14:30"
+    }
+
+
+def make_inputs(count: int) -> list:
+    """Случайные текущие объемы и недели"""
+    rng = random.Random(42)
+    today = date.today()
+    inputs = []
+    for _ in range(count):
+        days = [
+            {'date': (today - timedelta(days=offset)).isoformat(), 'total': rng.randrange(0, 3000, 50)}
+            for offset in range(6, -1, -1)
+        ]
+        inputs.append((rng.randrange(0, 3000, 50), days))
+    return inputs
+
+
+def run(name: str, func, inputs: list) -> float:
+    """Замерить среднее время на одно обновление и пропускную способность"""
+    counter = iter(range(ITERATIONS * 10))
+    seconds = timeit.timeit(lambda: func(*inputs[next(counter) % len(inputs)]), number=ITERATIONS)
+    per_update_us = seconds / ITERATIONS * 1e6
+    print(f"{name:<30} {per_update_us:8.2f} мкс/обновление {1e6 / per_update_us:10.0f} обновлений/с")
+    return per_update_us
+
+
+def main():
+    """Запуск бенчмарка"""
+    inputs = make_inputs(1000)
+    # Таблицы должны давать тот же текст, что и прежний код (кроме округления процента вниз)
+    for current_ml, _ in inputs:
+        percentage = min((current_ml / GOAL_ML) * 100, 100)
+        value = render.level(current_ml, GOAL_ML)
+        assert render.status(value) == status_per_request(percentage)
+        assert render.summary(current_ml, GOAL_ML, value) == summary_per_request(current_ml, GOAL_ML, percentage)
+
+    print(f"Итераций: {ITERATIONS}\n")
+    baseline = run("Вычисление на каждый запрос", per_request, inputs)
+    fast = run("Готовые таблицы", tables, inputs)
+    print(f"\nЭкономия CPU на обновление: {baseline - fast:.2f} мкс ({baseline / fast:.1f}x)\n")
+
+    message_inputs = [(current_ml, make_stats(current_ml)) for current_ml, _ in inputs]
+    for current_ml, stats in message_inputs:
+        assert INTAKE_COMPILED.render(current=current_ml) == INTAKE_TEMPLATE.format(current=current_ml)
+        assert STATS_COMPILED.render(**stats) == STATS_SOURCE.format(**stats)
+    baseline = run("Шаблоны: str.format", messages_per_request, message_inputs)
+    fast = run("Шаблоны: предкомпилированные", messages_compiled, message_inputs)
+    print(f"\nЭкономия CPU на сообщения: {baseline - fast:.2f} мкс ({baseline / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
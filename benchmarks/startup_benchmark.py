@@ -0,0 +1,122 @@
+"""
+Бенчмарк холодного запуска бота
+
+1. Время импорта (python -X importtime -c "import main" и путь БД/планировщика
+   без aiogram) с самыми дорогими модулями.
+2. Время до первого обработанного обновления: main.py запускается отдельным
+   процессом против фейкового Telegram Bot API (TELEGRAM_API_URL) с
+   обновлением /start в очереди; замеряются getMe, первый getUpdates и ответ.
+
+Запуск: python benchmarks/startup_benchmark.py --runs 3
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from fake_telegram import FakeTelegramServer, message_update
+
+# Токен нужен только для формата запросов, к Telegram бенчмарк не обращается
+ENV = dict(os.environ, BOT_TOKEN=os.environ.get("BOT_TOKEN", "0:benchmark"))
+
+
+def import_times(code: str, top: int):
+    """Разобрать вывод -X importtime: общее время и самые дорогие модули (мкс, накопительно)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=ENV, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Вложенность импорта - по отступу имени модуля
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((int(cumulative_us), depth, name.strip()))
+    total = sum(cumulative for cumulative, depth, _ in modules if depth == 0)
+    heaviest = sorted((item for item in modules if item[1] <= 1), reverse=True)[:top]
+    return total, heaviest
+
+
+def report_imports(top: int):
+    """Печать времени импорта"""
+    for title, code in (
+        ("import main", "import main"),
+        ("БД и планировщик (без aiogram)", "import src.database, src.scheduler"),
+        ("Бот и обработчики", "import src.bot.bot"),
+    ):
+        total, heaviest = import_times(code, top)
+        print(f"{title}: {total / 1000:.0f} мс")
+        for cumulative, depth, name in heaviest:
+            print(f"    {cumulative / 1000:8.1f} мс  {'  ' * depth}{name}")
+    print()
+
+
+async def first_update(port: int, timeout: float):
+    """Запустить main.py и замерить моменты getMe, первого getUpdates и ответа на /start (секунды)"""
+    server = FakeTelegramServer(port=port)
+    await server.start()
+    await server.push_update(message_update(1, server.next_message_id(), "/start"))
+
+    workdir = tempfile.mkdtemp(prefix="water_startup_")
+    env = dict(ENV, TELEGRAM_API_URL=server.base_url, LOOP_WATCHDOG_ENABLED="0")
+    started = time.perf_counter()
+    # Рабочий каталог - временный: там создаются БД и журнал приемов
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "main.py")], cwd=workdir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    marks = {}
+    try:
+        while "sendmessage" not in marks:
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError("Бот не ответил на /start")
+            if process.poll() is not None:
+                raise RuntimeError(f"Бот завершился с кодом {process.returncode}")
+            for method in ("getme", "getupdates", "sendmessage"):
+                if method not in marks and server.calls[method]:
+                    marks[method] = time.perf_counter() - started
+            await asyncio.sleep(0.002)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.to_thread(process.wait, 30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        await server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return marks
+
+
+async def main():
+    """Запуск бенчмарка"""
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска WaterReminder Bot")
+    parser.add_argument("--runs", type=int, default=3, help="количество запусков процесса бота")
+    parser.add_argument("--top", type=int, default=8, help="сколько самых дорогих модулей показать")
+    parser.add_argument("--port", type=int, default=8082, help="порт фейкового API")
+    parser.add_argument("--timeout", type=float, default=60.0, help="ожидание ответа бота (секунды)")
+    args = parser.parse_args()
+
+    report_imports(args.top)
+
+    runs = [await first_update(args.port, args.timeout) for _ in range(args.runs)]
+    print(f"Запусков: {args.runs} (медиана)")
+    for method, title in (("getme", "Bot API доступен (getMe)"),
+                          ("getupdates", "Начат опрос (getUpdates)"),
+                          ("sendmessage", "Ответ на первое обновление")):
+        print(f"{title:<30} {statistics.median(run[method] for run in runs) * 1000:8.0f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,221 @@
+"""
+Проверка реализации хранилища на одном сценарии
+
+Прогоняет через интерфейс Storage весь путь данных бота: пользователь,
+приемы воды (по одному и пачкой), напоминания, повторные напоминания,
+конкурентный захват напоминаний несколькими «узлами», повторный захват
+после падения узла, продление аренды медленной пачки, архивация, удаление.
+Без --dsn проверяется SQLite во временном файле, с --dsn - PostgreSQL
+(нужен asyncpg; таблицы создаются в указанной базе и очищаются).
+
+Запуск:
+    python benchmarks/storage_check.py
+    python benchmarks/storage_check.py --backend thread
+    python benchmarks/storage_check.py --dsn postgresql://postgres@localhost/water_test --nodes 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Токен нужен только для валидации настроек
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from src.database import DatabaseManager
+
+USER_ID = 424242
+
+
+def make_storages(args, count: int) -> list:
+    """Хранилища-«узлы», работающие с одной базой"""
+    if args.dsn:
+        from src.database.postgres import PostgresStorage
+        return [PostgresStorage(args.dsn, node_id=f"check-{index}") for index in range(count)]
+    return [DatabaseManager(args.db_path, backend=args.backend, node_id=f"check-{index}") for index in range(count)]
+
+
+async def check(args):
+    """Сценарий проверки"""
+    storages = make_storages(args, args.nodes)
+    db = storages[0]
+    await db.init_db()
+    await db.delete_user(USER_ID)
+
+    # Пользователь и настройки
+    await db.create_user(USER_ID, "check", 2500)
+    await db.create_user(USER_ID, "again", 1000)
+    user = await db.get_user(USER_ID)
+    assert user and user.daily_goal == 2500 and user.username == "check", user
+    await db.update_user_time_settings(USER_ID, 9, 21)
+    await db.update_user_notifications(USER_ID, False)
+    assert await db.get_user_time_settings(USER_ID) == (9, 21)
+    assert await db.is_notifications_enabled(USER_ID) is False
+
+    # Приемы воды: по одному и пачкой с позицией журнала
+    now_utc = datetime.utcnow().replace(microsecond=0)
+    await db.add_water_intake(USER_ID, 250)
+    await db.add_water_intake_batch(
+        [(USER_ID, 300, None, now_utc.strftime('%Y-%m-%d %H:%M:%S')) for _ in range(100)], 100
+    )
+    assert await db.get_intake_journal_seq() == 100
+    assert await db.get_daily_intake(USER_ID, now_utc.date()) == 250 + 300 * 100
+    assert len(await db.get_intake_history(USER_ID, 5)) == 5
+    weekly = await db.get_weekly_stats(USER_ID)
+    assert len(weekly) == 7 and weekly[-1] == {'date': now_utc.date().isoformat(), 'total': 30250}, weekly
+    assert weekly[0] == {'date': (now_utc.date() - timedelta(days=6)).isoformat(), 'total': 0}, weekly
+    today = await db.get_user_intake_history(USER_ID, 3)
+    assert len(today) == 3 and isinstance(today[0]['timestamp'], str), today
+    streamed = [intake async for intake in db.iter_intake(USER_ID, since=now_utc.date(), chunk_size=7)]
+    assert len(streamed) == len({intake.id for intake in streamed}) == 101, len(streamed)
+    assert sum(intake.volume for intake in streamed) == 30250
+
+    # Напоминания: захват несколькими узлами без пересечений
+    now = datetime.now().replace(microsecond=0)
+    for minute in range(args.reminders):
+        await db.create_reminder(USER_ID, now - timedelta(minutes=minute + 1), 'water_reminder')
+    future_id = await db.create_reminder(USER_ID, now + timedelta(hours=1))
+
+    started = time.perf_counter()
+    claimed = await asyncio.gather(*(s.claim_due_reminders(now, 7) for s in storages for _ in range(4)))
+    while True:
+        more = await asyncio.gather(*(s.claim_due_reminders(now, 7) for s in storages))
+        if not any(more):
+            break
+        claimed.extend(more)
+    elapsed = time.perf_counter() - started
+    ids = [reminder.id for batch in claimed for reminder in batch]
+    assert len(ids) == len(set(ids)) == args.reminders, (len(ids), len(set(ids)))
+    assert all(reminder.status == 'sending' for batch in claimed for reminder in batch)
+    assert [r.id for r in await db.get_pending_reminders(USER_ID)] == [future_id]
+    print(f"Захват {args.reminders} напоминаний {args.nodes} узлами за {elapsed * 1000:.1f} мс, пересечений нет")
+
+    first, second = ids[0], ids[1]
+    await db.mark_reminder_completed(first)
+    await db.mark_reminder_skipped(second)
+
+    # Конверсия слота: засчитывается только первый ответ на отправленное напоминание
+    assert await db.mark_reminder_answered(first) is True
+    assert await db.mark_reminder_answered(first) is False
+    assert await db.mark_reminder_answered(second) is False
+    slot_stats = await db.get_reminder_slot_stats(USER_ID)
+    assert list(slot_stats.values()) == [(1, 1)], slot_stats
+    # Прием по кнопке из пачки буфера засчитывается так же, повторный - нет
+    third = ids[3]
+    await db.mark_reminder_completed(third)
+    await db.add_water_intake_batch([(USER_ID, 250, third, now_utc.strftime('%Y-%m-%d %H:%M:%S'))] * 2, 101)
+    assert await db.mark_reminder_answered(third) is False
+    slot_stats = await db.get_reminder_slot_stats(USER_ID)
+    assert sorted(slot_stats.values()) == [(1, 1), (1, 1)], slot_stats
+    follow_up_id = await db.create_follow_up_reminder(USER_ID, first, 5)
+    assert follow_up_id
+    await db.create_follow_up_reminders([(USER_ID, now + timedelta(minutes=10), 2) for _ in range(10)])
+    await db.postpone_reminder(future_id, 30)
+    pending = await db.get_pending_reminders(USER_ID)
+    assert len(pending) == 12, len(pending)
+    postponed = next(r for r in pending if r.id == future_id)
+    assert postponed.scheduled_time == now + timedelta(hours=1, minutes=30), postponed
+
+    # Возврат при остановке: в ожидание уходят только не отправленные
+    await db.release_reminders([first, second, ids[2]])
+    pending = await db.get_pending_reminders(USER_ID)
+    assert len(pending) == 13 and ids[2] in {r.id for r in pending}, len(pending)
+
+    # Архивация: завершенные уходят, «отправляемые» остаются до устаревания
+    archived = await db.archive_reminders_batch(now - timedelta(days=1), 1000)
+    assert archived == 3, archived
+    archived = await db.archive_reminders_batch(now + timedelta(days=1), 1000)
+    assert archived == args.reminders - 3 + 12, archived
+
+    # Ответ на напоминание, которое уже ушло в архив
+    late_id = await db.create_reminder(USER_ID, now, 'water_reminder')
+    await db.mark_reminder_completed(late_id)
+    assert await db.archive_reminders_batch(now - timedelta(days=1), 1000) == 1
+    assert await db.mark_reminder_answered(late_id) is True
+
+    # Догон после простоя: устаревшее не отправляется, из остальных остается одно утреннее
+    await db.create_reminder(USER_ID, now - timedelta(hours=3))
+    await db.create_reminder(USER_ID, now - timedelta(minutes=20))
+    morning_time = now - timedelta(minutes=30)
+    morning_id = await db.create_reminder(USER_ID, morning_time, 'morning')
+    caught_up = await db.catch_up_reminders(now, now - timedelta(hours=1), 600)
+    assert caught_up == {'expired': 1, 'merged': 1, 'spread': 1}, caught_up
+    pending = await db.get_pending_reminders(USER_ID)
+    assert [(r.id, r.scheduled_time) for r in pending] == [(morning_id, morning_time)], pending
+
+    # Распределенное догоном уходит не раньше назначенного окна, а ответ засчитывается исходному слоту
+    assert await db.claim_due_reminders(now - timedelta(seconds=1), 10) == []
+    [morning] = await db.claim_due_reminders(now, 10)
+    assert (morning.id, morning.scheduled_time) == (morning_id, morning_time), morning
+    await db.mark_reminder_completed(morning_id)
+    assert await db.mark_reminder_answered(morning_id) is True
+    slot_stats = await db.get_reminder_slot_stats(USER_ID)
+    assert slot_stats[morning_time.hour * 60 + morning_time.minute] == (1, 1), slot_stats
+    assert slot_stats[now.hour * 60 + now.minute] == (1, 1), slot_stats
+
+    # Узел упал посреди пачки: отправленное не повторяется, остальное забирается снова после аренды
+    for minute in range(4):
+        await db.create_reminder(USER_ID, now - timedelta(minutes=minute + 1))
+    crashed = await db.claim_due_reminders(now, 10)
+    assert len(crashed) == 4, crashed
+    await db.mark_reminder_completed(crashed[0].id)
+    survivor = storages[-1]
+    assert await survivor.claim_due_reminders(now, 10, lease_before=now) == []
+    reclaimed = await survivor.claim_due_reminders(now, 10, lease_before=now + timedelta(seconds=1))
+    assert sorted(r.id for r in reclaimed) == sorted(r.id for r in crashed[1:]), reclaimed
+    assert await survivor.claim_due_reminders(now, 10, lease_before=now) == []
+
+    # Перезапуск узла, пока другой ведет рассылку: догон не трогает ожидающие
+    await db.create_reminder(USER_ID, now - timedelta(minutes=3))
+    await db.create_reminder(USER_ID, now - timedelta(minutes=2))
+    assert await db.catch_up_reminders(now, now - timedelta(hours=1), 600, lease_before=now) is None
+    assert len(await db.get_pending_reminders(USER_ID, now)) == 2
+    # Захваты упавшего узла старше аренды - догон выполняется
+    caught_up = await survivor.catch_up_reminders(
+        now, now - timedelta(hours=1), 600, lease_before=now + timedelta(seconds=1)
+    )
+    assert caught_up == {'expired': 0, 'merged': 1, 'spread': 1}, caught_up
+
+    # Медленная пачка: продленную аренду другой узел не забирает, истекшую - забирает,
+    # и тогда продление больше не возвращает эти напоминания (их нельзя отправлять)
+    held = [r.id for r in reclaimed]
+    assert sorted(await survivor.renew_reminder_claims(held, now + timedelta(seconds=200))) == sorted(held)
+    taken = await db.claim_due_reminders(now, 10, lease_before=now + timedelta(seconds=1))
+    assert not set(held) & {r.id for r in taken}, taken
+    taken = await db.claim_due_reminders(now, 10, lease_before=now + timedelta(seconds=201))
+    assert set(held) <= {r.id for r in taken}, taken
+    assert await survivor.renew_reminder_claims(held, now + timedelta(seconds=400)) == []
+
+    # Мотивация и удаление
+    await db.log_motivation(USER_ID, "check", "💧")
+    assert await db.get_recent_motivations(USER_ID) == ["💧"]
+    await db.update_last_motivation_date(USER_ID)
+    assert (await db.get_user(USER_ID)).last_motivation_date is not None
+    await db.delete_user(USER_ID)
+    assert await db.get_user(USER_ID) is None
+
+    for storage in storages:
+        await storage.close()
+    print("Все проверки пройдены")
+
+
+def main():
+    """Запуск проверки"""
+    parser = argparse.ArgumentParser(description="Проверка реализации хранилища")
+    parser.add_argument("--dsn", help="DSN PostgreSQL (по умолчанию SQLite во временном файле)")
+    parser.add_argument("--backend", default="executor", help="бэкенд SQLite: executor или thread")
+    parser.add_argument("--nodes", type=int, default=3, help="сколько узлов одновременно забирают напоминания")
+    parser.add_argument("--reminders", type=int, default=200, help="наступивших напоминаний")
+    args = parser.parse_args()
+    args.db_path = os.path.join(tempfile.mkdtemp(prefix="water_storage_"), "check.db")
+    asyncio.run(check(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,36 @@ CREATE_TABLES = {
         )
     """,
     
+    'reminders_archive': """
+        CREATE TABLE IF NOT EXISTS reminders_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            scheduled_time TIMESTAMP,
+            reminder_type TEXT,
+            status TEXT,
+            attempt_number INTEGER,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    
+    'intake_journal_state': """
+        CREATE TABLE IF NOT EXISTS intake_journal_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_seq INTEGER NOT NULL
+        )
+    """,
+    
+    'reminder_slot_stats': """
+        CREATE TABLE IF NOT EXISTS reminder_slot_stats (
+            user_id INTEGER,
+            slot INTEGER,
+            sent INTEGER NOT NULL DEFAULT 0,
+            converted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, slot)
+        )
+    """,
+    
     'motivation_log': """
         CREATE TABLE IF NOT EXISTS motivation_log (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -50,11 +80,400 @@ CREATE_TABLES = {
     """
 }
 
+# Колонки, добавленные в users после первой версии схемы
+USER_COLUMN_MIGRATIONS = [
+    "ALTER TABLE users ADD COLUMN notifications_enabled INTEGER DEFAULT 1",
+    "ALTER TABLE users ADD COLUMN start_hour INTEGER DEFAULT 8",
+    "ALTER TABLE users ADD COLUMN end_hour INTEGER DEFAULT 22"
+]
+
+# Колонки, добавленные в reminders: когда и каким узлом напоминание забрано
+# на отправку и не раньше какого времени отправлять (догон после простоя)
+REMINDER_COLUMN_MIGRATIONS = [
+    "ALTER TABLE reminders ADD COLUMN claimed_at TIMESTAMP",
+    "ALTER TABLE reminders ADD COLUMN claimed_by TEXT",
+    "ALTER TABLE reminders ADD COLUMN send_after TIMESTAMP"
+]
+
 # Индексы для оптимизации
 CREATE_INDEXES = [
     "CREATE INDEX IF NOT EXISTS idx_water_intake_user_date ON water_intake(user_id, DATE(timestamp))",
     "CREATE INDEX IF NOT EXISTS idx_reminders_scheduled ON reminders(scheduled_time, status)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_archive_user_time ON reminders_archive(user_id, scheduled_time)",
     "CREATE INDEX IF NOT EXISTS idx_motivation_log_user_date ON motivation_log(user_id, DATE(sent_at))"
 ]
 
+# Конверсия напоминаний по слотам расписания. Слот - минута суток, на
+# которую назначено плановое напоминание; повторные и отложенные не учитываются.
+# Отправка увеличивает sent, первый прием воды по напоминанию (переход
+# статуса 'completed' -> 'answered') - converted.
+SLOT_REMINDER_TYPES = "('morning', 'regular', 'water_reminder')"
+
+_REMINDER_SLOT = "CAST(strftime('%H', scheduled_time) AS INTEGER) * 60 + CAST(strftime('%M', scheduled_time) AS INTEGER)"
+
+COUNT_SLOT_SENT = f"""
+    INSERT INTO reminder_slot_stats (user_id, slot, sent, converted)
+    SELECT user_id, {_REMINDER_SLOT}, 1, 0 FROM reminders
+    WHERE id = ? AND reminder_type IN {SLOT_REMINDER_TYPES}
+    ON CONFLICT (user_id, slot) DO UPDATE SET sent = sent + 1
+"""
+
+COUNT_SLOT_CONVERTED = f"""
+    UPDATE reminder_slot_stats SET converted = converted + 1
+    WHERE (user_id, slot) IN (
+        SELECT user_id, {_REMINDER_SLOT} FROM {{table}}
+        WHERE id = ? AND reminder_type IN {SLOT_REMINDER_TYPES}
+    )
+"""
+
+# Объем по дням за 7 календарных дней, заканчивая датой ? (UTC), одним
+# запросом: дни без приемов тоже попадают в результат, с нулем.
+# Соединение по DATE(timestamp) использует индекс idx_water_intake_user_date.
+WEEKLY_STATS = """
+    WITH RECURSIVE days(day) AS (
+        SELECT date(?, '-6 days')
+        UNION ALL
+        SELECT date(day, '+1 day') FROM days WHERE day < date(?)
+    )
+    SELECT days.day AS date, COALESCE(SUM(water_intake.volume), 0) AS total
+    FROM days
+    LEFT JOIN water_intake
+        ON water_intake.user_id = ? AND DATE(water_intake.timestamp) = days.day
+    GROUP BY days.day
+    ORDER BY days.day
+"""
+
+# Индексы, которые массовый импорт удаляет на время загрузки и строит заново в конце
+BULK_LOAD_DROP_INDEXES = [
+    "DROP INDEX IF EXISTS idx_water_intake_user_date",
+    "DROP INDEX IF EXISTS idx_reminders_scheduled"
+]
+
+# Массовый импорт пользователей: существующие записи обновляются
+IMPORT_USERS = """
+    INSERT INTO users (user_id, username, daily_goal, notifications_enabled, start_hour, end_hour)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = excluded.username,
+        daily_goal = excluded.daily_goal,
+        notifications_enabled = excluded.notifications_enabled,
+        start_hour = excluded.start_hour,
+        end_hour = excluded.end_hour
+"""
+
+
+# Перенос завершенных напоминаний из горячей таблицы в архив.
+# Горячая таблица reminders содержит только актуальные напоминания
+# (ожидающие на сегодня/завтра), поэтому индекс idx_reminders_scheduled
+# не растет со временем работы бота.
+ARCHIVE_REMINDERS_SELECT = """
+    SELECT id FROM reminders
+    WHERE status NOT IN ('pending', 'sending') OR scheduled_time < ?
+    LIMIT ?
+"""
+
+ARCHIVE_REMINDERS_INSERT = """
+    INSERT OR REPLACE INTO reminders_archive
+        (id, user_id, scheduled_time, reminder_type, status, attempt_number, created_at)
+    SELECT id, user_id, scheduled_time, reminder_type,
+           CASE WHEN status IN ('pending', 'sending') THEN 'expired' ELSE status END,
+           attempt_number, created_at
+    FROM reminders WHERE id IN ({placeholders})
+"""
+
+ARCHIVE_REMINDERS_DELETE = "DELETE FROM reminders WHERE id IN ({placeholders})"
+
+
+# Догон напоминаний, пропущенных за время простоя (при запуске планировщика).
+# Пропущенные - ожидающие со временем не позже момента запуска; каждый шаг -
+# один UPDATE по всему множеству, без обработки строк в Python. Исходное
+# scheduled_time не меняется: по нему считаются слот и задержка отправки.
+
+# Другой узел недавно забирал напоминания - он работает, и догон не нужен
+CATCH_UP_PEER_CLAIMS = """
+    SELECT EXISTS (SELECT 1 FROM reminders WHERE claimed_at >= ? AND claimed_by <> ?)
+"""
+
+CATCH_UP_EXPIRE_REMINDERS = """
+    UPDATE reminders SET status = 'expired'
+    WHERE status = 'pending' AND scheduled_time < ?
+"""
+
+# У пользователя остается одно пропущенное напоминание: утреннее и другие
+# неподавляемые важнее плановых и повторных (SUPPRESSIBLE_TYPES), среди
+# равных - самое позднее
+CATCH_UP_MERGE_REMINDERS = """
+    UPDATE reminders SET status = 'suppressed'
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id
+                ORDER BY reminder_type IN ('regular', 'water_reminder', 'follow_up'), scheduled_time DESC, id DESC
+            ) AS position
+            FROM reminders
+            WHERE status = 'pending' AND scheduled_time <= ?
+        )
+        WHERE position > 1
+    )
+"""
+
+# Оставшиеся пропущенные равномерно распределяются по окну разгона
+# (в порядке исходного времени, через send_after), а не отправляются все сразу
+CATCH_UP_SPREAD_REMINDERS = """
+    UPDATE reminders
+    SET send_after = datetime(:now, '+' || (ranked.position * :ramp_seconds / ranked.total) || ' seconds')
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY scheduled_time, id) - 1 AS position, COUNT(*) OVER () AS total
+        FROM reminders
+        WHERE status = 'pending' AND scheduled_time <= :now
+    ) AS ranked
+    WHERE reminders.id = ranked.id
+"""
+
+
+# Схема PostgreSQL (STORAGE_BACKEND=postgres).
+# Время записи приемов и сообщений хранится в UTC, как CURRENT_TIMESTAMP в SQLite.
+POSTGRES_CREATE_TABLES = {
+    'users': """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT PRIMARY KEY,
+            username TEXT,
+            daily_goal INTEGER DEFAULT 2000,
+            created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+            last_motivation_date DATE,
+            notifications_enabled BOOLEAN DEFAULT TRUE,
+            start_hour INTEGER DEFAULT 8,
+            end_hour INTEGER DEFAULT 22
+        )
+    """,
+    
+    'water_intake': """
+        CREATE TABLE IF NOT EXISTS water_intake (
+            id BIGSERIAL PRIMARY KEY,
+            user_id BIGINT,
+            volume INTEGER,
+            timestamp TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+            reminder_id BIGINT
+        )
+    """,
+    
+    'reminders': """
+        CREATE TABLE IF NOT EXISTS reminders (
+            id BIGSERIAL PRIMARY KEY,
+            user_id BIGINT,
+            scheduled_time TIMESTAMP,
+            reminder_type TEXT DEFAULT 'regular',
+            status TEXT DEFAULT 'pending',
+            attempt_number INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+            claimed_at TIMESTAMP,
+            claimed_by TEXT,
+            send_after TIMESTAMP
+        )
+    """,
+    
+    'reminders_archive': """
+        CREATE TABLE IF NOT EXISTS reminders_archive (
+            id BIGINT PRIMARY KEY,
+            user_id BIGINT,
+            scheduled_time TIMESTAMP,
+            reminder_type TEXT,
+            status TEXT,
+            attempt_number INTEGER,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+        )
+    """,
+    
+    'intake_journal_state': """
+        CREATE TABLE IF NOT EXISTS intake_journal_state (
+            node TEXT PRIMARY KEY,
+            last_seq BIGINT NOT NULL
+        )
+    """,
+    
+    'reminder_slot_stats': """
+        CREATE TABLE IF NOT EXISTS reminder_slot_stats (
+            user_id BIGINT,
+            slot INTEGER,
+            sent INTEGER NOT NULL DEFAULT 0,
+            converted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, slot)
+        )
+    """,
+    
+    'motivation_log': """
+        CREATE TABLE IF NOT EXISTS motivation_log (
+            id BIGSERIAL PRIMARY KEY,
+            user_id BIGINT,
+            message_type TEXT,
+            sent_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+            message_text TEXT
+        )
+    """
+}
+
+# Те же колонки для баз, созданных до их появления
+POSTGRES_REMINDER_COLUMN_MIGRATIONS = [
+    "ALTER TABLE reminders ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP",
+    "ALTER TABLE reminders ADD COLUMN IF NOT EXISTS claimed_by TEXT",
+    "ALTER TABLE reminders ADD COLUMN IF NOT EXISTS send_after TIMESTAMP"
+]
+
+POSTGRES_CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_water_intake_user_time ON water_intake(user_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_pending ON reminders(scheduled_time) WHERE status = 'pending'",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_sending ON reminders(claimed_at) WHERE status = 'sending'",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_archive_user_time ON reminders_archive(user_id, scheduled_time)",
+    "CREATE INDEX IF NOT EXISTS idx_motivation_log_user_time ON motivation_log(user_id, sent_at)"
+]
+
+POSTGRES_BULK_LOAD_DROP_INDEXES = [
+    "DROP INDEX IF EXISTS idx_water_intake_user_time",
+    "DROP INDEX IF EXISTS idx_reminders_pending",
+    "DROP INDEX IF EXISTS idx_reminders_sending",
+    "DROP INDEX IF EXISTS idx_reminders_user"
+]
+
+_POSTGRES_REMINDER_SLOT = "(EXTRACT(HOUR FROM scheduled_time) * 60 + EXTRACT(MINUTE FROM scheduled_time))::int"
+
+POSTGRES_COUNT_SLOT_SENT = f"""
+    INSERT INTO reminder_slot_stats (user_id, slot, sent, converted)
+    SELECT user_id, {_POSTGRES_REMINDER_SLOT}, 1, 0 FROM reminders
+    WHERE id = $1 AND reminder_type IN {SLOT_REMINDER_TYPES}
+    ON CONFLICT (user_id, slot) DO UPDATE SET sent = reminder_slot_stats.sent + 1
+"""
+
+# Отметить ответ на напоминание (в горячей таблице или уже в архиве) и
+# засчитать конверсию слота одним запросом
+POSTGRES_MARK_REMINDER_ANSWERED = f"""
+    WITH answered AS (
+        UPDATE reminders SET status = 'answered'
+        WHERE id = $1 AND status = 'completed'
+        RETURNING user_id, scheduled_time, reminder_type
+    ), answered_archive AS (
+        UPDATE reminders_archive SET status = 'answered'
+        WHERE id = $1 AND status = 'completed'
+        RETURNING user_id, scheduled_time, reminder_type
+    ), slots AS (
+        SELECT user_id, {_POSTGRES_REMINDER_SLOT} AS slot, reminder_type FROM answered
+        UNION ALL
+        SELECT user_id, {_POSTGRES_REMINDER_SLOT}, reminder_type FROM answered_archive
+    ), counted AS (
+        UPDATE reminder_slot_stats SET converted = converted + 1
+        FROM slots
+        WHERE reminder_slot_stats.user_id = slots.user_id AND reminder_slot_stats.slot = slots.slot
+          AND slots.reminder_type IN {SLOT_REMINDER_TYPES}
+    )
+    SELECT count(*) FROM slots
+"""
+
+# Пользователи загружаются COPY во временную таблицу и переносятся одним запросом
+POSTGRES_IMPORT_USERS_STAGE = """
+    CREATE TEMP TABLE users_import (LIKE users INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+
+POSTGRES_IMPORT_USERS = """
+    INSERT INTO users (user_id, username, daily_goal, notifications_enabled, start_hour, end_hour)
+    SELECT DISTINCT ON (user_id) user_id, username, daily_goal, notifications_enabled, start_hour, end_hour
+    FROM users_import
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = EXCLUDED.username,
+        daily_goal = EXCLUDED.daily_goal,
+        notifications_enabled = EXCLUDED.notifications_enabled,
+        start_hour = EXCLUDED.start_hour,
+        end_hour = EXCLUDED.end_hour
+"""
+
+# Объем по дням за 7 календарных дней до $2 включительно, дни без приемов - с нулем
+POSTGRES_WEEKLY_STATS = """
+    SELECT days.day::date AS date, COALESCE(SUM(water_intake.volume), 0) AS total
+    FROM generate_series($2::date - 6, $2::date, interval '1 day') AS days(day)
+    LEFT JOIN water_intake
+        ON water_intake.user_id = $1
+        AND water_intake.timestamp >= days.day
+        AND water_intake.timestamp < days.day + interval '1 day'
+    GROUP BY days.day
+    ORDER BY days.day
+"""
+
+# Забрать наступившие напоминания на отправку. SKIP LOCKED пропускает строки,
+# которые в этот момент забирает другой узел, вместо ожидания его транзакции.
+# Забранные раньше $3 и так и не отправленные (узел упал посреди пачки)
+# забираются снова. Распределенные догоном ждут своего send_after.
+POSTGRES_CLAIM_REMINDERS = """
+    UPDATE reminders SET status = 'sending', claimed_at = $1, claimed_by = $4
+    WHERE id IN (
+        SELECT id FROM reminders
+        WHERE (status = 'pending' AND scheduled_time <= $1 AND (send_after IS NULL OR send_after <= $1))
+           OR (status = 'sending' AND claimed_at < $3)
+        ORDER BY scheduled_time
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *
+"""
+
+# Перенос пачки завершенных и устаревших напоминаний в архив одним запросом
+POSTGRES_ARCHIVE_REMINDERS = """
+    WITH moved AS (
+        DELETE FROM reminders
+        WHERE id IN (
+            SELECT id FROM reminders
+            WHERE status NOT IN ('pending', 'sending') OR scheduled_time < $1
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+    ), archived AS (
+        INSERT INTO reminders_archive
+            (id, user_id, scheduled_time, reminder_type, status, attempt_number, created_at)
+        SELECT id, user_id, scheduled_time, reminder_type,
+               CASE WHEN status IN ('pending', 'sending') THEN 'expired' ELSE status END,
+               attempt_number, created_at
+        FROM moved
+        ON CONFLICT (id) DO UPDATE SET status = EXCLUDED.status, archived_at = EXCLUDED.archived_at
+        RETURNING 1
+    )
+    SELECT count(*) FROM archived
+"""
+
+# Догон пропущенных напоминаний (см. CATCH_UP_* выше). Узлы разбирают
+# пропущенные по очереди: блокировка держится до конца транзакции догона.
+POSTGRES_CATCH_UP_LOCK = "SELECT pg_try_advisory_xact_lock(hashtext('reminders_catch_up'))"
 
+POSTGRES_CATCH_UP_PEER_CLAIMS = """
+    SELECT EXISTS (SELECT 1 FROM reminders WHERE claimed_at >= $1 AND claimed_by <> $2)
+"""
+
+POSTGRES_CATCH_UP_EXPIRE_REMINDERS = """
+    UPDATE reminders SET status = 'expired'
+    WHERE status = 'pending' AND scheduled_time < $1
+"""
+
+POSTGRES_CATCH_UP_MERGE_REMINDERS = """
+    UPDATE reminders SET status = 'suppressed'
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id
+                ORDER BY reminder_type IN ('regular', 'water_reminder', 'follow_up'), scheduled_time DESC, id DESC
+            ) AS position
+            FROM reminders
+            WHERE status = 'pending' AND scheduled_time <= $1
+        ) AS ranked
+        WHERE position > 1
+    )
+"""
+
+POSTGRES_CATCH_UP_SPREAD_REMINDERS = """
+    UPDATE reminders
+    SET send_after = $1 + make_interval(secs => ranked.position * $2::float8 / ranked.total)
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY scheduled_time, id) - 1 AS position, COUNT(*) OVER () AS total
+        FROM reminders
+        WHERE status = 'pending' AND scheduled_time <= $1
+    ) AS ranked
+    WHERE reminders.id = ranked.id
+"""
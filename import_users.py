@@ -0,0 +1,209 @@
+"""
+Массовый импорт пользователей и истории приемов воды
+
+Переносит пользователей из другой системы напоминаний. Файлы CSV или JSONL
+(формат по расширению) читаются потоково и загружаются пачками по
+IMPORT_CHUNK_SIZE строк, каждая пачка - одна транзакция. На время загрузки
+индексы удаляются и в конце строятся заново. Для пользователей с
+включенными уведомлениями сразу создаются оставшиеся на сегодня напоминания.
+
+Поля файла пользователей: user_id, username, daily_goal,
+notifications_enabled, start_hour, end_hour (обязателен только user_id).
+Поля файла приемов: user_id, volume, timestamp, reminder_id. Время с
+часовым поясом (2026-10-19T10:00:00+03:00, ...Z) переводится в UTC, время
+без пояса считается уже заданным в UTC.
+
+Повторный импорт обновляет пользователей, но добавляет приемы и
+напоминания еще раз: повторяйте его без --intake и с --no-reminders.
+
+Запуск:
+    python import_users.py --users users.csv --intake intake.jsonl
+    python import_users.py --users users.jsonl --db water_reminder.db --no-reminders
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+from config import settings
+from src.database import db_manager
+from src.scheduler import scheduler
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Строки файла CSV или JSONL как словари"""
+    with open(path, encoding="utf-8", newline="") as file:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _value(row: Dict[str, Any], field: str, default: Any = None) -> Any:
+    """Значение поля; пустые строки CSV считаются отсутствующими"""
+    value = row.get(field)
+    return default if value in (None, "") else value
+
+
+def parse_user(row: Dict[str, Any]) -> tuple:
+    """Строка файла -> (user_id, username, daily_goal, notifications_enabled, start_hour, end_hour)"""
+    enabled = _value(row, "notifications_enabled", True)
+    if isinstance(enabled, str):
+        enabled = enabled.strip().lower() in TRUE_VALUES
+    start_hour = int(_value(row, "start_hour", settings.WORK_START_HOUR))
+    end_hour = int(_value(row, "end_hour", settings.WORK_END_HOUR))
+    if not (0 <= start_hour < end_hour <= 23):
+        raise ValueError(f"неверные часы напоминаний {start_hour}-{end_hour}")
+    return (
+        int(row["user_id"]),
+        _value(row, "username"),
+        int(_value(row, "daily_goal", settings.DAILY_GOAL_ML)),
+        int(bool(enabled)),
+        start_hour,
+        end_hour
+    )
+
+
+def parse_intake(row: Dict[str, Any]) -> tuple:
+    """Строка файла -> (user_id, volume, reminder_id, timestamp в UTC)"""
+    value = str(row["timestamp"])
+    timestamp = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    reminder_id = _value(row, "reminder_id")
+    return (
+        int(row["user_id"]),
+        int(row["volume"]),
+        int(reminder_id) if reminder_id is not None else None,
+        timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+
+def chunks(path: str, parse, chunk_size: int) -> Iterator[List[tuple]]:
+    """Разобранные строки файла пачками по chunk_size"""
+    chunk = []
+    for line_number, row in enumerate(read_rows(path), start=1):
+        try:
+            chunk.append(parse(row))
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"{path}, запись {line_number}: {error!r}") from None
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportProgress:
+    """Счетчик загруженных строк и скорость загрузки"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows: int):
+        self.rows += rows
+        print(f"  {self.name}: {self.rows} строк, {self.rate():.0f} строк/с")
+
+    def rate(self) -> float:
+        return self.rows / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self) -> str:
+        return f"{self.name}: {self.rows} строк за {time.perf_counter() - self.started:.1f} с ({self.rate():.0f} строк/с)"
+
+
+def today_reminders(users: List[tuple], now: datetime) -> List[tuple]:
+    """Оставшиеся на сегодня напоминания (user_id, scheduled_time, reminder_type) для пачки пользователей"""
+    today = now.date()
+    schedules = {}
+    reminders = []
+    for user_id, _, _, enabled, start_hour, end_hour in users:
+        if not enabled:
+            continue
+        # У большинства пользователей одинаковые часы - расписание считаем один раз
+        window = (start_hour, end_hour)
+        if window not in schedules:
+            schedules[window] = [
+                scheduled for scheduled in (
+                    datetime.combine(today, reminder_time)
+                    for reminder_time in scheduler._create_reminder_schedule(start_hour, end_hour)
+                )
+                if scheduled > now
+            ]
+        reminders.extend((user_id, scheduled, 'water_reminder') for scheduled in schedules[window])
+    return reminders
+
+
+async def run_import(args):
+    """Загрузка файлов"""
+    if args.db:
+        db_manager.db_path = args.db
+    await db_manager.init_db()
+
+    results = []
+    await db_manager.drop_indexes()
+    try:
+        if args.users:
+            users = ImportProgress("пользователи")
+            reminders = ImportProgress("напоминания")
+            now = datetime.now()
+            for chunk in chunks(args.users, parse_user, args.chunk_size):
+                await db_manager.import_users(chunk)
+                users.add(len(chunk))
+                if not args.no_reminders:
+                    scheduled = today_reminders(chunk, now)
+                    if scheduled:
+                        await db_manager.create_reminders(scheduled)
+                        reminders.rows += len(scheduled)
+            results.append(users.summary())
+            if not args.no_reminders:
+                results.append(reminders.summary())
+
+        if args.intake:
+            intake = ImportProgress("приемы воды")
+            for chunk in chunks(args.intake, parse_intake, args.chunk_size):
+                await db_manager.import_water_intake(chunk)
+                intake.add(len(chunk))
+            results.append(intake.summary())
+    finally:
+        started = time.perf_counter()
+        await db_manager.rebuild_indexes()
+        results.append(f"индексы: {time.perf_counter() - started:.1f} с")
+        await db_manager.close()
+
+    print("Импорт завершен")
+    for line in results:
+        print(f"  {line}")
+
+
+def main():
+    """Запуск импорта"""
+    parser = argparse.ArgumentParser(description="Массовый импорт пользователей и истории приемов воды")
+    parser.add_argument("--users", help="файл пользователей (.csv или .jsonl)")
+    parser.add_argument("--intake", help="файл истории приемов воды (.csv или .jsonl)")
+    parser.add_argument("--db", help="путь к базе SQLite (по умолчанию DATABASE_PATH)")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE,
+                        help="строк в одной транзакции")
+    parser.add_argument("--no-reminders", action="store_true",
+                        help="не создавать напоминания на сегодня")
+    args = parser.parse_args()
+    if not args.users and not args.intake:
+        parser.error("нужен хотя бы один из --users и --intake")
+
+    try:
+        asyncio.run(run_import(args))
+    except ValueError as error:
+        sys.exit(f"Ошибка импорта: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,7 @@
 import asyncio
 import logging
 import sys
-import os
 
-from src.bot import bot, dp, on_startup, on_shutdown
 from config import settings
 
 # Настройка логирования
@@ -36,13 +34,22 @@ logger = logging.getLogger(__name__)
 
 async def main():
     """Основная функция"""
+    from src.bot import load, startup
+    
+    # aiogram и обработчики (самая долгая часть запуска) импортируются в
+    # потоке, пока цикл событий открывает БД и проигрывает журнал приемов
+    bot_import = asyncio.ensure_future(asyncio.to_thread(load))
+    bot = None
     try:
-        # Небольшая задержка для избежания конфликтов
-        await asyncio.sleep(2)
+        await startup.prepare()
+        bot, dp = await bot_import
+        
+        # Вместо фиксированной паузы - проверка доступности Bot API
+        await startup.wait_ready(bot)
         
         # Регистрируем функции запуска и остановки
-        dp.startup.register(on_startup)
-        dp.shutdown.register(on_shutdown)
+        dp.startup.register(startup.on_startup)
+        dp.shutdown.register(startup.on_shutdown)
         
         # Запускаем бота
         await dp.start_polling(bot)
@@ -50,7 +57,8 @@ async def main():
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
     finally:
-        await bot.session.close()
+        if bot is not None:
+            await bot.session.close()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,27 @@
 """
 Основной модуль бота WaterReminder
 """
-from .bot import bot, dp
+import importlib
+
 from .startup import on_startup, on_shutdown
 
-__all__ = ['bot', 'dp', 'on_startup', 'on_shutdown']
+__all__ = ['bot', 'dp', 'on_startup', 'on_shutdown', 'load']
+
+
+def load():
+    """Импортировать бота и диспетчер (aiogram и все обработчики)
+
+    Подмодуль bot называется так же, как объект бота, поэтому после импорта
+    атрибуты пакета явно переназначаются на бота и диспетчер.
+    """
+    module = importlib.import_module(f"{__name__}.bot")
+    globals().update(bot=module.bot, dp=module.dp)
+    return module.bot, module.dp
 
 
+def __getattr__(name: str):
+    # Бот и диспетчер тянут aiogram и обработчики: загружаем их при первом
+    # обращении, чтобы main.py мог открыть БД параллельно с этим импортом
+    if name in ('bot', 'dp'):
+        return dict(zip(('bot', 'dp'), load()))[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
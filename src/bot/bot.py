@@ -3,10 +3,14 @@
 """
 import logging
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import settings
-from src.handlers import commands_router, callbacks_router
+from src.handlers import commands_router, callbacks_router, admin_router
+from src.metrics import metrics, profiler, MetricsMiddleware, SlowUpdateMiddleware
+from .lifecycle import lifecycle
 
 # Настройка логирования
 logging.basicConfig(
@@ -16,11 +20,25 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Создаем бота и диспетчер
-bot = Bot(token=settings.BOT_TOKEN)
+if settings.TELEGRAM_API_URL:
+    # Собственный сервер Bot API (telegram-bot-api) вместо api.telegram.org
+    bot = Bot(token=settings.BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL)))
+else:
+    bot = Bot(token=settings.BOT_TOKEN)
 dp = Dispatcher(storage=MemoryStorage())
 
 # Регистрируем роутеры
 dp.include_router(commands_router)
 dp.include_router(callbacks_router)
+dp.include_router(admin_router)
 
+# Замер времени обработчиков (распространяется на вложенные роутеры)
+metrics_middleware = MetricsMiddleware(metrics)
+dp.message.middleware(metrics_middleware)
+dp.callback_query.middleware(metrics_middleware)
 
+# Учет обновлений в обработке для упорядоченной остановки (первой, чтобы охватить все)
+dp.update.outer_middleware(lifecycle)
+
+# Захват медленных обновлений (включается настройкой или командой /profile)
+dp.update.outer_middleware(SlowUpdateMiddleware(profiler))
@@ -0,0 +1,116 @@
+"""
+Жизненный цикл бота: фоновые задачи и обновления в обработке
+"""
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Set
+
+from config import settings
+
+if TYPE_CHECKING:
+    # Модуль нужен startup до загрузки aiogram
+    from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+class LifecycleManager:
+    """Учет фоновых задач и обновлений в обработке для упорядоченной остановки
+
+    Подключается outer-middleware диспетчера: aiogram запускает обработку
+    каждого обновления задачей без ссылки на нее и вызывает shutdown, не
+    дожидаясь этих задач, поэтому обновления в обработке считаются здесь.
+    Фоновые задачи бота запускаются через spawn() и отменяются при остановке.
+    Все шаги остановки укладываются в общий срок SHUTDOWN_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.last_update_id: Optional[int] = None
+        self._in_flight: Set[int] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._deadline: Optional[float] = None
+
+    @property
+    def in_flight(self) -> int:
+        """Количество обновлений в обработке"""
+        return len(self._in_flight)
+
+    def spawn(self, name: str, coro: Awaitable) -> asyncio.Task:
+        """Запустить фоновую задачу под учетом; по завершении она снимается с учета"""
+        task = asyncio.create_task(coro, name=name)
+        self.tasks[name] = task
+
+        def _forget(done: asyncio.Task):
+            if self.tasks.get(name) is done:
+                del self.tasks[name]
+
+        task.add_done_callback(_forget)
+        return task
+
+    async def __call__(
+        self,
+        handler: Callable[['Update', Dict[str, Any]], Awaitable[Any]],
+        event: 'Update',
+        data: Dict[str, Any]
+    ) -> Any:
+        update_id = event.update_id
+        self._in_flight.add(update_id)
+        self._idle.clear()
+        if self.last_update_id is None or update_id > self.last_update_id:
+            self.last_update_id = update_id
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(update_id)
+            if not self._in_flight:
+                self._idle.set()
+
+    def begin_shutdown(self):
+        """Начать отсчет срока остановки"""
+        self._deadline = asyncio.get_running_loop().time() + settings.SHUTDOWN_TIMEOUT_SECONDS
+
+    def remaining(self) -> float:
+        """Сколько секунд осталось до конца срока остановки"""
+        if self._deadline is None:
+            return float(settings.SHUTDOWN_TIMEOUT_SECONDS)
+        return max(self._deadline - asyncio.get_running_loop().time(), 0.0)
+
+    async def drain_updates(self) -> bool:
+        """Дождаться обработки уже полученных обновлений (не дольше срока остановки)"""
+        # Задачи обновлений из последнего getUpdates должны успеть начаться
+        await asyncio.sleep(0)
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.remaining())
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown deadline reached with {self.in_flight} updates in flight")
+            return False
+
+    async def confirm_updates(self, bot) -> None:
+        """Подтвердить Telegram обработанные обновления
+
+        aiogram подтверждает пачку getUpdates только следующим запросом, и без
+        этого последняя пачка пришла бы повторно после перезапуска. Обновления,
+        не обработанные до срока, не подтверждаются и придут снова.
+        """
+        if self.last_update_id is None:
+            return
+        offset = min(self._in_flight) if self._in_flight else self.last_update_id + 1
+        try:
+            await bot.get_updates(offset=offset, limit=1, timeout=0)
+        except Exception as e:
+            logger.warning(f"Failed to confirm updates before shutdown: {e}")
+
+    async def cancel_tasks(self):
+        """Отменить фоновые задачи бота и дождаться их завершения"""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+
+
+# Глобальный экземпляр менеджера жизненного цикла
+lifecycle = LifecycleManager()
@@ -1,36 +1,168 @@
 """
 Функции запуска и остановки бота
 """
+import asyncio
+import importlib
 import logging
-from src.database import db_manager
+import signal
+import time
+from datetime import datetime, timedelta
+
+from src.database import db_manager, intake_buffer
 from src.scheduler import scheduler
+from src.metrics import metrics, profiler, watchdog
+from config import settings
+from .lifecycle import lifecycle
 
 logger = logging.getLogger(__name__)
 
+# Момент импорта модуля - начало запуска процесса
+_started = time.perf_counter()
 
-async def on_startup():
-    """Функция запуска бота"""
+_prepared = False
+
+
+async def prepare():
+    """Подготовка хранилища: БД и журнал приемов воды
+
+    Не зависит от aiogram, поэтому main.py выполняет ее параллельно с
+    импортом бота и обработчиков. Повторный вызов ничего не делает.
+    """
+    global _prepared
+    if _prepared:
+        return
     print("Starting WaterReminder bot...")
     
     # Инициализируем базу данных
     await db_manager.init_db()
     print("Database initialized")
     
+    # Восстанавливаем журнал приемов воды и запускаем отложенную запись
+    await intake_buffer.start()
+    print("Intake buffer started")
+    _prepared = True
+
+
+async def wait_ready(bot) -> None:
+    """Дождаться доступности Bot API вместо фиксированной паузы перед опросом
+
+    Повторяет getMe с растущей паузой до STARTUP_READY_TIMEOUT_SECONDS.
+    Ответ кэшируется в bot.me(), и start_polling не запрашивает его заново.
+    """
+    from aiogram.exceptions import TelegramUnauthorizedError
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.STARTUP_READY_TIMEOUT_SECONDS
+    delay = 0.1
+    while True:
+        try:
+            await bot.me()
+            return
+        except TelegramUnauthorizedError:
+            # Неверный токен - ждать бессмысленно
+            raise
+        except Exception as e:
+            if loop.time() + delay > deadline:
+                raise
+            logger.warning(f"Bot API is not ready ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+async def warm_up():
+    """Прогрев после запуска, в фоне и без задержки первого ответа
+
+    Профили и итоги дня пользователей, которым напоминания придут в
+    ближайшие STARTUP_WARM_UP_HORIZON_MINUTES (первые нажатия после
+    перезапуска будут от них), и отложенный импорт когортной аналитики,
+    если у бота есть администраторы.
+    """
+    started = time.perf_counter()
+    try:
+        horizon = datetime.now() + timedelta(minutes=settings.STARTUP_WARM_UP_HORIZON_MINUTES)
+        reminders = await db_manager.get_pending_reminders(current_time=horizon)
+        user_ids = list(dict.fromkeys(reminder.user_id for reminder in reminders))
+        user_ids = user_ids[:settings.STARTUP_WARM_UP_MAX_USERS]
+        if user_ids:
+            await db_manager.get_daily_progress(user_ids, datetime.utcnow().date())
+            # По одному, чтобы не занимать пулы чтения перед запросами пользователей
+            for user_id in user_ids:
+                await db_manager.get_user(user_id)
+
+        if settings.ADMIN_IDS:
+            await asyncio.to_thread(importlib.import_module, "src.stats.cohort")
+
+        logger.info(f"Warm-up finished: {len(user_ids)} users in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+
+async def on_startup():
+    """Функция запуска бота"""
+    await prepare()
+    
     # Запускаем планировщик
     await scheduler.start()
     print("Scheduler started")
     
-    print("WaterReminder bot started successfully!")
+    # Эндпоинт /metrics (только если метрики включены)
+    if metrics.enabled:
+        await metrics.start_server()
+        print("Metrics endpoint started")
+    
+    # Сторож блокировок цикла событий и загрузки пула потоков
+    if settings.LOOP_WATCHDOG_ENABLED:
+        await watchdog.start()
+        print("Loop watchdog started")
+    
+    # Профилировщик по сигналам: SIGUSR1 - вкл/выкл сэмплирование, SIGUSR2 - выгрузка
+    if hasattr(signal, "SIGUSR1"):
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, profiler.toggle)
+        loop.add_signal_handler(signal.SIGUSR2, profiler.dump)
+    
+    # Прогрев кэшей не задерживает начало опроса
+    if settings.STARTUP_WARM_UP_ENABLED:
+        lifecycle.spawn('warm_up', warm_up())
+    
+    print(f"WaterReminder bot started successfully! ({(time.perf_counter() - _started) * 1000:.0f} ms)")
 
 
-async def on_shutdown():
-    """Функция остановки бота"""
+async def on_shutdown(bot=None):
+    """Функция остановки бота
+
+    Опрос к этому моменту уже остановлен, новые обновления не поступают.
+    Полученные обновления дообрабатываются, а планировщик дописывает текущее
+    напоминание (параллельно, в пределах SHUTDOWN_TIMEOUT_SECONDS); затем
+    записываются буферы и закрывается БД.
+    """
+    global _prepared
     print("Stopping WaterReminder bot...")
+    lifecycle.begin_shutdown()
     
-    # Останавливаем планировщик
-    await scheduler.stop()
+    # Дообработка полученных обновлений и остановка планировщика: забранные,
+    # но не отправленные напоминания возвращаются в ожидание, ожидающие
+    # ответа сохраняются в контрольную точку
+    await asyncio.gather(lifecycle.drain_updates(), scheduler.stop(lifecycle.remaining()))
     print("Scheduler stopped")
     
+    # Подтверждаем обработанные обновления, чтобы Telegram не прислал их снова
+    if bot is not None:
+        await lifecycle.confirm_updates(bot)
+    
+    # Фоновые задачи бота (прогрев кэшей)
+    await lifecycle.cancel_tasks()
+    
+    # Сбрасываем накопленные приемы воды в БД
+    await intake_buffer.stop()
+    print("Intake buffer flushed")
+    
+    # Дожидаемся запросов в пулах потоков БД
+    await db_manager.close()
+    _prepared = False
+    
+    await metrics.stop_server()
+    await watchdog.stop()
+    profiler.stop()
+    
     print("WaterReminder bot stopped")
-
-
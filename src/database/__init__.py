@@ -1,10 +1,28 @@
 """
 Модули для работы с базой данных
 """
+from config import settings
 from .manager import DatabaseManager
 from .models import User, WaterIntake, Reminder, MotivationLog
+from .storage import Storage
+from .cache import CachedStorage, create_cache
+from .intake_buffer import IntakeBuffer
 
-# Глобальный экземпляр менеджера БД
-db_manager = DatabaseManager()
 
+def create_storage() -> Storage:
+    """Создать хранилище по STORAGE_BACKEND (с кэшем, если задан CACHE_BACKEND)"""
+    if settings.STORAGE_BACKEND == "postgres":
+        from .postgres import PostgresStorage
+        storage = PostgresStorage()
+    else:
+        storage = DatabaseManager()
+    
+    cache = create_cache()
+    return CachedStorage(storage, cache) if cache else storage
 
+
+# Глобальный экземпляр хранилища
+db_manager = create_storage()
+
+# Буфер отложенной записи приемов воды
+intake_buffer = IntakeBuffer(db_manager)
@@ -0,0 +1,163 @@
+"""
+Бэкенды выполнения запросов к SQLite
+"""
+import asyncio
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import settings
+from .executors import WorkloadExecutors, BATCH
+
+
+class ExecutorBackend:
+    """Соединение на каждый запрос в пулах потоков по классам нагрузки"""
+
+    name = "executor"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.executors = WorkloadExecutors()
+
+    def executor_for(self, workload: str) -> Optional[ThreadPoolExecutor]:
+        """Пул класса нагрузки, если он уже создан (для мониторинга)"""
+        return self.executors.peek(workload)
+
+    async def run(self, func: Callable[[sqlite3.Connection], Any], workload: str) -> Any:
+        """Выполнить func(conn) в пуле потоков класса нагрузки"""
+        if workload == BATCH:
+            await self.executors.yield_to_interactive()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executors.get(workload), self._call, func)
+
+    def _call(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Открыть соединение, выполнить функцию в транзакции и закрыть соединение"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                return func(conn)
+        finally:
+            conn.close()
+
+    def close(self):
+        """Дождаться выполняющихся запросов и остановить пулы"""
+        self.executors.shutdown()
+
+
+# Очередь потока соединения упорядочена по сроку выполнения: интерактивные
+# запросы - в порядке поступления, а фоновым (BATCH) срок отодвигается на
+# DB_BATCH_DEFER_MS. Фон уступает интерактивным запросам, но не дольше этого:
+# потом он идет раньше более новых интерактивных и не голодает под нагрузкой.
+_JOB, _STOP = 0, 1
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: BaseException = None):
+    """Завершить future в цикле событий (если его еще не отменили)"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class ConnectionThreadBackend:
+    """Одно постоянное соединение в выделенном потоке с очередью запросов
+
+    Так устроен aiosqlite: запрос - это элемент очереди и future, без
+    ThreadPoolExecutor, без открытия соединения и разбора схемы на каждый
+    вызов. Запросы выполняются строго по одному; фоновые (BATCH) уступают
+    очередь интерактивным не дольше DB_BATCH_DEFER_MS.
+    """
+
+    name = "thread"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self.batch_defer = settings.DB_BATCH_DEFER_MS / 1000
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def executor_for(self, workload: str) -> Optional[ThreadPoolExecutor]:
+        """Пулов потоков у бэкенда нет"""
+        return None
+
+    @property
+    def queue_depth(self) -> int:
+        """Запросы, ожидающие потока соединения"""
+        return self._queue.qsize()
+
+    async def run(self, func: Callable[[sqlite3.Connection], Any], workload: str) -> Any:
+        """Поставить func(conn) в очередь потока соединения и дождаться результата"""
+        self._ensure_thread()
+        future = asyncio.get_running_loop().create_future()
+        due = time.monotonic() + (self.batch_defer if workload == BATCH else 0.0)
+        self._queue.put((_JOB, due, next(self._counter), func, future))
+        return await future
+
+    def _ensure_thread(self):
+        """Запустить поток соединения при первом запросе"""
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="db-connection", daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        """Цикл потока соединения"""
+        conn = None
+        conn_path = None
+
+        while True:
+            _, _, _, func, future = self._queue.get()
+            if func is None:
+                break
+            if future.cancelled():
+                continue
+
+            try:
+                if conn is None or conn_path != self.db_path:
+                    if conn is not None:
+                        conn.close()
+                    conn_path = self.db_path
+                    conn = sqlite3.connect(conn_path)
+                # Запросы настраивают row_factory под себя
+                conn.row_factory = None
+                with conn:
+                    result = func(conn)
+            except BaseException as error:
+                future.get_loop().call_soon_threadsafe(_resolve, future, None, error)
+            else:
+                future.get_loop().call_soon_threadsafe(_resolve, future, result)
+
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        """Выполнить оставшиеся запросы и остановить поток"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put((_STOP, 0.0, next(self._counter), None, None))
+        thread.join()
+
+
+BACKENDS = {
+    ExecutorBackend.name: ExecutorBackend,
+    ConnectionThreadBackend.name: ConnectionThreadBackend,
+}
+
+
+def create_backend(name: str, db_path: str):
+    """Создать бэкенд по имени из настроек"""
+    try:
+        return BACKENDS[name](db_path)
+    except KeyError:
+        raise ValueError(f"Неизвестный бэкенд БД: {name}") from None
@@ -0,0 +1,373 @@
+"""
+Общий кэш профилей и дневных итогов перед хранилищем
+"""
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from datetime import datetime, date
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from src.metrics import metrics
+from .models import User
+from .storage import Storage
+
+
+class CacheClient(ABC):
+    """Клиент кэша с интерфейсом подмножества Redis (строковые значения)"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Значение по ключу или None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int):
+        """Записать значение на ttl секунд"""
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        """Удалить ключи"""
+
+    async def close(self):
+        """Закрыть соединение"""
+
+
+class InMemoryCache(CacheClient):
+    """Кэш в памяти процесса - замена Redis для одного узла и проверок"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class RedisCache(CacheClient):
+    """Кэш в Redis (или совместимом сервере), общий для всех узлов"""
+
+    def __init__(self, url: str = None):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError(
+                "Для CACHE_BACKEND=redis нужен пакет redis: "
+                "pip install -r requirements-postgres.txt"
+            ) from None
+        self.client = redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_cache(name: str = None) -> Optional[CacheClient]:
+    """Клиент кэша по CACHE_BACKEND (None - кэш выключен)"""
+    name = name or settings.CACHE_BACKEND
+    if name == "memory":
+        return InMemoryCache()
+    if name == "redis":
+        return RedisCache()
+    return None
+
+
+def _dump_user(user: Optional[User]) -> str:
+    """User -> JSON"""
+    if user is None:
+        return "null"
+    data = asdict(user)
+    data['created_at'] = user.created_at.isoformat() if user.created_at else None
+    data['last_motivation_date'] = user.last_motivation_date.isoformat() if user.last_motivation_date else None
+    return json.dumps(data)
+
+
+def _load_user(raw: str) -> Optional[User]:
+    """JSON -> User"""
+    data = json.loads(raw)
+    if data is None:
+        return None
+    if data['created_at']:
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+    if data['last_motivation_date']:
+        data['last_motivation_date'] = date.fromisoformat(data['last_motivation_date'])
+    return User(**data)
+
+
+class CachedStorage(Storage):
+    """Сквозной кэш перед хранилищем
+
+    get_user, get_daily_intake и get_weekly_stats сначала смотрят в кэш
+    (ключи по пользователю и дню), в хранилище идут только промахи.
+    Одновременные промахи по одному ключу в процессе объединяются в один
+    запрос. Записи, меняющие закэшированные данные, удаляют ключи после
+    записи в хранилище; CACHE_TTL_SECONDS ограничивает устаревание, если
+    запись прошла в обход кэша.
+    """
+
+    def __init__(self, storage: Storage, cache: CacheClient, ttl: int = None):
+        self.storage = storage
+        self.cache = cache
+        self.ttl = ttl or settings.CACHE_TTL_SECONDS
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        # Методы, которых нет в интерфейсе (например, run_sync), - у хранилища
+        return getattr(self.storage, name)
+
+    @property
+    def db_path(self) -> str:
+        """Путь к файлу базы SQLite"""
+        return self.storage.db_path
+
+    @db_path.setter
+    def db_path(self, db_path: str):
+        self.storage.db_path = db_path
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"water:user:{user_id}"
+
+    @staticmethod
+    def _intake_key(user_id: int, day: date) -> str:
+        return f"water:intake:{user_id}:{day.isoformat()}"
+
+    @staticmethod
+    def _weekly_key(user_id: int) -> str:
+        return f"water:weekly:{user_id}:{datetime.utcnow().date().isoformat()}"
+
+    def _intake_keys(self, user_id: int) -> List[str]:
+        """Ключи, которые меняет новый прием воды (день по UTC, как в журнале приемов)"""
+        return [self._intake_key(user_id, datetime.utcnow().date()), self._weekly_key(user_id)]
+
+    async def _read_through(self, kind: str, key: str, load: Callable[[], Awaitable[Any]],
+                            dump: Callable[[Any], str], parse: Callable[[str], Any]) -> Any:
+        """Значение из кэша, при промахе - из хранилища с записью в кэш"""
+        raw = await self.cache.get(key)
+        if raw is not None:
+            metrics.inc('water_cache_requests_total', kind=kind, result='hit')
+            return parse(raw)
+
+        metrics.inc('water_cache_requests_total', kind=kind, result='miss')
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await load()
+            await self.cache.set(key, dump(value), self.ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Ошибку получат ожидающие; если их нет, не ругаемся на необработанное исключение
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def close(self):
+        await self.cache.close()
+        await self.storage.close()
+
+    async def init_db(self):
+        await self.storage.init_db()
+
+    # Закэшированные чтения
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        return await self._read_through(
+            'user', self._user_key(user_id), lambda: self.storage.get_user(user_id), _dump_user, _load_user
+        )
+
+    async def get_daily_intake(self, user_id: int, target_date: date = None) -> int:
+        target_date = target_date or datetime.utcnow().date()
+        return await self._read_through(
+            'daily_intake', self._intake_key(user_id, target_date),
+            lambda: self.storage.get_daily_intake(user_id, target_date), str, int
+        )
+
+    async def get_weekly_stats(self, user_id: int) -> List[Dict[str, Any]]:
+        return await self._read_through(
+            'weekly_stats', self._weekly_key(user_id),
+            lambda: self.storage.get_weekly_stats(user_id), json.dumps, json.loads
+        )
+
+    # Записи с инвалидацией
+
+    async def create_user(self, user_id: int, username: str = None, daily_goal: int = 2000) -> User:
+        user = await self.storage.create_user(user_id, username, daily_goal)
+        await self.cache.delete(self._user_key(user_id))
+        return user
+
+    async def update_user_goal(self, user_id: int, daily_goal: int):
+        await self.storage.update_user_goal(user_id, daily_goal)
+        await self.cache.delete(self._user_key(user_id))
+
+    async def update_user_notifications(self, user_id: int, enabled: bool):
+        await self.storage.update_user_notifications(user_id, enabled)
+        await self.cache.delete(self._user_key(user_id))
+
+    async def update_user_time_settings(self, user_id: int, start_hour: int, end_hour: int):
+        await self.storage.update_user_time_settings(user_id, start_hour, end_hour)
+        await self.cache.delete(self._user_key(user_id))
+
+    async def update_last_motivation_date(self, user_id: int):
+        await self.storage.update_last_motivation_date(user_id)
+        await self.cache.delete(self._user_key(user_id))
+
+    async def delete_user(self, user_id: int):
+        await self.storage.delete_user(user_id)
+        await self.cache.delete(self._user_key(user_id), *self._intake_keys(user_id))
+
+    async def add_water_intake(self, user_id: int, volume: int, reminder_id: int = None) -> int:
+        intake_id = await self.storage.add_water_intake(user_id, volume, reminder_id)
+        await self.cache.delete(*self._intake_keys(user_id))
+        return intake_id
+
+    async def add_water_intake_batch(self, intakes: List[tuple], last_seq: int):
+        await self.storage.add_water_intake_batch(intakes, last_seq)
+        keys = {key for user_id in {intake[0] for intake in intakes} for key in self._intake_keys(user_id)}
+        if keys:
+            await self.cache.delete(*keys)
+
+    async def import_users(self, users: List[tuple]):
+        await self.storage.import_users(users)
+        keys = {self._user_key(user[0]) for user in users}
+        if keys:
+            await self.cache.delete(*keys)
+
+    async def import_water_intake(self, intakes: List[tuple]):
+        await self.storage.import_water_intake(intakes)
+        # Исторические приемы меняют итоги своих дней, а не только сегодняшнего
+        keys = {key for user_id in {intake[0] for intake in intakes} for key in self._intake_keys(user_id)}
+        keys.update(
+            self._intake_key(user_id, date.fromisoformat(str(timestamp)[:10]))
+            for user_id, _, _, timestamp in intakes
+        )
+        if keys:
+            await self.cache.delete(*keys)
+
+    # Остальное - без кэша
+
+    async def get_user_time_settings(self, user_id: int) -> tuple:
+        return await self.storage.get_user_time_settings(user_id)
+
+    async def is_notifications_enabled(self, user_id: int) -> bool:
+        return await self.storage.is_notifications_enabled(user_id)
+
+    async def get_intake_journal_seq(self) -> int:
+        return await self.storage.get_intake_journal_seq()
+
+    async def get_intake_history(self, user_id: int, limit: int = 10):
+        return await self.storage.get_intake_history(user_id, limit)
+
+    def iter_intake(self, user_id: int, since: date = None, until: date = None, chunk_size: int = None):
+        return self.storage.iter_intake(user_id, since, until, chunk_size)
+
+    def iter_intake_rows(self, since: date = None, chunk_size: int = None):
+        return self.storage.iter_intake_rows(since, chunk_size)
+
+    def iter_sent_reminder_rows(self, since: date = None, chunk_size: int = None):
+        return self.storage.iter_sent_reminder_rows(since, chunk_size)
+
+    async def get_user_goals(self) -> List[tuple]:
+        return await self.storage.get_user_goals()
+
+    async def get_daily_progress(self, user_ids: List[int], target_date: date) -> Dict[int, tuple]:
+        return await self.storage.get_daily_progress(user_ids, target_date)
+
+    async def get_user_intake_history(self, user_id: int, limit: int = 10):
+        return await self.storage.get_user_intake_history(user_id, limit)
+
+    async def create_reminder(self, user_id: int, scheduled_time: datetime, reminder_type: str = "regular") -> int:
+        return await self.storage.create_reminder(user_id, scheduled_time, reminder_type)
+
+    async def get_pending_reminders(self, user_id: int = None, current_time: datetime = None):
+        return await self.storage.get_pending_reminders(user_id, current_time)
+
+    async def claim_due_reminders(self, current_time: datetime, limit: int, lease_before: datetime = None):
+        return await self.storage.claim_due_reminders(current_time, limit, lease_before)
+
+    async def mark_reminder_completed(self, reminder_id: int):
+        await self.storage.mark_reminder_completed(reminder_id)
+
+    async def mark_reminders_suppressed(self, reminder_ids: List[int]):
+        await self.storage.mark_reminders_suppressed(reminder_ids)
+
+    async def renew_reminder_claims(self, reminder_ids: List[int], claimed_at: datetime) -> List[int]:
+        return await self.storage.renew_reminder_claims(reminder_ids, claimed_at)
+
+    async def release_reminders(self, reminder_ids: List[int]):
+        await self.storage.release_reminders(reminder_ids)
+
+    async def catch_up_reminders(self, now: datetime, stale_before: datetime, ramp_seconds: int,
+                                 lease_before: datetime = None) -> Optional[Dict[str, int]]:
+        return await self.storage.catch_up_reminders(now, stale_before, ramp_seconds, lease_before)
+
+    async def mark_reminder_answered(self, reminder_id: int) -> bool:
+        return await self.storage.mark_reminder_answered(reminder_id)
+
+    async def get_reminder_slot_stats(self, user_id: int) -> Dict[int, tuple]:
+        return await self.storage.get_reminder_slot_stats(user_id)
+
+    async def mark_reminder_skipped(self, reminder_id: int):
+        await self.storage.mark_reminder_skipped(reminder_id)
+
+    async def postpone_reminder(self, reminder_id: int, minutes: int):
+        await self.storage.postpone_reminder(reminder_id, minutes)
+
+    async def delete_pending_reminders(self, user_id: int):
+        await self.storage.delete_pending_reminders(user_id)
+
+    async def create_follow_up_reminder(self, user_id: int, original_reminder_id: int, delay_minutes: int = 5):
+        return await self.storage.create_follow_up_reminder(user_id, original_reminder_id, delay_minutes)
+
+    async def create_follow_up_reminders(self, follow_ups: List[tuple]) -> None:
+        await self.storage.create_follow_up_reminders(follow_ups)
+
+    async def archive_reminders_batch(self, stale_before: datetime, batch_size: int = 500) -> int:
+        return await self.storage.archive_reminders_batch(stale_before, batch_size)
+
+    async def create_reminders(self, reminders: List[tuple]):
+        await self.storage.create_reminders(reminders)
+
+    async def drop_indexes(self):
+        await self.storage.drop_indexes()
+
+    async def rebuild_indexes(self):
+        await self.storage.rebuild_indexes()
+
+    async def log_motivation(self, user_id: int, message_type: str, message_text: str):
+        await self.storage.log_motivation(user_id, message_type, message_text)
+
+    async def get_recent_motivations(self, user_id: int, hours: int = 24) -> List[str]:
+        return await self.storage.get_recent_motivations(user_id, hours)
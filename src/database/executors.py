@@ -0,0 +1,66 @@
+"""
+Пулы потоков БД по классам нагрузки
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from config import settings
+
+# Классы нагрузки
+READ = "read"  # Чтения из обработчиков пользователей
+WRITE = "write"  # Записи из обработчиков пользователей
+BATCH = "batch"  # Планировщик, архивация, сброс буфера, инициализация
+
+INTERACTIVE = (READ, WRITE)
+
+
+class WorkloadExecutors:
+    """Отдельный пул потоков на каждый класс нагрузки
+
+    Всплеск записей планировщика больше не занимает потоки, нужные чтениям
+    из обработчиков: у каждого класса свой пул своего размера. Фоновая
+    нагрузка к тому же уступает интерактивной - пока в интерактивных пулах
+    есть очередь, отправка фоновой задачи откладывается (не дольше
+    DB_BATCH_DEFER_MS, чтобы фон не голодал).
+    """
+
+    def __init__(self):
+        self.sizes = {
+            READ: settings.DB_READ_WORKERS,
+            WRITE: settings.DB_WRITE_WORKERS,
+            BATCH: settings.DB_BATCH_WORKERS,
+        }
+        self.batch_defer = settings.DB_BATCH_DEFER_MS / 1000
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+
+    def get(self, workload: str) -> ThreadPoolExecutor:
+        """Пул для класса нагрузки (создается при первом обращении)"""
+        pool = self._pools.get(workload)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=self.sizes[workload], thread_name_prefix=f"db-{workload}")
+            self._pools[workload] = pool
+        return pool
+
+    def peek(self, workload: str) -> Optional[ThreadPoolExecutor]:
+        """Пул, если он уже создан (для мониторинга)"""
+        return self._pools.get(workload)
+
+    def interactive_backlog(self) -> int:
+        """Задачи, ожидающие свободного потока в интерактивных пулах"""
+        return sum(pool._work_queue.qsize() for name, pool in self._pools.items() if name in INTERACTIVE)
+
+    async def yield_to_interactive(self):
+        """Отложить фоновую задачу, пока интерактивные пулы разбирают очередь"""
+        if not self.interactive_backlog():
+            return
+        deadline = time.monotonic() + self.batch_defer
+        while self.interactive_backlog() and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+
+    def shutdown(self):
+        """Дождаться выполняющихся задач и остановить пулы"""
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=True)
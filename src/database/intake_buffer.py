@@ -0,0 +1,213 @@
+"""
+Буфер отложенной записи приемов воды
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, date
+from typing import Optional, List, Dict, Tuple
+
+from config import settings
+from .storage import Storage
+
+
+class IntakeBuffer:
+    """Буфер отложенной записи приемов воды
+
+    Прием воды сразу учитывается в дневном итоге пользователя в памяти и
+    дописывается в локальный журнал, а в БД попадает пачками фоновой
+    задачей. Каждая запись журнала имеет порядковый номер; номер последней
+    сохраненной записи фиксируется в той же транзакции, что и сами вставки,
+    поэтому повторное проигрывание журнала после сбоя не создает дублей.
+    """
+
+    def __init__(self, db: Storage, journal_path: str = None):
+        self.db = db
+        self.journal_path = journal_path or settings.INTAKE_JOURNAL_PATH
+        # (user_id, дата в UTC) -> суммарный объем за день
+        self.totals: Dict[Tuple[int, date], int] = {}
+        self._pending: List[Tuple[int, int, int, Optional[int], str]] = []
+        # Пачка, которая сейчас записывается в БД
+        self._flushing: List[Tuple[int, int, int, Optional[int], str]] = []
+        self._seq = 0
+        self._journal = None
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        """Запущен ли буфер"""
+        return self._journal is not None
+
+    async def start(self):
+        """Проиграть журнал после перезапуска и запустить фоновый сброс"""
+        if self.started:
+            return
+
+        last_seq = await self.db.get_intake_journal_seq()
+        entries = self._read_journal()
+        self._seq = max([last_seq] + [entry['seq'] for entry in entries])
+
+        # Записи, не успевшие попасть в БД до остановки
+        replay = [
+            (entry['user_id'], entry['volume'], entry['reminder_id'], entry['timestamp'])
+            for entry in entries if entry['seq'] > last_seq
+        ]
+        if replay:
+            await self.db.add_water_intake_batch(replay, self._seq)
+            print(f"Восстановлено приемов воды из журнала: {len(replay)}")
+
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Остановить фоновый сброс и записать остаток буфера"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    @staticmethod
+    def _journal_line(entry: Tuple[int, int, int, Optional[int], str]) -> str:
+        """Строка журнала для записи (seq, user_id, volume, reminder_id, timestamp)"""
+        seq, user_id, volume, reminder_id, timestamp = entry
+        return json.dumps({
+            'seq': seq,
+            'user_id': user_id,
+            'volume': volume,
+            'reminder_id': reminder_id,
+            'timestamp': timestamp
+        }) + "\n"
+
+    @staticmethod
+    def _sync_journal(journal):
+        """Дописать буфер файла журнала на диск"""
+        journal.flush()
+        if settings.INTAKE_JOURNAL_FSYNC:
+            os.fsync(journal.fileno())
+
+    def _rotate_journal(self):
+        """Заменить журнал новым, в котором только еще не сохраненные в БД записи
+
+        Под постоянной нагрузкой буфер не бывает пуст в момент сброса, поэтому
+        журнал переписывается после каждого сброса, а не только при пустом
+        буфере. Новый файл готовится рядом и подменяет старый через os.replace:
+        после сбоя на диске остается либо старый журнал, либо новый целиком.
+        Между шагами нет await, так что add() не пишет в заменяемый файл.
+        """
+        rotated_path = self.journal_path + ".tmp"
+        with open(rotated_path, 'w', encoding='utf-8') as rotated:
+            rotated.writelines(self._journal_line(entry) for entry in self._pending)
+            self._sync_journal(rotated)
+        self._journal.close()
+        os.replace(rotated_path, self.journal_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _read_journal(self) -> List[dict]:
+        """Прочитать журнал, пропуская недописанную последнюю строку"""
+        if not os.path.exists(self.journal_path):
+            return []
+
+        entries = []
+        with open(self.journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+        return entries
+
+    async def add(self, user_id: int, volume: int, reminder_id: int = None) -> int:
+        """Учесть прием воды и вернуть новый итог пользователя за сегодня"""
+        if not self.started:
+            # Буфер не запущен (например, в примерах) - пишем напрямую
+            await self.db.add_water_intake(user_id, volume, reminder_id)
+            if reminder_id:
+                await self.db.mark_reminder_answered(reminder_id)
+            return await self.db.get_daily_intake(user_id, datetime.utcnow().date())
+
+        now = datetime.utcnow()
+        key = (user_id, now.date())
+        if key not in self.totals:
+            # Формат и часовой пояс совпадают с CURRENT_TIMESTAMP в SQLite
+            stored = await self.db.get_daily_intake(user_id, now.date())
+            # Параллельный прием мог уже загрузить итог, пока мы ждали БД
+            self.totals.setdefault(key, stored)
+
+        self._seq += 1
+        entry = (self._seq, user_id, volume, reminder_id, now.strftime('%Y-%m-%d %H:%M:%S'))
+        self._journal.write(self._journal_line(entry))
+        self._sync_journal(self._journal)
+
+        self._pending.append(entry)
+        self.totals[key] += volume
+
+        if len(self._pending) >= settings.INTAKE_FLUSH_BATCH_SIZE:
+            self._flush_event.set()
+
+        return self.totals[key]
+
+    async def get_daily_total(self, user_id: int, target_date: date = None) -> int:
+        """Получить итог за день (дата в UTC) с учетом еще не сброшенных приемов"""
+        if target_date is None:
+            target_date = datetime.utcnow().date()
+
+        total = self.totals.get((user_id, target_date))
+        if total is not None:
+            return total
+        return await self.db.get_daily_intake(user_id, target_date)
+
+    def get_pending_intakes(self, user_id: int, target_date: date) -> List[Tuple[int, str]]:
+        """Приемы пользователя за день (дата в UTC), еще не записанные в БД: (объем, время), новые первыми"""
+        day = target_date.isoformat()
+        return [
+            (volume, timestamp)
+            for _, pending_user_id, volume, _, timestamp in reversed(self._flushing + self._pending)
+            if pending_user_id == user_id and timestamp.startswith(day)
+        ]
+
+    async def _flush_loop(self):
+        """Периодический сброс буфера в БД"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), settings.INTAKE_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Ошибка сброса буфера приемов воды: {e}")
+
+    async def flush(self):
+        """Записать накопленные приемы воды в БД одной транзакцией"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, []
+            self._flushing = batch
+            try:
+                await self.db.add_water_intake_batch(
+                    [(user_id, volume, reminder_id, timestamp) for _, user_id, volume, reminder_id, timestamp in batch],
+                    batch[-1][0]
+                )
+            except Exception:
+                # Возвращаем пачку в буфер - записи остаются и в журнале
+                self._pending = batch + self._pending
+                raise
+            finally:
+                self._flushing = []
+
+            if self._journal:
+                self._rotate_journal()
+
+            # Итоги за прошедшие дни больше не понадобятся
+            today = datetime.utcnow().date()
+            for key in [key for key in self.totals if key[1] < today]:
+                del self.totals[key]
@@ -1,448 +1,826 @@
 """
 Менеджер для работы с базой данных
 """
-import sqlite3
 import asyncio
+import sqlite3
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable
 import threading
+import time
 
 from config import settings
-from config.database_config import CREATE_TABLES, CREATE_INDEXES
+from config.database_config import (
+    CREATE_TABLES, CREATE_INDEXES, USER_COLUMN_MIGRATIONS, REMINDER_COLUMN_MIGRATIONS,
+    ARCHIVE_REMINDERS_SELECT, ARCHIVE_REMINDERS_INSERT, ARCHIVE_REMINDERS_DELETE,
+    BULK_LOAD_DROP_INDEXES, IMPORT_USERS, COUNT_SLOT_SENT, COUNT_SLOT_CONVERTED, WEEKLY_STATS,
+    CATCH_UP_PEER_CLAIMS, CATCH_UP_EXPIRE_REMINDERS, CATCH_UP_MERGE_REMINDERS, CATCH_UP_SPREAD_REMINDERS
+)
+from src.metrics import metrics, query_log, watchdog
+from .backends import create_backend
+from .executors import READ, WRITE, BATCH
 from .models import User, WaterIntake, Reminder, MotivationLog
+from .storage import Storage
+
 
+def _mark_answered(conn, reminder_id: int) -> bool:
+    """Отметить ответ на отправленное напоминание и конверсию его слота (без commit)"""
+    # Напоминание могло уже уйти в архив, пока пользователь не отвечал
+    for table in ('reminders', 'reminders_archive'):
+        cursor = conn.execute(
+            f"UPDATE {table} SET status = 'answered' WHERE id = ? AND status = 'completed'",
+            (reminder_id,)
+        )
+        if cursor.rowcount:
+            conn.execute(COUNT_SLOT_CONVERTED.format(table=table), (reminder_id,))
+            return True
+    return False
 
-class DatabaseManager:
-    """Менеджер для работы с базой данных"""
+
+class DatabaseManager(Storage):
+    """Менеджер для работы с базой данных SQLite"""
     
-    def __init__(self, db_path: str = None):
-        self.db_path = db_path or settings.DATABASE_PATH
+    def __init__(self, db_path: str = None, backend: str = None, node_id: str = None):
+        self.backend = create_backend(backend or settings.DATABASE_BACKEND, db_path or settings.DATABASE_PATH)
+        self.node_id = node_id or settings.NODE_ID
         self._lock = threading.Lock()
+        for workload in (READ, WRITE, BATCH):
+            watchdog.monitor_executor(f"db_{workload}", lambda workload=workload: self.backend.executor_for(workload))
+    
+    @property
+    def db_path(self) -> str:
+        """Путь к файлу базы данных"""
+        return self.backend.db_path
+    
+    @db_path.setter
+    def db_path(self, db_path: str):
+        self.backend.db_path = db_path
+    
+    async def run_sync(self, func: Callable[[sqlite3.Connection], Any], workload: str = READ) -> Any:
+        """Выполнить синхронную функцию func(conn) через бэкенд БД с учетом класса нагрузки"""
+        queries = query_log.get()
+        if not metrics.enabled and queries is None:
+            return await self.backend.run(func, workload)
+        
+        submitted = time.perf_counter()
+        timings = []
+        
+        def _timed(conn):
+            started = time.perf_counter()
+            try:
+                return func(conn)
+            finally:
+                timings.extend((started, time.perf_counter()))
+        
+        try:
+            return await self.backend.run(_timed, workload)
+        finally:
+            # Метрики пишем из цикла событий, а не из рабочего потока
+            if timings:
+                started, finished = timings
+                name = func.__name__.lstrip('_')
+                metrics.observe('water_db_executor_wait_seconds', started - submitted, workload=workload)
+                metrics.observe('water_db_query_seconds', finished - started, query=name)
+                if queries is not None:
+                    queries.append((name, finished - started))
+    
+    async def close(self):
+        """Дождаться выполняющихся запросов и остановить бэкенд"""
+        # Остановка бэкенда ждет очередь запросов - не блокируем цикл событий
+        await asyncio.to_thread(self.backend.close)
     
     async def init_db(self):
         """Инициализация базы данных и создание таблиц"""
-        def _init():
-            with sqlite3.connect(self.db_path) as conn:
-                # Создаем таблицы
-                for table_name, create_sql in CREATE_TABLES.items():
-                    conn.execute(create_sql)
-                
-                # Создаем индексы
-                for index_sql in CREATE_INDEXES:
-                    conn.execute(index_sql)
-                
-                conn.commit()
+        def _init(conn):
+            # Создаем таблицы
+            for table_name, create_sql in CREATE_TABLES.items():
+                conn.execute(create_sql)
+            
+            # Добавляем недостающие колонки пользователей и напоминаний
+            for migration_sql in USER_COLUMN_MIGRATIONS + REMINDER_COLUMN_MIGRATIONS:
+                try:
+                    conn.execute(migration_sql)
+                except sqlite3.OperationalError:
+                    pass  # Колонка уже существует
+            
+            # Создаем индексы
+            for index_sql in CREATE_INDEXES:
+                conn.execute(index_sql)
+            
+            conn.commit()
         
         # Выполняем в отдельном потоке
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _init)
+        await self.run_sync(_init, BATCH)
     
     async def get_user(self, user_id: int) -> Optional[User]:
         """Получить пользователя по ID"""
-        def _get_user():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    "SELECT * FROM users WHERE user_id = ?", (user_id,)
+        def _get_user(conn):
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT * FROM users WHERE user_id = ?", (user_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                # Проверяем наличие колонок и используем значения по умолчанию
+                notifications_enabled = 1
+                start_hour = 8
+                end_hour = 22
+                
+                try:
+                    notifications_enabled = row['notifications_enabled']
+                except (KeyError, IndexError):
+                    pass
+                
+                try:
+                    start_hour = row['start_hour']
+                except (KeyError, IndexError):
+                    pass
+                
+                try:
+                    end_hour = row['end_hour']
+                except (KeyError, IndexError):
+                    pass
+                
+                return User(
+                    user_id=row['user_id'],
+                    username=row['username'],
+                    daily_goal=row['daily_goal'],
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+                    last_motivation_date=date.fromisoformat(row['last_motivation_date']) if row['last_motivation_date'] else None,
+                    notifications_enabled=bool(notifications_enabled),
+                    start_hour=start_hour,
+                    end_hour=end_hour
                 )
-                row = cursor.fetchone()
-                if row:
-                    # Проверяем наличие колонок и используем значения по умолчанию
-                    notifications_enabled = 1
-                    start_hour = 8
-                    end_hour = 22
-                    
-                    try:
-                        notifications_enabled = row['notifications_enabled']
-                    except (KeyError, IndexError):
-                        pass
-                    
-                    try:
-                        start_hour = row['start_hour']
-                    except (KeyError, IndexError):
-                        pass
-                    
-                    try:
-                        end_hour = row['end_hour']
-                    except (KeyError, IndexError):
-                        pass
-                    
-                    return User(
-                        user_id=row['user_id'],
-                        username=row['username'],
-                        daily_goal=row['daily_goal'],
-                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-                        last_motivation_date=date.fromisoformat(row['last_motivation_date']) if row['last_motivation_date'] else None,
-                        notifications_enabled=bool(notifications_enabled),
-                        start_hour=start_hour,
-                        end_hour=end_hour
-                    )
-                return None
+            return None
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_user)
+        return await self.run_sync(_get_user)
     
     async def create_user(self, user_id: int, username: str = None, daily_goal: int = 2000) -> User:
         """Создать нового пользователя"""
-        def _create_user():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    "INSERT OR IGNORE INTO users (user_id, username, daily_goal) VALUES (?, ?, ?)",
-                    (user_id, username, daily_goal)
-                )
-                conn.commit()
-                return User(user_id=user_id, username=username, daily_goal=daily_goal)
+        def _create_user(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO users (user_id, username, daily_goal) VALUES (?, ?, ?)",
+                (user_id, username, daily_goal)
+            )
+            conn.commit()
+            return User(user_id=user_id, username=username, daily_goal=daily_goal)
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _create_user)
+        return await self.run_sync(_create_user, WRITE)
     
     async def update_user_goal(self, user_id: int, daily_goal: int):
         """Обновить целевую норму воды для пользователя"""
-        def _update_goal():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    "UPDATE users SET daily_goal = ? WHERE user_id = ?",
-                    (daily_goal, user_id)
-                )
-                conn.commit()
+        def _update_goal(conn):
+            conn.execute(
+                "UPDATE users SET daily_goal = ? WHERE user_id = ?",
+                (daily_goal, user_id)
+            )
+            conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _update_goal)
+        await self.run_sync(_update_goal, WRITE)
     
     async def add_water_intake(self, user_id: int, volume: int, reminder_id: int = None) -> int:
         """Добавить запись о приеме воды"""
-        def _add_intake():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "INSERT INTO water_intake (user_id, volume, reminder_id) VALUES (?, ?, ?)",
-                    (user_id, volume, reminder_id)
-                )
-                conn.commit()
-                return cursor.lastrowid
+        def _add_intake(conn):
+            cursor = conn.execute(
+                "INSERT INTO water_intake (user_id, volume, reminder_id) VALUES (?, ?, ?)",
+                (user_id, volume, reminder_id)
+            )
+            conn.commit()
+            return cursor.lastrowid
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _add_intake)
+        return await self.run_sync(_add_intake, WRITE)
+    
+    async def add_water_intake_batch(self, intakes: List[tuple], last_seq: int):
+        """Добавить пачку приемов воды (user_id, volume, reminder_id, timestamp) и сохранить позицию журнала"""
+        def _add_batch(conn):
+            conn.executemany(
+                "INSERT INTO water_intake (user_id, volume, reminder_id, timestamp) VALUES (?, ?, ?, ?)",
+                intakes
+            )
+            # Ответы на напоминания - в той же транзакции, что и приемы
+            for reminder_id in {intake[2] for intake in intakes if intake[2]}:
+                _mark_answered(conn, reminder_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO intake_journal_state (id, last_seq) VALUES (1, ?)",
+                (last_seq,)
+            )
+            conn.commit()
+        
+        await self.run_sync(_add_batch, BATCH)
+    
+    async def get_intake_journal_seq(self) -> int:
+        """Получить номер последней записи журнала, сохраненной в БД"""
+        def _get_seq(conn):
+            cursor = conn.execute("SELECT last_seq FROM intake_journal_state WHERE id = 1")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        
+        return await self.run_sync(_get_seq, BATCH)
     
     async def get_daily_intake(self, user_id: int, target_date: date = None) -> int:
-        """Получить общий объем воды за день"""
+        """Получить общий объем воды за день (по умолчанию - сегодня по UTC)"""
         if target_date is None:
-            target_date = date.today()
+            target_date = datetime.utcnow().date()
         
-        def _get_daily_intake():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT COALESCE(SUM(volume), 0) as total FROM water_intake WHERE user_id = ? AND DATE(timestamp) = ?",
-                    (user_id, target_date.isoformat())
-                )
-                row = cursor.fetchone()
-                return row[0] if row else 0
+        def _get_daily_intake(conn):
+            cursor = conn.execute(
+                "SELECT COALESCE(SUM(volume), 0) as total FROM water_intake WHERE user_id = ? AND DATE(timestamp) = ?",
+                (user_id, target_date.isoformat())
+            )
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        
+        return await self.run_sync(_get_daily_intake)
+    
+    async def get_daily_progress(self, user_ids: List[int], target_date: date) -> Dict[int, tuple]:
+        """Прогресс пачки пользователей за день: user_id -> (daily_goal, объем, start_hour, end_hour)"""
+        if not user_ids:
+            return {}
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_daily_intake)
+        def _get_progress(conn):
+            placeholders = ", ".join("?" * len(user_ids))
+            cursor = conn.execute(
+                "SELECT u.user_id, u.daily_goal, COALESCE(SUM(w.volume), 0), "
+                "COALESCE(u.start_hour, 8), COALESCE(u.end_hour, 22) FROM users u "
+                "LEFT JOIN water_intake w ON w.user_id = u.user_id AND DATE(w.timestamp) = ? "
+                f"WHERE u.user_id IN ({placeholders}) GROUP BY u.user_id",
+                (target_date.isoformat(), *user_ids)
+            )
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+        
+        return await self.run_sync(_get_progress, BATCH)
     
     async def get_intake_history(self, user_id: int, limit: int = 10) -> List[WaterIntake]:
         """Получить историю приемов воды"""
-        def _get_history():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+        def _get_history(conn):
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT * FROM water_intake WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+                (user_id, limit)
+            )
+            rows = cursor.fetchall()
+            return [
+                WaterIntake(
+                    id=row['id'],
+                    user_id=row['user_id'],
+                    volume=row['volume'],
+                    timestamp=datetime.fromisoformat(row['timestamp']) if row['timestamp'] else None,
+                    reminder_id=row['reminder_id']
+                )
+                for row in rows
+            ]
+        
+        return await self.run_sync(_get_history)
+    
+    async def iter_intake(self, user_id: int, since: date = None, until: date = None,
+                          chunk_size: int = None) -> AsyncIterator[WaterIntake]:
+        """Потоково прочитать историю приемов воды за период (даты включительно)
+        
+        Читает пачками по ключу (дата, id): соединение не удерживается между
+        пачками, поэтому долгая выгрузка не мешает запросам других пользователей.
+        """
+        chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        last_date = since.isoformat() if since else ''
+        last_id = 0
+        until_date = until.isoformat() if until else '9999-12-31'
+        
+        while True:
+            def _iter_intake(conn):
+                # Поиск по индексу с даты последней пачки, внутри дня - по id
                 cursor = conn.execute(
-                    "SELECT * FROM water_intake WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
-                    (user_id, limit)
+                    "SELECT id, volume, timestamp, reminder_id, DATE(timestamp) FROM water_intake "
+                    "WHERE user_id = ? AND DATE(timestamp) >= ? AND (DATE(timestamp) > ? OR id > ?) "
+                    "AND DATE(timestamp) <= ? ORDER BY DATE(timestamp), id LIMIT ?",
+                    (user_id, last_date, last_date, last_id, until_date, chunk_size)
                 )
-                rows = cursor.fetchall()
-                return [
-                    WaterIntake(
-                        id=row['id'],
-                        user_id=row['user_id'],
-                        volume=row['volume'],
-                        timestamp=datetime.fromisoformat(row['timestamp']) if row['timestamp'] else None,
-                        reminder_id=row['reminder_id']
+                return cursor.fetchall()
+            
+            rows = await self.run_sync(_iter_intake, BATCH)
+            for row in rows:
+                yield WaterIntake(
+                    id=row[0],
+                    user_id=user_id,
+                    volume=row[1],
+                    timestamp=datetime.fromisoformat(row[2]),
+                    reminder_id=row[3]
+                )
+            
+            if len(rows) < chunk_size:
+                break
+            last_id, last_date = rows[-1][0], rows[-1][4]
+    
+    async def iter_intake_rows(self, since: date = None, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Приемы воды всех пользователей пачками (id, user_id, volume, секунды UTC, reminder_id или 0)"""
+        chunk_size = chunk_size or settings.ANALYTICS_CHUNK_SIZE
+        since_date = since.isoformat() if since else ''
+        last_id = 0
+        
+        while True:
+            def _intake_rows(conn):
+                # Пачки по первичному ключу: каждая - короткий поиск по rowid
+                cursor = conn.execute(
+                    "SELECT id, user_id, volume, CAST(strftime('%s', timestamp) AS INTEGER), "
+                    "COALESCE(reminder_id, 0) FROM water_intake "
+                    "WHERE id > ? AND timestamp >= ? ORDER BY id LIMIT ?",
+                    (last_id, since_date, chunk_size)
+                )
+                return cursor.fetchall()
+            
+            rows = await self.run_sync(_intake_rows, BATCH)
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                break
+            last_id = rows[-1][0]
+    
+    async def iter_sent_reminder_rows(self, since: date = None, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Отправленные напоминания, включая архив, пачками (id, user_id, секунды по расписанию)"""
+        chunk_size = chunk_size or settings.ANALYTICS_CHUNK_SIZE
+        since_date = since.isoformat() if since else ''
+        
+        for table in ('reminders_archive', 'reminders'):
+            last_id = 0
+            while True:
+                def _reminder_rows(conn):
+                    cursor = conn.execute(
+                        f"SELECT id, user_id, CAST(strftime('%s', scheduled_time) AS INTEGER) FROM {table} "
+                        "WHERE id > ? AND status IN ('completed', 'answered') AND scheduled_time >= ? ORDER BY id LIMIT ?",
+                        (last_id, since_date, chunk_size)
                     )
-                    for row in rows
-                ]
+                    return cursor.fetchall()
+                
+                rows = await self.run_sync(_reminder_rows, BATCH)
+                if rows:
+                    yield rows
+                if len(rows) < chunk_size:
+                    break
+                last_id = rows[-1][0]
+    
+    async def get_user_goals(self) -> List[tuple]:
+        """Нормы воды всех пользователей (user_id, daily_goal)"""
+        def _get_goals(conn):
+            return conn.execute("SELECT user_id, daily_goal FROM users").fetchall()
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_history)
+        return await self.run_sync(_get_goals, BATCH)
     
     async def create_reminder(self, user_id: int, scheduled_time: datetime, 
                             reminder_type: str = "regular") -> int:
         """Создать напоминание"""
-        def _create_reminder():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "INSERT INTO reminders (user_id, scheduled_time, reminder_type) VALUES (?, ?, ?)",
-                    (user_id, scheduled_time, reminder_type)
-                )
-                conn.commit()
-                return cursor.lastrowid
+        def _create_reminder(conn):
+            cursor = conn.execute(
+                "INSERT INTO reminders (user_id, scheduled_time, reminder_type) VALUES (?, ?, ?)",
+                (user_id, scheduled_time, reminder_type)
+            )
+            conn.commit()
+            return cursor.lastrowid
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _create_reminder)
+        return await self.run_sync(_create_reminder, WRITE)
     
     async def get_pending_reminders(self, user_id: int = None, current_time: datetime = None) -> List[Reminder]:
         """Получить все ожидающие напоминания"""
-        def _get_pending():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                
-                if user_id and current_time:
-                    # Получить напоминания для конкретного пользователя до определенного времени
-                    cursor = conn.execute(
-                        "SELECT * FROM reminders WHERE user_id = ? AND scheduled_time <= ? AND status = 'pending'",
-                        (user_id, current_time)
-                    )
-                elif user_id:
-                    # Получить все напоминания для конкретного пользователя
-                    cursor = conn.execute(
-                        "SELECT * FROM reminders WHERE user_id = ? AND status = 'pending'",
-                        (user_id,)
-                    )
-                elif current_time:
-                    # Получить все напоминания до определенного времени
-                    cursor = conn.execute(
-                        "SELECT * FROM reminders WHERE scheduled_time <= ? AND status = 'pending'",
-                        (current_time,)
-                    )
-                else:
-                    # Получить все ожидающие напоминания
-                    cursor = conn.execute(
-                        "SELECT * FROM reminders WHERE status = 'pending'"
-                    )
-                
-                rows = cursor.fetchall()
-                return [
-                    Reminder(
-                        id=row['id'],
-                        user_id=row['user_id'],
-                        scheduled_time=datetime.fromisoformat(row['scheduled_time']) if row['scheduled_time'] else None,
-                        reminder_type=row['reminder_type'],
-                        status=row['status'],
-                        attempt_number=row['attempt_number'],
-                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                    )
-                    for row in rows
-                ]
+        def _get_pending(conn):
+            conn.row_factory = sqlite3.Row
+            
+            if user_id and current_time:
+                # Получить напоминания для конкретного пользователя до определенного времени
+                cursor = conn.execute(
+                    "SELECT * FROM reminders WHERE user_id = ? AND scheduled_time <= ? AND status = 'pending'",
+                    (user_id, current_time)
+                )
+            elif user_id:
+                # Получить все напоминания для конкретного пользователя
+                cursor = conn.execute(
+                    "SELECT * FROM reminders WHERE user_id = ? AND status = 'pending'",
+                    (user_id,)
+                )
+            elif current_time:
+                # Получить все напоминания до определенного времени
+                cursor = conn.execute(
+                    "SELECT * FROM reminders WHERE scheduled_time <= ? AND status = 'pending'",
+                    (current_time,)
+                )
+            else:
+                # Получить все ожидающие напоминания
+                cursor = conn.execute(
+                    "SELECT * FROM reminders WHERE status = 'pending'"
+                )
+            
+            rows = cursor.fetchall()
+            return [
+                Reminder(
+                    id=row['id'],
+                    user_id=row['user_id'],
+                    scheduled_time=datetime.fromisoformat(row['scheduled_time']) if row['scheduled_time'] else None,
+                    reminder_type=row['reminder_type'],
+                    status=row['status'],
+                    attempt_number=row['attempt_number'],
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                )
+                for row in rows
+            ]
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_pending)
+        return await self.run_sync(_get_pending, BATCH)
     
-    async def mark_reminder_completed(self, reminder_id: int):
-        """Отметить напоминание как выполненное"""
-        def _mark_completed():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    "UPDATE reminders SET status = 'completed' WHERE id = ?",
-                    (reminder_id,)
+    async def claim_due_reminders(self, current_time: datetime, limit: int,
+                                  lease_before: datetime = None) -> List[Reminder]:
+        """Забрать на отправку до limit наступивших напоминаний"""
+        def _claim_due(conn):
+            conn.row_factory = sqlite3.Row
+            # Блокировка записи сразу: между выборкой и UPDATE никто не заберет те же строки
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM reminders WHERE scheduled_time <= ? "
+                "AND ((status = 'pending' AND (send_after IS NULL OR send_after <= ?)) "
+                "OR (status = 'sending' AND claimed_at < ?)) "
+                "ORDER BY scheduled_time LIMIT ?",
+                (current_time, current_time, lease_before, limit)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE reminders SET status = 'sending', claimed_at = ?, claimed_by = ? WHERE id = ?",
+                    [(current_time, self.node_id, row['id']) for row in rows]
                 )
-                conn.commit()
+            conn.commit()
+            return [
+                Reminder(
+                    id=row['id'],
+                    user_id=row['user_id'],
+                    scheduled_time=datetime.fromisoformat(row['scheduled_time']) if row['scheduled_time'] else None,
+                    reminder_type=row['reminder_type'],
+                    status='sending',
+                    attempt_number=row['attempt_number'],
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                )
+                for row in rows
+            ]
+        
+        return await self.run_sync(_claim_due, BATCH)
+    
+    async def mark_reminder_completed(self, reminder_id: int):
+        """Отметить напоминание как выполненное (отправленное) и учесть отправку в слоте"""
+        def _mark_completed(conn):
+            conn.execute(
+                "UPDATE reminders SET status = 'completed' WHERE id = ?",
+                (reminder_id,)
+            )
+            conn.execute(COUNT_SLOT_SENT, (reminder_id,))
+            conn.commit()
+        
+        await self.run_sync(_mark_completed, WRITE)
+    
+    async def mark_reminders_suppressed(self, reminder_ids: List[int]):
+        """Отметить пачку напоминаний как подавленные"""
+        def _mark_suppressed(conn):
+            conn.executemany(
+                "UPDATE reminders SET status = 'suppressed' WHERE id = ?",
+                [(reminder_id,) for reminder_id in reminder_ids]
+            )
+            conn.commit()
+        
+        await self.run_sync(_mark_suppressed, BATCH)
+    
+    async def renew_reminder_claims(self, reminder_ids: List[int], claimed_at: datetime) -> List[int]:
+        """Продлить аренду забранных этим узлом напоминаний; вернуть id, которые все еще за ним"""
+        if not reminder_ids:
+            return []
+        
+        def _renew(conn):
+            placeholders = ", ".join("?" * len(reminder_ids))
+            rows = conn.execute(
+                f"UPDATE reminders SET claimed_at = ? WHERE id IN ({placeholders}) "
+                "AND status = 'sending' AND claimed_by = ? RETURNING id",
+                (claimed_at, *reminder_ids, self.node_id)
+            ).fetchall()
+            conn.commit()
+            return [row[0] for row in rows]
+        
+        return await self.run_sync(_renew, WRITE)
+    
+    async def release_reminders(self, reminder_ids: List[int]):
+        """Вернуть забранные, но не отправленные напоминания в ожидание"""
+        def _release(conn):
+            conn.executemany(
+                "UPDATE reminders SET status = 'pending', claimed_at = NULL, claimed_by = NULL "
+                "WHERE id = ? AND status = 'sending'",
+                [(reminder_id,) for reminder_id in reminder_ids]
+            )
+            conn.commit()
+        
+        await self.run_sync(_release, BATCH)
+    
+    async def catch_up_reminders(self, now: datetime, stale_before: datetime, ramp_seconds: int,
+                                 lease_before: datetime = None) -> Optional[Dict[str, int]]:
+        """Разобрать напоминания, пропущенные за время простоя, одной транзакцией"""
+        def _catch_up(conn):
+            # Блокировка записи: догоны разных процессов не пересекаются
+            conn.execute("BEGIN IMMEDIATE")
+            if lease_before and conn.execute(CATCH_UP_PEER_CLAIMS, (lease_before, self.node_id)).fetchone()[0]:
+                conn.rollback()
+                return None
+            expired = conn.execute(CATCH_UP_EXPIRE_REMINDERS, (stale_before,)).rowcount
+            merged = conn.execute(CATCH_UP_MERGE_REMINDERS, (now,)).rowcount
+            spread = conn.execute(CATCH_UP_SPREAD_REMINDERS, {'now': now, 'ramp_seconds': ramp_seconds}).rowcount
+            conn.commit()
+            return {'expired': expired, 'merged': merged, 'spread': spread}
+        
+        return await self.run_sync(_catch_up, BATCH)
+    
+    async def mark_reminder_answered(self, reminder_id: int) -> bool:
+        """Отметить первый прием воды по напоминанию и учесть конверсию слота"""
+        def _mark_reminder_answered(conn):
+            answered = _mark_answered(conn, reminder_id)
+            conn.commit()
+            return answered
+        
+        return await self.run_sync(_mark_reminder_answered, WRITE)
+    
+    async def get_reminder_slot_stats(self, user_id: int) -> Dict[int, tuple]:
+        """Конверсия плановых напоминаний пользователя: слот (минута суток) -> (sent, converted)"""
+        def _get_slot_stats(conn):
+            cursor = conn.execute(
+                "SELECT slot, sent, converted FROM reminder_slot_stats WHERE user_id = ?", (user_id,)
+            )
+            return {slot: (sent, converted) for slot, sent, converted in cursor.fetchall()}
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _mark_completed)
+        return await self.run_sync(_get_slot_stats)
     
     async def mark_reminder_skipped(self, reminder_id: int):
         """Отметить напоминание как пропущенное"""
-        def _mark_skipped():
-            with sqlite3.connect(self.db_path) as conn:
+        def _mark_skipped(conn):
+            conn.execute(
+                "UPDATE reminders SET status = 'skipped' WHERE id = ?",
+                (reminder_id,)
+            )
+            conn.commit()
+        
+        await self.run_sync(_mark_skipped, WRITE)
+    
+    async def postpone_reminder(self, reminder_id: int, minutes: int):
+        """Сдвинуть напоминание на указанное количество минут"""
+        def _postpone(conn):
+            # Получаем текущее время напоминания
+            cursor = conn.execute(
+                "SELECT scheduled_time FROM reminders WHERE id = ?", (reminder_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                new_time = datetime.fromisoformat(row[0]) + timedelta(minutes=minutes)
                 conn.execute(
-                    "UPDATE reminders SET status = 'skipped' WHERE id = ?",
-                    (reminder_id,)
+                    "UPDATE reminders SET scheduled_time = ? WHERE id = ?",
+                    (new_time, reminder_id)
                 )
                 conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _mark_skipped)
+        await self.run_sync(_postpone, WRITE)
+    
+    async def delete_pending_reminders(self, user_id: int):
+        """Удалить ожидающие напоминания пользователя"""
+        def _delete_pending(conn):
+            conn.execute(
+                "DELETE FROM reminders WHERE user_id = ? AND status = 'pending'",
+                (user_id,)
+            )
+            conn.commit()
+        
+        await self.run_sync(_delete_pending, WRITE)
     
     async def create_follow_up_reminder(self, user_id: int, original_reminder_id: int, 
                                       delay_minutes: int = 5) -> int:
         """Создать повторное напоминание"""
-        def _create_follow_up():
-            with sqlite3.connect(self.db_path) as conn:
-                # Получаем информацию об оригинальном напоминании
+        def _create_follow_up(conn):
+            # Получаем информацию об оригинальном напоминании
+            cursor = conn.execute(
+                "SELECT scheduled_time, attempt_number FROM reminders WHERE id = ?", (original_reminder_id,)
+            )
+            original = cursor.fetchone()
+            
+            if original:
+                # Создаем новое напоминание с задержкой
+                new_time = datetime.fromisoformat(original[0]) + timedelta(minutes=delay_minutes)
                 cursor = conn.execute(
-                    "SELECT * FROM reminders WHERE id = ?", (original_reminder_id,)
+                    "INSERT INTO reminders (user_id, scheduled_time, reminder_type, attempt_number) VALUES (?, ?, 'follow_up', ?)",
+                    (user_id, new_time, original[1] + 1)
                 )
-                original = cursor.fetchone()
-                
-                if original:
-                    # Создаем новое напоминание с задержкой
-                    new_time = datetime.fromisoformat(original[2]) + timedelta(minutes=delay_minutes)
-                    cursor = conn.execute(
-                        "INSERT INTO reminders (user_id, scheduled_time, reminder_type, attempt_number) VALUES (?, ?, 'follow_up', ?)",
-                        (user_id, new_time, original[6] + 1)
-                    )
-                    conn.commit()
-                    return cursor.lastrowid
-                return None
+                conn.commit()
+                return cursor.lastrowid
+            return None
+        
+        return await self.run_sync(_create_follow_up, BATCH)
+    
+    async def create_follow_up_reminders(self, follow_ups: List[tuple]) -> None:
+        """Создать пачку повторных напоминаний (user_id, scheduled_time, attempt_number)"""
+        def _create_follow_ups(conn):
+            conn.executemany(
+                "INSERT INTO reminders (user_id, scheduled_time, reminder_type, attempt_number) VALUES (?, ?, 'follow_up', ?)",
+                follow_ups
+            )
+            conn.commit()
+        
+        await self.run_sync(_create_follow_ups, BATCH)
+    
+    async def archive_reminders_batch(self, stale_before: datetime, batch_size: int = 500) -> int:
+        """Перенести одну пачку завершенных и устаревших напоминаний в архив"""
+        def _archive_batch(conn):
+            cursor = conn.execute(ARCHIVE_REMINDERS_SELECT, (stale_before, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return 0
+            
+            placeholders = ", ".join("?" * len(ids))
+            conn.execute(ARCHIVE_REMINDERS_INSERT.format(placeholders=placeholders), ids)
+            conn.execute(ARCHIVE_REMINDERS_DELETE.format(placeholders=placeholders), ids)
+            conn.commit()
+            return len(ids)
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _create_follow_up)
+        return await self.run_sync(_archive_batch, BATCH)
     
     async def log_motivation(self, user_id: int, message_type: str, message_text: str):
         """Записать отправленное мотивационное сообщение"""
-        def _log_motivation():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    "INSERT INTO motivation_log (user_id, message_type, message_text) VALUES (?, ?, ?)",
-                    (user_id, message_type, message_text)
-                )
-                conn.commit()
+        def _log_motivation(conn):
+            conn.execute(
+                "INSERT INTO motivation_log (user_id, message_type, message_text) VALUES (?, ?, ?)",
+                (user_id, message_type, message_text)
+            )
+            conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _log_motivation)
+        await self.run_sync(_log_motivation, WRITE)
     
     async def get_recent_motivations(self, user_id: int, hours: int = 24) -> List[str]:
         """Получить недавние мотивационные сообщения"""
-        def _get_recent():
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT message_text FROM motivation_log WHERE user_id = ? AND sent_at > datetime('now', '-{} hours')".format(hours),
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-                return [row[0] for row in rows]
+        def _get_recent(conn):
+            cursor = conn.execute(
+                "SELECT message_text FROM motivation_log WHERE user_id = ? AND sent_at > datetime('now', '-{} hours')".format(hours),
+                (user_id,)
+            )
+            rows = cursor.fetchall()
+            return [row[0] for row in rows]
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_recent)
+        return await self.run_sync(_get_recent)
     
     async def update_last_motivation_date(self, user_id: int):
         """Обновить дату последней особой мотивации"""
-        def _update_date():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    "UPDATE users SET last_motivation_date = CURRENT_DATE WHERE user_id = ?",
-                    (user_id,)
-                )
-                conn.commit()
+        def _update_date(conn):
+            conn.execute(
+                "UPDATE users SET last_motivation_date = CURRENT_DATE WHERE user_id = ?",
+                (user_id,)
+            )
+            conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _update_date)
+        await self.run_sync(_update_date, WRITE)
     
     async def get_weekly_stats(self, user_id: int) -> List[Dict[str, Any]]:
-        """Получить статистику за неделю"""
-        def _get_weekly_stats():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    """
-                    SELECT DATE(timestamp) as date, SUM(volume) as total 
-                    FROM water_intake 
-                    WHERE user_id = ? AND timestamp >= date('now', '-7 days')
-                    GROUP BY DATE(timestamp)
-                    ORDER BY date
-                    """,
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-                return [dict(row) for row in rows]
+        """Получить статистику за неделю: 7 дней по порядку, заканчивая сегодняшним (UTC)"""
+        today = datetime.utcnow().date().isoformat()
+
+        def _get_weekly_stats(conn):
+            cursor = conn.execute(WEEKLY_STATS, (today, today, user_id))
+            return [{'date': day, 'total': total} for day, total in cursor.fetchall()]
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_weekly_stats)
+        return await self.run_sync(_get_weekly_stats)
     
     async def update_user_notifications(self, user_id: int, enabled: bool):
         """Обновить настройки уведомлений пользователя"""
-        def _update_notifications():
-            with sqlite3.connect(self.db_path) as conn:
-                # Добавляем колонку если её нет
-                try:
-                    conn.execute(
-                        "ALTER TABLE users ADD COLUMN notifications_enabled INTEGER DEFAULT 1"
-                    )
-                except sqlite3.OperationalError:
-                    pass  # Колонка уже существует
-                
-                # Обновляем настройки
+        def _update_notifications(conn):
+            # Добавляем колонку если её нет
+            try:
                 conn.execute(
-                    "UPDATE users SET notifications_enabled = ? WHERE user_id = ?",
-                    (1 if enabled else 0, user_id)
+                    "ALTER TABLE users ADD COLUMN notifications_enabled INTEGER DEFAULT 1"
                 )
-                conn.commit()
+            except sqlite3.OperationalError:
+                pass  # Колонка уже существует
+            
+            # Обновляем настройки
+            conn.execute(
+                "UPDATE users SET notifications_enabled = ? WHERE user_id = ?",
+                (1 if enabled else 0, user_id)
+            )
+            conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _update_notifications)
+        await self.run_sync(_update_notifications, WRITE)
     
     async def update_user_time_settings(self, user_id: int, start_hour: int, end_hour: int):
         """Обновить настройки времени пользователя"""
-        def _update_time_settings():
-            with sqlite3.connect(self.db_path) as conn:
-                # Добавляем колонки если их нет
-                try:
-                    conn.execute(
-                        "ALTER TABLE users ADD COLUMN start_hour INTEGER DEFAULT 8"
-                    )
-                    conn.execute(
-                        "ALTER TABLE users ADD COLUMN end_hour INTEGER DEFAULT 22"
-                    )
-                except sqlite3.OperationalError:
-                    pass  # Колонки уже существуют
-                
-                # Обновляем настройки
+        def _update_time_settings(conn):
+            # Добавляем колонки если их нет
+            try:
                 conn.execute(
-                    "UPDATE users SET start_hour = ?, end_hour = ? WHERE user_id = ?",
-                    (start_hour, end_hour, user_id)
+                    "ALTER TABLE users ADD COLUMN start_hour INTEGER DEFAULT 8"
                 )
-                conn.commit()
+                conn.execute(
+                    "ALTER TABLE users ADD COLUMN end_hour INTEGER DEFAULT 22"
+                )
+            except sqlite3.OperationalError:
+                pass  # Колонки уже существуют
+            
+            # Обновляем настройки
+            conn.execute(
+                "UPDATE users SET start_hour = ?, end_hour = ? WHERE user_id = ?",
+                (start_hour, end_hour, user_id)
+            )
+            conn.commit()
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _update_time_settings)
+        await self.run_sync(_update_time_settings, WRITE)
     
     async def get_user_time_settings(self, user_id: int) -> tuple:
         """Получить настройки времени пользователя"""
-        def _get_time_settings():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    "SELECT start_hour, end_hour FROM users WHERE user_id = ?", (user_id,)
-                )
-                row = cursor.fetchone()
-                if row:
-                    return row['start_hour'] or 8, row['end_hour'] or 22
-                return 8, 22  # Значения по умолчанию
+        def _get_time_settings(conn):
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT start_hour, end_hour FROM users WHERE user_id = ?", (user_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                return row['start_hour'] or 8, row['end_hour'] or 22
+            return 8, 22  # Значения по умолчанию
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_time_settings)
+        return await self.run_sync(_get_time_settings)
     
     async def is_notifications_enabled(self, user_id: int) -> bool:
         """Проверить, включены ли уведомления для пользователя"""
-        def _check_notifications():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    "SELECT notifications_enabled FROM users WHERE user_id = ?", (user_id,)
-                )
-                row = cursor.fetchone()
-                if row:
-                    return bool(row['notifications_enabled'])
-                return True  # По умолчанию включены
+        def _check_notifications(conn):
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT notifications_enabled FROM users WHERE user_id = ?", (user_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                return bool(row['notifications_enabled'])
+            return True  # По умолчанию включены
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _check_notifications)
+        return await self.run_sync(_check_notifications)
     
     async def get_user_intake_history(self, user_id: int, limit: int = 10) -> list:
         """Получить историю приемов воды пользователя"""
-        def _get_history():
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    "SELECT volume, timestamp FROM water_intake "
-                    "WHERE user_id = ? AND DATE(timestamp) = DATE('now') "
-                    "ORDER BY timestamp DESC LIMIT ?",
-                    (user_id, limit)
-                )
-                return [dict(row) for row in cursor.fetchall()]
+        def _get_history(conn):
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT volume, timestamp FROM water_intake "
+                "WHERE user_id = ? AND DATE(timestamp) = DATE('now') "
+                "ORDER BY timestamp DESC LIMIT ?",
+                (user_id, limit)
+            )
+            return [dict(row) for row in cursor.fetchall()]
         
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _get_history)
+        return await self.run_sync(_get_history)
     
     async def delete_user(self, user_id: int):
         """Удалить пользователя и все связанные данные"""
-        def _delete_user():
-            with sqlite3.connect(self.db_path) as conn:
-                # Удаляем все связанные данные
-                conn.execute("DELETE FROM water_intake WHERE user_id = ?", (user_id,))
-                conn.execute("DELETE FROM reminders WHERE user_id = ?", (user_id,))
-                conn.execute("DELETE FROM motivation_log WHERE user_id = ?", (user_id,))
-                conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-                conn.commit()
+        def _delete_user(conn):
+            # Удаляем все связанные данные
+            conn.execute("DELETE FROM water_intake WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM reminders WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM reminders_archive WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM motivation_log WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM reminder_slot_stats WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+            conn.commit()
+        
+        await self.run_sync(_delete_user, WRITE)
+
+    async def import_users(self, users: List[tuple]):
+        """Загрузить пачку пользователей одной транзакцией (существующие обновляются)"""
+        def _import_users(conn):
+            conn.executemany(IMPORT_USERS, users)
+            conn.commit()
+        
+        await self.run_sync(_import_users, BATCH)
+    
+    async def import_water_intake(self, intakes: List[tuple]):
+        """Загрузить пачку исторических приемов воды (user_id, volume, reminder_id, timestamp)"""
+        def _import_intake(conn):
+            conn.executemany(
+                "INSERT INTO water_intake (user_id, volume, reminder_id, timestamp) VALUES (?, ?, ?, ?)",
+                intakes
+            )
+            conn.commit()
+        
+        await self.run_sync(_import_intake, BATCH)
+    
+    async def create_reminders(self, reminders: List[tuple]):
+        """Создать пачку напоминаний (user_id, scheduled_time, reminder_type)"""
+        def _create_reminders(conn):
+            conn.executemany(
+                "INSERT INTO reminders (user_id, scheduled_time, reminder_type) VALUES (?, ?, ?)",
+                reminders
+            )
+            conn.commit()
+        
+        await self.run_sync(_create_reminders, BATCH)
+    
+    async def drop_indexes(self):
+        """Удалить индексы, которые замедляют массовую загрузку"""
+        def _drop_indexes(conn):
+            for drop_sql in BULK_LOAD_DROP_INDEXES:
+                conn.execute(drop_sql)
+            conn.commit()
+        
+        await self.run_sync(_drop_indexes, BATCH)
+    
+    async def rebuild_indexes(self):
+        """Построить индексы заново и обновить статистику (ANALYZE)"""
+        def _rebuild_indexes(conn):
+            for index_sql in CREATE_INDEXES:
+                conn.execute(index_sql)
+            conn.commit()
+            conn.execute("ANALYZE")
         
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _delete_user)
\ No newline at end of file
+        await self.run_sync(_rebuild_indexes, BATCH)
@@ -0,0 +1,587 @@
+"""
+Хранилище данных в PostgreSQL (asyncpg)
+"""
+import asyncio
+from datetime import datetime, date, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator
+
+from config import settings
+from config.database_config import (
+    POSTGRES_CREATE_TABLES, POSTGRES_CREATE_INDEXES, POSTGRES_REMINDER_COLUMN_MIGRATIONS,
+    POSTGRES_CLAIM_REMINDERS, POSTGRES_ARCHIVE_REMINDERS, POSTGRES_BULK_LOAD_DROP_INDEXES,
+    POSTGRES_IMPORT_USERS_STAGE, POSTGRES_IMPORT_USERS, POSTGRES_COUNT_SLOT_SENT,
+    POSTGRES_MARK_REMINDER_ANSWERED, POSTGRES_WEEKLY_STATS, POSTGRES_CATCH_UP_EXPIRE_REMINDERS,
+    POSTGRES_CATCH_UP_MERGE_REMINDERS, POSTGRES_CATCH_UP_SPREAD_REMINDERS, POSTGRES_CATCH_UP_LOCK,
+    POSTGRES_CATCH_UP_PEER_CLAIMS
+)
+from .models import User, WaterIntake, Reminder
+from .storage import Storage
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+# Формат времени в словарях статистики (как CURRENT_TIMESTAMP в SQLite)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _reminder(row) -> Reminder:
+    """Строка reminders -> Reminder"""
+    return Reminder(
+        id=row['id'],
+        user_id=row['user_id'],
+        scheduled_time=row['scheduled_time'],
+        reminder_type=row['reminder_type'],
+        status=row['status'],
+        attempt_number=row['attempt_number'],
+        created_at=row['created_at']
+    )
+
+
+def _timestamp(value) -> Optional[datetime]:
+    """Время из журнала приемов (строка в формате SQLite) -> datetime"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class PostgresStorage(Storage):
+    """Хранилище в PostgreSQL для нескольких узлов с общей базой
+
+    Запросы идут через пул соединений asyncpg прямо из цикла событий, без
+    пулов потоков. Пачки приемов воды и повторных напоминаний загружаются
+    через COPY, а наступившие напоминания узлы забирают через
+    FOR UPDATE SKIP LOCKED, так что каждое отправляется ровно одним узлом.
+    """
+
+    def __init__(self, dsn: str = None, node_id: str = None):
+        if asyncpg is None:
+            raise RuntimeError(
+                "Для STORAGE_BACKEND=postgres нужен пакет asyncpg: "
+                "pip install -r requirements-postgres.txt"
+            )
+        self.dsn = dsn or settings.POSTGRES_DSN
+        self.node_id = node_id or settings.NODE_ID
+        self.pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        """Пул соединений (создается при первом запросе)"""
+        if self.pool is None:
+            async with self._pool_lock:
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=settings.POSTGRES_POOL_MIN_SIZE,
+                        max_size=settings.POSTGRES_POOL_MAX_SIZE
+                    )
+        return self.pool
+
+    async def close(self):
+        """Закрыть пул соединений"""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def init_db(self):
+        """Создание таблиц и индексов"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for create_sql in POSTGRES_CREATE_TABLES.values():
+                    await conn.execute(create_sql)
+                for migration_sql in POSTGRES_REMINDER_COLUMN_MIGRATIONS:
+                    await conn.execute(migration_sql)
+                for index_sql in POSTGRES_CREATE_INDEXES:
+                    await conn.execute(index_sql)
+
+    # Пользователи
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """Получить пользователя по ID"""
+        pool = await self._get_pool()
+        row = await pool.fetchrow("SELECT * FROM users WHERE user_id = $1", user_id)
+        if row is None:
+            return None
+        return User(
+            user_id=row['user_id'],
+            username=row['username'],
+            daily_goal=row['daily_goal'],
+            created_at=row['created_at'],
+            last_motivation_date=row['last_motivation_date'],
+            notifications_enabled=row['notifications_enabled'],
+            start_hour=row['start_hour'],
+            end_hour=row['end_hour']
+        )
+
+    async def create_user(self, user_id: int, username: str = None, daily_goal: int = 2000) -> User:
+        """Создать нового пользователя"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "INSERT INTO users (user_id, username, daily_goal) VALUES ($1, $2, $3) ON CONFLICT (user_id) DO NOTHING",
+            user_id, username, daily_goal
+        )
+        return User(user_id=user_id, username=username, daily_goal=daily_goal)
+
+    async def update_user_goal(self, user_id: int, daily_goal: int):
+        """Обновить целевую норму воды для пользователя"""
+        pool = await self._get_pool()
+        await pool.execute("UPDATE users SET daily_goal = $1 WHERE user_id = $2", daily_goal, user_id)
+
+    async def update_user_notifications(self, user_id: int, enabled: bool):
+        """Обновить настройки уведомлений пользователя"""
+        pool = await self._get_pool()
+        await pool.execute("UPDATE users SET notifications_enabled = $1 WHERE user_id = $2", enabled, user_id)
+
+    async def update_user_time_settings(self, user_id: int, start_hour: int, end_hour: int):
+        """Обновить настройки времени пользователя"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "UPDATE users SET start_hour = $1, end_hour = $2 WHERE user_id = $3",
+            start_hour, end_hour, user_id
+        )
+
+    async def get_user_time_settings(self, user_id: int) -> tuple:
+        """Получить настройки времени пользователя"""
+        pool = await self._get_pool()
+        row = await pool.fetchrow("SELECT start_hour, end_hour FROM users WHERE user_id = $1", user_id)
+        if row:
+            return row['start_hour'] or 8, row['end_hour'] or 22
+        return 8, 22  # Значения по умолчанию
+
+    async def is_notifications_enabled(self, user_id: int) -> bool:
+        """Проверить, включены ли уведомления для пользователя"""
+        pool = await self._get_pool()
+        enabled = await pool.fetchval("SELECT notifications_enabled FROM users WHERE user_id = $1", user_id)
+        return True if enabled is None else enabled
+
+    async def update_last_motivation_date(self, user_id: int):
+        """Обновить дату последней особой мотивации"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "UPDATE users SET last_motivation_date = (now() AT TIME ZONE 'utc')::date WHERE user_id = $1",
+            user_id
+        )
+
+    async def delete_user(self, user_id: int):
+        """Удалить пользователя и все связанные данные"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for table in ('water_intake', 'reminders', 'reminders_archive', 'motivation_log',
+                              'reminder_slot_stats', 'users'):
+                    await conn.execute(f"DELETE FROM {table} WHERE user_id = $1", user_id)
+
+    # Приемы воды
+
+    async def add_water_intake(self, user_id: int, volume: int, reminder_id: int = None) -> int:
+        """Добавить запись о приеме воды"""
+        pool = await self._get_pool()
+        return await pool.fetchval(
+            "INSERT INTO water_intake (user_id, volume, reminder_id) VALUES ($1, $2, $3) RETURNING id",
+            user_id, volume, reminder_id
+        )
+
+    async def add_water_intake_batch(self, intakes: List[tuple], last_seq: int):
+        """Загрузить пачку приемов воды через COPY и сохранить позицию журнала узла"""
+        records = [
+            (user_id, volume, reminder_id, _timestamp(timestamp))
+            for user_id, volume, reminder_id, timestamp in intakes
+        ]
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if records:
+                    await conn.copy_records_to_table(
+                        'water_intake', records=records,
+                        columns=('user_id', 'volume', 'reminder_id', 'timestamp')
+                    )
+                # Ответы на напоминания - в той же транзакции, что и приемы
+                answered = {record[2] for record in records if record[2]}
+                if answered:
+                    await conn.executemany(
+                        POSTGRES_MARK_REMINDER_ANSWERED, [(reminder_id,) for reminder_id in answered]
+                    )
+                await conn.execute(
+                    "INSERT INTO intake_journal_state (node, last_seq) VALUES ($1, $2) "
+                    "ON CONFLICT (node) DO UPDATE SET last_seq = EXCLUDED.last_seq",
+                    self.node_id, last_seq
+                )
+
+    async def get_intake_journal_seq(self) -> int:
+        """Получить номер последней записи журнала этого узла, сохраненной в БД"""
+        pool = await self._get_pool()
+        last_seq = await pool.fetchval("SELECT last_seq FROM intake_journal_state WHERE node = $1", self.node_id)
+        return last_seq or 0
+
+    async def get_daily_intake(self, user_id: int, target_date: date = None) -> int:
+        """Получить общий объем воды за день (по умолчанию - сегодня по UTC)"""
+        if target_date is None:
+            target_date = datetime.utcnow().date()
+        day_start = datetime.combine(target_date, datetime.min.time())
+
+        pool = await self._get_pool()
+        return await pool.fetchval(
+            "SELECT COALESCE(SUM(volume), 0) FROM water_intake "
+            "WHERE user_id = $1 AND timestamp >= $2 AND timestamp < $3",
+            user_id, day_start, day_start + timedelta(days=1)
+        )
+
+    async def get_intake_history(self, user_id: int, limit: int = 10) -> List[WaterIntake]:
+        """Получить историю приемов воды"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "SELECT * FROM water_intake WHERE user_id = $1 ORDER BY timestamp DESC LIMIT $2",
+            user_id, limit
+        )
+        return [
+            WaterIntake(
+                id=row['id'],
+                user_id=row['user_id'],
+                volume=row['volume'],
+                timestamp=row['timestamp'],
+                reminder_id=row['reminder_id']
+            )
+            for row in rows
+        ]
+
+    async def iter_intake(self, user_id: int, since: date = None, until: date = None,
+                          chunk_size: int = None) -> AsyncIterator[WaterIntake]:
+        """Потоково прочитать историю приемов через серверный курсор"""
+        conditions = ["user_id = $1"]
+        args = [user_id]
+        if since:
+            args.append(datetime.combine(since, datetime.min.time()))
+            conditions.append(f"timestamp >= ${len(args)}")
+        if until:
+            args.append(datetime.combine(until + timedelta(days=1), datetime.min.time()))
+            conditions.append(f"timestamp < ${len(args)}")
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            # Курсор живет только внутри транзакции
+            async with conn.transaction(readonly=True):
+                cursor = conn.cursor(
+                    f"SELECT * FROM water_intake WHERE {' AND '.join(conditions)} ORDER BY timestamp, id",
+                    *args, prefetch=chunk_size or settings.EXPORT_CHUNK_SIZE
+                )
+                async for row in cursor:
+                    yield WaterIntake(
+                        id=row['id'],
+                        user_id=row['user_id'],
+                        volume=row['volume'],
+                        timestamp=row['timestamp'],
+                        reminder_id=row['reminder_id']
+                    )
+
+    async def _iter_rows(self, query: str, args: list, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Результат запроса пачками через серверный курсор"""
+        chunk_size = chunk_size or settings.ANALYTICS_CHUNK_SIZE
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *args)
+                while True:
+                    rows = await cursor.fetch(chunk_size)
+                    if rows:
+                        yield [tuple(row) for row in rows]
+                    if len(rows) < chunk_size:
+                        break
+
+    async def iter_intake_rows(self, since: date = None, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Приемы воды всех пользователей пачками (id, user_id, volume, секунды UTC, reminder_id или 0)"""
+        query = (
+            "SELECT id, user_id, volume, EXTRACT(EPOCH FROM timestamp)::bigint, COALESCE(reminder_id, 0) "
+            "FROM water_intake WHERE timestamp >= $1"
+        )
+        async for rows in self._iter_rows(query, [datetime.combine(since or date.min, datetime.min.time())], chunk_size):
+            yield rows
+
+    async def iter_sent_reminder_rows(self, since: date = None, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Отправленные напоминания, включая архив, пачками (id, user_id, секунды по расписанию)"""
+        query = (
+            "SELECT id, user_id, EXTRACT(EPOCH FROM scheduled_time)::bigint FROM reminders "
+            "WHERE status IN ('completed', 'answered') AND scheduled_time >= $1 "
+            "UNION ALL "
+            "SELECT id, user_id, EXTRACT(EPOCH FROM scheduled_time)::bigint FROM reminders_archive "
+            "WHERE status IN ('completed', 'answered') AND scheduled_time >= $1"
+        )
+        async for rows in self._iter_rows(query, [datetime.combine(since or date.min, datetime.min.time())], chunk_size):
+            yield rows
+
+    async def get_user_goals(self) -> List[tuple]:
+        """Нормы воды всех пользователей (user_id, daily_goal)"""
+        pool = await self._get_pool()
+        rows = await pool.fetch("SELECT user_id, daily_goal FROM users")
+        return [tuple(row) for row in rows]
+
+    async def get_daily_progress(self, user_ids: List[int], target_date: date) -> Dict[int, tuple]:
+        """Прогресс пачки пользователей за день: user_id -> (daily_goal, объем, start_hour, end_hour)"""
+        if not user_ids:
+            return {}
+        day_start = datetime.combine(target_date, datetime.min.time())
+
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            """
+            SELECT u.user_id, u.daily_goal, COALESCE(SUM(w.volume), 0) AS total,
+                   COALESCE(u.start_hour, 8) AS start_hour, COALESCE(u.end_hour, 22) AS end_hour
+            FROM users u
+            LEFT JOIN water_intake w
+                ON w.user_id = u.user_id AND w.timestamp >= $2 AND w.timestamp < $3
+            WHERE u.user_id = ANY($1::bigint[])
+            GROUP BY u.user_id
+            """,
+            user_ids, day_start, day_start + timedelta(days=1)
+        )
+        return {
+            row['user_id']: (row['daily_goal'], row['total'], row['start_hour'], row['end_hour'])
+            for row in rows
+        }
+
+    async def get_user_intake_history(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Получить историю приемов воды пользователя за сегодня"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "SELECT volume, timestamp FROM water_intake "
+            "WHERE user_id = $1 AND timestamp >= (now() AT TIME ZONE 'utc')::date "
+            "ORDER BY timestamp DESC LIMIT $2",
+            user_id, limit
+        )
+        return [
+            {'volume': row['volume'], 'timestamp': row['timestamp'].strftime(TIMESTAMP_FORMAT)}
+            for row in rows
+        ]
+
+    async def get_weekly_stats(self, user_id: int) -> List[Dict[str, Any]]:
+        """Получить статистику за неделю: 7 дней по порядку, заканчивая сегодняшним (UTC)"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(POSTGRES_WEEKLY_STATS, user_id, datetime.utcnow().date())
+        return [{'date': row['date'].isoformat(), 'total': row['total']} for row in rows]
+
+    # Напоминания
+
+    async def create_reminder(self, user_id: int, scheduled_time: datetime,
+                              reminder_type: str = "regular") -> int:
+        """Создать напоминание"""
+        pool = await self._get_pool()
+        return await pool.fetchval(
+            "INSERT INTO reminders (user_id, scheduled_time, reminder_type) VALUES ($1, $2, $3) RETURNING id",
+            user_id, scheduled_time, reminder_type
+        )
+
+    async def get_pending_reminders(self, user_id: int = None, current_time: datetime = None) -> List[Reminder]:
+        """Получить все ожидающие напоминания"""
+        conditions = ["status = 'pending'"]
+        args = []
+        if user_id:
+            args.append(user_id)
+            conditions.append(f"user_id = ${len(args)}")
+        if current_time:
+            args.append(current_time)
+            conditions.append(f"scheduled_time <= ${len(args)}")
+
+        pool = await self._get_pool()
+        rows = await pool.fetch(f"SELECT * FROM reminders WHERE {' AND '.join(conditions)}", *args)
+        return [_reminder(row) for row in rows]
+
+    async def claim_due_reminders(self, current_time: datetime, limit: int,
+                                  lease_before: datetime = None) -> List[Reminder]:
+        """Забрать на отправку до limit наступивших напоминаний (SKIP LOCKED)"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(POSTGRES_CLAIM_REMINDERS, current_time, limit, lease_before, self.node_id)
+        return sorted((_reminder(row) for row in rows), key=lambda reminder: reminder.scheduled_time)
+
+    async def mark_reminder_completed(self, reminder_id: int):
+        """Отметить напоминание как выполненное (отправленное) и учесть отправку в слоте"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("UPDATE reminders SET status = 'completed' WHERE id = $1", reminder_id)
+                await conn.execute(POSTGRES_COUNT_SLOT_SENT, reminder_id)
+
+    async def mark_reminders_suppressed(self, reminder_ids: List[int]):
+        """Отметить пачку напоминаний как подавленные"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "UPDATE reminders SET status = 'suppressed' WHERE id = ANY($1::bigint[])", reminder_ids
+        )
+
+    async def renew_reminder_claims(self, reminder_ids: List[int], claimed_at: datetime) -> List[int]:
+        """Продлить аренду забранных этим узлом напоминаний; вернуть id, которые все еще за ним"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "UPDATE reminders SET claimed_at = $2 "
+            "WHERE id = ANY($1::bigint[]) AND status = 'sending' AND claimed_by = $3 RETURNING id",
+            reminder_ids, claimed_at, self.node_id
+        )
+        return [row['id'] for row in rows]
+
+    async def release_reminders(self, reminder_ids: List[int]):
+        """Вернуть забранные, но не отправленные напоминания в ожидание"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "UPDATE reminders SET status = 'pending', claimed_at = NULL, claimed_by = NULL "
+            "WHERE id = ANY($1::bigint[]) AND status = 'sending'",
+            reminder_ids
+        )
+
+    async def catch_up_reminders(self, now: datetime, stale_before: datetime, ramp_seconds: int,
+                                 lease_before: datetime = None) -> Optional[Dict[str, int]]:
+        """Разобрать напоминания, пропущенные за время простоя, одной транзакцией"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Догон уже выполняет другой узел
+                if not await conn.fetchval(POSTGRES_CATCH_UP_LOCK):
+                    return None
+                if lease_before and await conn.fetchval(POSTGRES_CATCH_UP_PEER_CLAIMS, lease_before, self.node_id):
+                    return None
+                # execute возвращает статус вида "UPDATE <количество строк>"
+                statuses = (
+                    await conn.execute(POSTGRES_CATCH_UP_EXPIRE_REMINDERS, stale_before),
+                    await conn.execute(POSTGRES_CATCH_UP_MERGE_REMINDERS, now),
+                    await conn.execute(POSTGRES_CATCH_UP_SPREAD_REMINDERS, now, ramp_seconds),
+                )
+        return {outcome: int(status.split()[-1]) for outcome, status in zip(('expired', 'merged', 'spread'), statuses)}
+
+    async def mark_reminder_answered(self, reminder_id: int) -> bool:
+        """Отметить первый прием воды по напоминанию и учесть конверсию слота"""
+        pool = await self._get_pool()
+        return bool(await pool.fetchval(POSTGRES_MARK_REMINDER_ANSWERED, reminder_id))
+
+    async def get_reminder_slot_stats(self, user_id: int) -> Dict[int, tuple]:
+        """Конверсия плановых напоминаний пользователя: слот (минута суток) -> (sent, converted)"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "SELECT slot, sent, converted FROM reminder_slot_stats WHERE user_id = $1", user_id
+        )
+        return {row['slot']: (row['sent'], row['converted']) for row in rows}
+
+    async def mark_reminder_skipped(self, reminder_id: int):
+        """Отметить напоминание как пропущенное"""
+        pool = await self._get_pool()
+        await pool.execute("UPDATE reminders SET status = 'skipped' WHERE id = $1", reminder_id)
+
+    async def postpone_reminder(self, reminder_id: int, minutes: int):
+        """Сдвинуть напоминание на указанное количество минут"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "UPDATE reminders SET scheduled_time = scheduled_time + make_interval(mins => $1) WHERE id = $2",
+            minutes, reminder_id
+        )
+
+    async def delete_pending_reminders(self, user_id: int):
+        """Удалить ожидающие напоминания пользователя"""
+        pool = await self._get_pool()
+        await pool.execute("DELETE FROM reminders WHERE user_id = $1 AND status = 'pending'", user_id)
+
+    async def create_follow_up_reminder(self, user_id: int, original_reminder_id: int,
+                                        delay_minutes: int = 5) -> Optional[int]:
+        """Создать повторное напоминание"""
+        pool = await self._get_pool()
+        return await pool.fetchval(
+            """
+            INSERT INTO reminders (user_id, scheduled_time, reminder_type, attempt_number)
+            SELECT $1, scheduled_time + make_interval(mins => $2), 'follow_up', attempt_number + 1
+            FROM reminders WHERE id = $3
+            RETURNING id
+            """,
+            user_id, delay_minutes, original_reminder_id
+        )
+
+    async def create_follow_up_reminders(self, follow_ups: List[tuple]) -> None:
+        """Загрузить пачку повторных напоминаний через COPY"""
+        if not follow_ups:
+            return
+        records = [
+            (user_id, scheduled_time, 'follow_up', attempt_number)
+            for user_id, scheduled_time, attempt_number in follow_ups
+        ]
+        pool = await self._get_pool()
+        await pool.copy_records_to_table(
+            'reminders', records=records,
+            columns=('user_id', 'scheduled_time', 'reminder_type', 'attempt_number')
+        )
+
+    async def archive_reminders_batch(self, stale_before: datetime, batch_size: int = 500) -> int:
+        """Перенести одну пачку завершенных и устаревших напоминаний в архив"""
+        pool = await self._get_pool()
+        return await pool.fetchval(POSTGRES_ARCHIVE_REMINDERS, stale_before, batch_size)
+
+    # Мотивация
+
+    async def log_motivation(self, user_id: int, message_type: str, message_text: str):
+        """Записать отправленное мотивационное сообщение"""
+        pool = await self._get_pool()
+        await pool.execute(
+            "INSERT INTO motivation_log (user_id, message_type, message_text) VALUES ($1, $2, $3)",
+            user_id, message_type, message_text
+        )
+
+    async def get_recent_motivations(self, user_id: int, hours: int = 24) -> List[str]:
+        """Получить недавние мотивационные сообщения"""
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "SELECT message_text FROM motivation_log "
+            "WHERE user_id = $1 AND sent_at > (now() AT TIME ZONE 'utc') - make_interval(hours => $2)",
+            user_id, hours
+        )
+        return [row['message_text'] for row in rows]
+
+    # Массовая загрузка
+
+    async def import_users(self, users: List[tuple]):
+        """Загрузить пачку пользователей через COPY во временную таблицу (существующие обновляются)"""
+        records = [
+            (user_id, username, daily_goal, bool(enabled), start_hour, end_hour)
+            for user_id, username, daily_goal, enabled, start_hour, end_hour in users
+        ]
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(POSTGRES_IMPORT_USERS_STAGE)
+                await conn.copy_records_to_table(
+                    'users_import', records=records,
+                    columns=('user_id', 'username', 'daily_goal', 'notifications_enabled', 'start_hour', 'end_hour')
+                )
+                await conn.execute(POSTGRES_IMPORT_USERS)
+
+    async def import_water_intake(self, intakes: List[tuple]):
+        """Загрузить пачку исторических приемов воды через COPY"""
+        records = [
+            (user_id, volume, reminder_id, _timestamp(timestamp))
+            for user_id, volume, reminder_id, timestamp in intakes
+        ]
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                'water_intake', records=records,
+                columns=('user_id', 'volume', 'reminder_id', 'timestamp')
+            )
+
+    async def create_reminders(self, reminders: List[tuple]):
+        """Создать пачку напоминаний через COPY"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table(
+                'reminders', records=reminders,
+                columns=('user_id', 'scheduled_time', 'reminder_type')
+            )
+
+    async def drop_indexes(self):
+        """Удалить индексы, которые замедляют массовую загрузку"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            for drop_sql in POSTGRES_BULK_LOAD_DROP_INDEXES:
+                await conn.execute(drop_sql)
+
+    async def rebuild_indexes(self):
+        """Построить индексы заново и обновить статистику (ANALYZE)"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            for index_sql in POSTGRES_CREATE_INDEXES:
+                await conn.execute(index_sql)
+            for table in ('users', 'water_intake', 'reminders'):
+                await conn.execute(f"ANALYZE {table}")
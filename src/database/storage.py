@@ -0,0 +1,257 @@
+"""
+Интерфейс хранилища данных
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime, date
+from typing import Optional, List, Dict, Any, AsyncIterator
+
+from .models import User, WaterIntake, Reminder
+
+
+class Storage(ABC):
+    """Хранилище данных бота
+
+    Через этот интерфейс работают обработчики, планировщик и статистика.
+    Реализации: DatabaseManager (SQLite, один узел) и PostgresStorage
+    (PostgreSQL, несколько узлов с общей базой).
+
+    Даты и время возвращаются в том же виде, что и у SQLite: модели
+    содержат datetime, а словари статистики - строки 'YYYY-MM-DD' и
+    'YYYY-MM-DD HH:MM:SS'. Время записи приемов хранится в UTC.
+    """
+
+    async def close(self):
+        """Освободить соединения и потоки"""
+
+    @abstractmethod
+    async def init_db(self):
+        """Создать таблицы и индексы"""
+
+    # Пользователи
+
+    @abstractmethod
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """Получить пользователя по ID"""
+
+    @abstractmethod
+    async def create_user(self, user_id: int, username: str = None, daily_goal: int = 2000) -> User:
+        """Создать пользователя (существующий не меняется)"""
+
+    @abstractmethod
+    async def update_user_goal(self, user_id: int, daily_goal: int):
+        """Обновить целевую норму воды"""
+
+    @abstractmethod
+    async def update_user_notifications(self, user_id: int, enabled: bool):
+        """Включить или выключить уведомления"""
+
+    @abstractmethod
+    async def update_user_time_settings(self, user_id: int, start_hour: int, end_hour: int):
+        """Обновить часы отправки напоминаний"""
+
+    @abstractmethod
+    async def get_user_time_settings(self, user_id: int) -> tuple:
+        """Часы отправки напоминаний (start_hour, end_hour)"""
+
+    @abstractmethod
+    async def is_notifications_enabled(self, user_id: int) -> bool:
+        """Включены ли уведомления"""
+
+    @abstractmethod
+    async def update_last_motivation_date(self, user_id: int):
+        """Отметить сегодняшнюю дату особой мотивации"""
+
+    @abstractmethod
+    async def delete_user(self, user_id: int):
+        """Удалить пользователя и все его данные"""
+
+    # Приемы воды
+
+    @abstractmethod
+    async def add_water_intake(self, user_id: int, volume: int, reminder_id: int = None) -> int:
+        """Добавить прием воды, вернуть его ID"""
+
+    @abstractmethod
+    async def add_water_intake_batch(self, intakes: List[tuple], last_seq: int):
+        """Добавить пачку приемов (user_id, volume, reminder_id, timestamp) и позицию журнала одной транзакцией
+
+        Приемы по кнопке напоминания в той же транзакции отмечают ответ на
+        него, как mark_reminder_answered.
+        """
+
+    @abstractmethod
+    async def get_intake_journal_seq(self) -> int:
+        """Номер последней записи журнала приемов, сохраненной в БД"""
+
+    @abstractmethod
+    async def get_daily_intake(self, user_id: int, target_date: date = None) -> int:
+        """Объем воды за день (дни по UTC, по умолчанию - сегодня)"""
+
+    @abstractmethod
+    async def get_intake_history(self, user_id: int, limit: int = 10) -> List[WaterIntake]:
+        """Последние приемы воды"""
+
+    @abstractmethod
+    def iter_intake(self, user_id: int, since: date = None, until: date = None,
+                    chunk_size: int = None) -> AsyncIterator[WaterIntake]:
+        """Потоково прочитать историю приемов за период (даты включительно) пачками по chunk_size"""
+
+    @abstractmethod
+    async def get_daily_progress(self, user_ids: List[int], target_date: date) -> Dict[int, tuple]:
+        """Прогресс пачки пользователей за день одним запросом:
+        user_id -> (daily_goal, объем за день, start_hour, end_hour)"""
+
+    @abstractmethod
+    async def get_user_intake_history(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Приемы воды за сегодня (volume, timestamp)"""
+
+    @abstractmethod
+    async def get_weekly_stats(self, user_id: int) -> List[Dict[str, Any]]:
+        """Объем по дням (date, total) за 7 дней до сегодняшнего (UTC) включительно, дни без приемов - с нулем"""
+
+    # Напоминания
+
+    @abstractmethod
+    async def create_reminder(self, user_id: int, scheduled_time: datetime, reminder_type: str = "regular") -> int:
+        """Создать напоминание, вернуть его ID"""
+
+    @abstractmethod
+    async def get_pending_reminders(self, user_id: int = None, current_time: datetime = None) -> List[Reminder]:
+        """Ожидающие напоминания (пользователя и/или до указанного времени)"""
+
+    @abstractmethod
+    async def claim_due_reminders(self, current_time: datetime, limit: int,
+                                  lease_before: datetime = None) -> List[Reminder]:
+        """Забрать на отправку до limit наступивших напоминаний
+
+        Забранные напоминания переходят в статус 'sending' (с временем
+        current_time и именем узла) и не достаются другим узлам. После
+        отправки статус меняют mark_reminder_completed или
+        mark_reminder_skipped. Напоминания, забранные раньше lease_before и
+        так и не отправленные (узел упал посреди пачки), забираются снова.
+        """
+
+    @abstractmethod
+    async def mark_reminder_completed(self, reminder_id: int):
+        """Отметить напоминание как отправленное (для плановых - с учетом отправки в слоте)"""
+
+    @abstractmethod
+    async def mark_reminders_suppressed(self, reminder_ids: List[int]):
+        """Отметить пачку напоминаний как подавленные (не отправлены, пользователь и так на графике)"""
+
+    @abstractmethod
+    async def renew_reminder_claims(self, reminder_ids: List[int], claimed_at: datetime) -> List[int]:
+        """Продлить аренду забранных этим узлом и еще не отправленных напоминаний
+
+        Время захвата сдвигается на claimed_at, чтобы долгую пачку не забрал
+        другой узел. Возвращает id, которые все еще принадлежат узлу;
+        остальные аренду уже потеряли, и отправлять их нельзя.
+        """
+
+    @abstractmethod
+    async def release_reminders(self, reminder_ids: List[int]):
+        """Вернуть забранные, но не отправленные напоминания из 'sending' в 'pending'
+
+        Вызывается при остановке: напоминания отправит следующий запуск
+        (или другой узел), а не отправленные до остановки не теряются.
+        """
+
+    @abstractmethod
+    async def catch_up_reminders(self, now: datetime, stale_before: datetime, ramp_seconds: int,
+                                 lease_before: datetime = None) -> Optional[Dict[str, int]]:
+        """Разобрать напоминания, пропущенные за время простоя (наступившие к now)
+
+        Пропущенные раньше stale_before помечаются 'expired', из остальных у
+        каждого пользователя остается одно (лишние - 'suppressed'), а
+        оставшиеся распределяются по окну [now, now + ramp_seconds) через
+        send_after; scheduled_time не меняется. Возвращает количество по
+        исходам: {'expired', 'merged', 'spread'}, или None, если догон
+        пропущен: его уже выполняет другой узел или другой узел забирал
+        напоминания после lease_before (он работает, и простоя не было).
+        """
+
+    @abstractmethod
+    async def mark_reminder_answered(self, reminder_id: int) -> bool:
+        """Отметить первый прием воды по отправленному напоминанию (статус 'answered')
+
+        Возвращает False, если напоминание уже отмечено или не было отправлено.
+        Для плановых напоминаний увеличивает конверсию их слота.
+        """
+
+    @abstractmethod
+    async def get_reminder_slot_stats(self, user_id: int) -> Dict[int, tuple]:
+        """Конверсия плановых напоминаний пользователя: слот (минута суток) -> (sent, converted)"""
+
+    @abstractmethod
+    async def mark_reminder_skipped(self, reminder_id: int):
+        """Отметить напоминание как пропущенное"""
+
+    @abstractmethod
+    async def postpone_reminder(self, reminder_id: int, minutes: int):
+        """Сдвинуть напоминание на указанное количество минут"""
+
+    @abstractmethod
+    async def delete_pending_reminders(self, user_id: int):
+        """Удалить ожидающие напоминания пользователя"""
+
+    @abstractmethod
+    async def create_follow_up_reminder(self, user_id: int, original_reminder_id: int,
+                                        delay_minutes: int = 5) -> Optional[int]:
+        """Создать повторное напоминание через delay_minutes после исходного"""
+
+    @abstractmethod
+    async def create_follow_up_reminders(self, follow_ups: List[tuple]) -> None:
+        """Создать пачку повторных напоминаний (user_id, scheduled_time, attempt_number)"""
+
+    @abstractmethod
+    async def archive_reminders_batch(self, stale_before: datetime, batch_size: int = 500) -> int:
+        """Перенести пачку завершенных и устаревших напоминаний в архив, вернуть их число"""
+
+    # Мотивация
+
+    @abstractmethod
+    async def log_motivation(self, user_id: int, message_type: str, message_text: str):
+        """Записать отправленное мотивационное сообщение"""
+
+    @abstractmethod
+    async def get_recent_motivations(self, user_id: int, hours: int = 24) -> List[str]:
+        """Тексты мотивационных сообщений за последние hours часов"""
+
+    # Аналитика
+
+    @abstractmethod
+    def iter_intake_rows(self, since: date = None, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Приемы воды всех пользователей с даты since пачками строк
+        (id, user_id, volume, время UTC в секундах Unix, reminder_id или 0)"""
+
+    @abstractmethod
+    def iter_sent_reminder_rows(self, since: date = None, chunk_size: int = None) -> AsyncIterator[List[tuple]]:
+        """Отправленные напоминания, включая архив, пачками строк
+        (id, user_id, время по расписанию в секундах Unix)"""
+
+    @abstractmethod
+    async def get_user_goals(self) -> List[tuple]:
+        """Нормы воды всех пользователей (user_id, daily_goal)"""
+
+    # Массовая загрузка
+
+    @abstractmethod
+    async def import_users(self, users: List[tuple]):
+        """Загрузить пачку пользователей (user_id, username, daily_goal, notifications_enabled,
+        start_hour, end_hour) одной транзакцией; существующие пользователи обновляются"""
+
+    @abstractmethod
+    async def import_water_intake(self, intakes: List[tuple]):
+        """Загрузить пачку исторических приемов (user_id, volume, reminder_id, timestamp) одной транзакцией"""
+
+    @abstractmethod
+    async def create_reminders(self, reminders: List[tuple]):
+        """Создать пачку напоминаний (user_id, scheduled_time, reminder_type) одной транзакцией"""
+
+    @abstractmethod
+    async def drop_indexes(self):
+        """Удалить индексы, замедляющие массовую загрузку"""
+
+    @abstractmethod
+    async def rebuild_indexes(self):
+        """Построить индексы заново и обновить статистику планировщика запросов"""
@@ -3,8 +3,9 @@
 """
 from .commands import router as commands_router, send_reminder_message
 from .callbacks import router as callbacks_router
+from .admin import router as admin_router
 
 # Объединяем все роутеры
-__all__ = ['commands_router', 'callbacks_router', 'send_reminder_message']
+__all__ = ['commands_router', 'callbacks_router', 'admin_router', 'send_reminder_message']
 
 
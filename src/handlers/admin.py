@@ -0,0 +1,111 @@
+"""
+Административные команды бота
+"""
+import asyncio
+import math
+from datetime import date, timedelta
+
+from aiogram import Router, F
+from aiogram.types import Message, FSInputFile
+from aiogram.filters import Command, CommandObject
+
+from src.database import db_manager, intake_buffer
+from src.metrics import profiler, watchdog
+from config import settings
+
+# Создаем роутер (доступен только администраторам)
+router = Router()
+router.message.filter(F.from_user.id.in_(settings.ADMIN_IDS))
+
+PROFILE_HELP = """
+🛠 *Профилирование*
+
+/profile start [мс] - начать сэмплирование стеков
+/profile stop - остановить сэмплирование
+/profile dump - выгрузить flamegraph (folded stacks)
+/profile reset - сбросить накопленные сэмплы
+/profile slow on|off - захват медленных обновлений
+/profile slow - последние медленные обновления
+"""
+
+# Больше истории когортный отчет не охватывает
+COHORT_MAX_DAYS = 3650
+COHORT_HELP = f"📊 /cohort [дней] - когортная аналитика за последние дни (от 1 до {COHORT_MAX_DAYS})"
+
+
+def _parse_positive(value: str, cast, limit: float = math.inf):
+    """Число из аргумента команды в диапазоне (0, limit] или None, если аргумент некорректен"""
+    try:
+        number = cast(value)
+    except ValueError:
+        return None
+    return number if 0 < number <= limit and math.isfinite(number) else None
+
+
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject):
+    """Обработчик команды /profile"""
+    args = (command.args or "").split()
+    action = args[0] if args else ""
+
+    if action == "start":
+        interval_ms = _parse_positive(args[1], float) if len(args) > 1 else None
+        if len(args) > 1 and interval_ms is None:
+            await message.answer(PROFILE_HELP, parse_mode="Markdown")
+            return
+        profiler.start(interval_ms)
+        await message.answer(f"▶️ Сэмплирование запущено, интервал {profiler.interval_ms:g} мс")
+    elif action == "stop":
+        profiler.stop()
+        await message.answer(f"⏹ Сэмплирование остановлено, стеков: {len(profiler.samples)}")
+    elif action == "reset":
+        profiler.reset()
+        profiler.slow_updates.clear()
+        await message.answer("🧹 Сэмплы сброшены")
+    elif action == "dump":
+        path = profiler.dump()
+        await message.answer_document(FSInputFile(path), caption="🔥 Профиль в формате folded stacks")
+    elif action == "slow" and len(args) > 1:
+        profiler.slow_capture = args[1] == "on"
+        status = "включен" if profiler.slow_capture else "выключен"
+        await message.answer(f"🐢 Захват медленных обновлений {status} (порог {profiler.slow_threshold_ms} мс)")
+    elif action == "slow":
+        report = profiler.format_slow_updates() if profiler.slow_updates else "Медленных обновлений нет"
+        # Ограничение Telegram на длину сообщения
+        await message.answer(report[-4000:])
+    else:
+        await message.answer(PROFILE_HELP, parse_mode="Markdown")
+
+
+@router.message(Command("loop"))
+async def cmd_loop(message: Message):
+    """Обработчик команды /loop - загрузка цикла событий и пулов потоков"""
+    # Снимок не сбрасывает окно: его закрывает только периодический отчет
+    report = "\n".join(watchdog.snapshot())
+    if watchdog.last_report:
+        report += "\n\nПрошлое окно:\n" + "\n".join(watchdog.last_report)
+    await message.answer(f"⏱ {report}")
+
+
+@router.message(Command("cohort"))
+async def cmd_cohort(message: Message, command: CommandObject):
+    """Обработчик команды /cohort [дней] - когортная аналитика по всем пользователям"""
+    args = (command.args or "").split()
+    days = _parse_positive(args[0], int, COHORT_MAX_DAYS) if args else settings.ANALYTICS_DAYS
+    if days is None:
+        await message.answer(COHORT_HELP)
+        return
+    
+    # numpy загружается при первой команде, а не при запуске бота
+    from src.stats.cohort import CohortAnalytics, format_report
+    
+    await intake_buffer.flush()
+    try:
+        analytics = await CohortAnalytics.load(db_manager, date.today() - timedelta(days=days - 1))
+    except RuntimeError as error:
+        await message.answer(f"⚠️ {error}")
+        return
+    
+    # Векторные проходы по миллионам строк не должны блокировать цикл событий
+    report = await asyncio.to_thread(analytics.report)
+    await message.answer(format_report(report, days), parse_mode="Markdown")
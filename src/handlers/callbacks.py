@@ -1,20 +1,51 @@
 """
 Обработчики callback-кнопок
 """
+from typing import Optional
+
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 
-from src.database import db_manager
+from src.database import db_manager, intake_buffer
 from src.motivation import motivation_manager
 from src.stats import stats_manager
 from src.scheduler import scheduler
 from src.states import WaterReminderStates, SettingsStates
+from src.texts import texts
 from config import settings
+from .keyboards import (
+    ACHIEVEMENTS_KEYBOARD,
+    FACTS_KEYBOARD,
+    GOAL_CHOICE_KEYBOARD,
+    HISTORY_EMPTY_KEYBOARD,
+    HISTORY_KEYBOARD,
+    INTAKE_RESULT_KEYBOARD,
+    JOURNEY_KEYBOARD,
+    MOTIVATE_KEYBOARD,
+    SETTINGS_KEYBOARD,
+    SETTINGS_UPDATED_KEYBOARD,
+    STATS_KEYBOARD,
+    TIME_CHOICE_KEYBOARD,
+    WEEKLY_STATS_KEYBOARD,
+    volume_keyboard
+)
+from .dedup import callback_dedup, edit_coalescer
 
 # Создаем роутер
 router = Router()
 
+# Тексты из каталога сообщений: готовые строки и скомпилированные шаблоны
+JOURNEY_TEMPLATE = texts.template("journey")
+STATS_TEMPLATE = texts.template("stats")
+WEEKLY_STATS_TEMPLATE = texts.template("weekly_stats")
+SETTINGS_TEMPLATE = texts.template("settings")
+ACHIEVEMENTS_EMPTY_TEXT = texts["achievements_empty"]
+NOTIFICATION_STATUS = {True: texts["notifications_on"], False: texts["notifications_off"]}
+
+# Отбрасываем повторные callback'и до обработчиков
+router.callback_query.outer_middleware(callback_dedup)
+
 
 @router.callback_query(F.data == "start_journey")
 async def callback_start_journey(callback: CallbackQuery):
@@ -25,63 +56,51 @@ async def callback_start_journey(callback: CallbackQuery):
     stats = await stats_manager.get_daily_stats(callback.from_user.id)
     
     if stats:
-        journey_text = f"""
-🚀 *Добро пожаловать в ваш путь к здоровью!*
-
-{stats['progress_bar']}
-
-*Текущий результат:* {stats['current_ml']}/{stats['goal_ml']} мл
-*Статус:* {stats['status_text']}
-
-*Следующее напоминание:* {stats['next_reminder']}
-
-💧 *Готовы начать?* Я буду напоминать вам пить воду каждые 1 час 45 минут!
-"""
+        journey_text = JOURNEY_TEMPLATE.render(**stats)
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Выпил(250мл)", callback_data="water_intake_250"),
-                InlineKeyboardButton(text="🔄 Выпил больше", callback_data="water_intake_custom")
-            ],
-            [
-                InlineKeyboardButton(text="📊 Статистика", callback_data="stats"),
-                InlineKeyboardButton(text="⚙️ Настройки", callback_data="settings")
-            ]
-        ])
+        keyboard = JOURNEY_KEYBOARD
         
         await callback.message.edit_text(journey_text, reply_markup=keyboard, parse_mode="Markdown")
     else:
         await callback.message.edit_text("❌ Ошибка получения данных. Попробуйте позже.")
 
 
-@router.callback_query(F.data == "water_intake_250")
-async def callback_water_intake_250(callback: CallbackQuery):
-    """Обработчик кнопки 'Выпил(250мл)'"""
-    await callback.answer()
-    
+def _reminder_id(data: str, prefix: str) -> Optional[int]:
+    """ID напоминания из callback_data вида '<prefix>_<reminder_id>' (None, если кнопка не из напоминания)"""
+    suffix = data[len(prefix) + 1:]
+    return int(suffix) if suffix.isdigit() else None
+
+
+async def _record_intake(callback: CallbackQuery, volume: int, reminder_id: Optional[int]):
+    """Записать прием воды и показать подтверждение"""
     user_id = callback.from_user.id
     
-    # Добавляем запись о приеме воды
-    await db_manager.add_water_intake(user_id, settings.WATER_PER_SESSION_ML)
+    # Пользователь ответил - повторные напоминания больше не нужны
+    scheduler.follow_ups.acknowledge_user(user_id)
     
-    # Получаем обновленную статистику
-    stats = await stats_manager.get_daily_stats(user_id)
+    # Добавляем запись о приеме воды (итог обновляется сразу, запись в БД - отложенно);
+    # прием по кнопке напоминания засчитывается в конверсию слота при сбросе буфера
+    current_ml = await intake_buffer.add(user_id, volume, reminder_id)
+    
+    user = await db_manager.get_user(user_id)
+    goal_ml = user.daily_goal if user else settings.DAILY_GOAL_ML
+    percentage = min((current_ml / goal_ml) * 100, 100)
     
     # Получаем сообщение подтверждения
     confirmation_text = await motivation_manager.get_intake_confirmation(
-        user_id, stats['current_ml'], stats['goal_ml']
+        user_id, current_ml, goal_ml
     )
     
     # Проверяем достижение вех
     milestone_messages = []
     for milestone in [50, 75, 95]:
-        if stats['percentage'] >= milestone:
+        if percentage >= milestone:
             milestone_msg = await motivation_manager.get_milestone_message(user_id, milestone)
             if milestone_msg:
                 milestone_messages.append(milestone_msg)
     
     # Проверяем достижение цели
-    if stats['percentage'] >= 100:
+    if percentage >= 100:
         goal_msg = await motivation_manager.get_goal_achieved_message(user_id)
         milestone_messages.append(goal_msg)
     
@@ -91,41 +110,27 @@ async def callback_water_intake_250(callback: CallbackQuery):
         full_message += "\n\n" + "\n\n".join(milestone_messages)
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📊 Статистика", callback_data="stats"),
-            InlineKeyboardButton(text="💫 Мотивация", callback_data="motivate")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = INTAKE_RESULT_KEYBOARD
     
-    await callback.message.edit_text(full_message, reply_markup=keyboard, parse_mode="Markdown")
+    await edit_coalescer.edit_text(callback.message, full_message, reply_markup=keyboard, parse_mode="Markdown")
 
 
-@router.callback_query(F.data == "water_intake_custom")
+@router.callback_query(F.data.startswith("water_intake_250"))
+async def callback_water_intake_250(callback: CallbackQuery):
+    """Обработчик кнопки 'Выпил(250мл)' (в меню и в напоминании)"""
+    await callback.answer()
+    
+    reminder_id = _reminder_id(callback.data, "water_intake_250")
+    await _record_intake(callback, settings.WATER_PER_SESSION_ML, reminder_id)
+
+
+@router.callback_query(F.data.startswith("water_intake_custom"))
 async def callback_water_intake_custom(callback: CallbackQuery, state: FSMContext):
     """Обработчик кнопки 'Выпил больше'"""
     await callback.answer()
     
-    # Показываем меню выбора объема
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="150мл", callback_data="water_volume_150"),
-            InlineKeyboardButton(text="200мл", callback_data="water_volume_200")
-        ],
-        [
-            InlineKeyboardButton(text="250мл", callback_data="water_volume_250"),
-            InlineKeyboardButton(text="300мл", callback_data="water_volume_300")
-        ],
-        [
-            InlineKeyboardButton(text="500мл", callback_data="water_volume_500")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    # Показываем меню выбора объема (из напоминания - с его ID в кнопках)
+    keyboard = volume_keyboard(_reminder_id(callback.data, "water_intake_custom"))
     
     await callback.message.edit_text(
         "💧 *Выберите объем выпитой воды:*",
@@ -139,52 +144,26 @@ async def callback_water_volume(callback: CallbackQuery):
     """Обработчик выбора объема воды"""
     await callback.answer()
     
-    # Извлекаем объем из callback_data
-    volume = int(callback.data.split("_")[-1])
-    
-    user_id = callback.from_user.id
-    
-    # Добавляем запись о приеме воды
-    await db_manager.add_water_intake(user_id, volume)
+    # callback_data: water_volume_<объем>[_<reminder_id>]
+    parts = callback.data.split("_")
+    volume = int(parts[2])
+    reminder_id = int(parts[3]) if len(parts) > 3 else None
     
-    # Получаем обновленную статистику
-    stats = await stats_manager.get_daily_stats(user_id)
-    
-    # Получаем сообщение подтверждения
-    confirmation_text = await motivation_manager.get_intake_confirmation(
-        user_id, stats['current_ml'], stats['goal_ml']
-    )
-    
-    # Проверяем достижение вех
-    milestone_messages = []
-    for milestone in [50, 75, 95]:
-        if stats['percentage'] >= milestone:
-            milestone_msg = await motivation_manager.get_milestone_message(user_id, milestone)
-            if milestone_msg:
-                milestone_messages.append(milestone_msg)
-    
-    # Проверяем достижение цели
-    if stats['percentage'] >= 100:
-        goal_msg = await motivation_manager.get_goal_achieved_message(user_id)
-        milestone_messages.append(goal_msg)
-    
-    # Объединяем сообщения
-    full_message = confirmation_text
-    if milestone_messages:
-        full_message += "\n\n" + "\n\n".join(milestone_messages)
+    await _record_intake(callback, volume, reminder_id)
+
+
+@router.callback_query(F.data.startswith("postpone_"))
+async def callback_postpone(callback: CallbackQuery):
+    """Обработчик кнопки 'Напомнить позже' в напоминании"""
+    minutes = settings.REMINDER_POSTPONE_MINUTES
+    await callback.answer(f"⏰ Напомню через {minutes} минут")
     
-    # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📊 Статистика", callback_data="stats"),
-            InlineKeyboardButton(text="💫 Мотивация", callback_data="motivate")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    reminder_id = _reminder_id(callback.data, "postpone")
+    if reminder_id:
+        await scheduler.snooze_reminder(callback.from_user.id, reminder_id, minutes)
     
-    await callback.message.edit_text(full_message, reply_markup=keyboard, parse_mode="Markdown")
+    # Убираем кнопки, чтобы не откладывать одно напоминание несколько раз
+    await callback.message.edit_reply_markup(reply_markup=None)
 
 
 @router.callback_query(F.data == "stats")
@@ -202,33 +181,10 @@ async def callback_stats(callback: CallbackQuery):
         return
     
     # Формируем сообщение со статистикой
-    stats_text = f"""
-📊 *Ваша статистика за сегодня*
-
-{stats['progress_bar']}
-
-*Текущий результат:* {stats['current_ml']}/{stats['goal_ml']} мл
-*Процент выполнения:* {stats['percentage']:.1f}%
-*Статус:* {stats['status_text']}
-
-*Приемов воды:* {stats['intake_count']}
-*Средний объем за прием:* {stats['avg_per_intake']:.0f} мл
-*Следующее напоминание:* {stats['next_reminder']}
-"""
+    stats_text = STATS_TEMPLATE.render(**stats)
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📈 Недельная статистика", callback_data="weekly_stats"),
-            InlineKeyboardButton(text="🏆 Достижения", callback_data="achievements")
-        ],
-        [
-            InlineKeyboardButton(text="📋 История приемов", callback_data="intake_history")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = STATS_KEYBOARD
     
     await callback.message.edit_text(stats_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -248,27 +204,10 @@ async def callback_weekly_stats(callback: CallbackQuery):
         return
     
     # Формируем сообщение
-    weekly_text = f"""
-📈 *Недельная статистика*
-
-*Общий объем:* {weekly_stats['total_ml']} мл
-*Средний в день:* {weekly_stats['avg_daily']:.0f} мл
-*Процент выполнения:* {weekly_stats['weekly_percentage']:.1f}%
-*Дней с данными:* {weekly_stats['days_with_data']}/7
-
-{weekly_stats['chart']}
-"""
+    weekly_text = WEEKLY_STATS_TEMPLATE.render(**weekly_stats)
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📊 Дневная статистика", callback_data="stats"),
-            InlineKeyboardButton(text="🏆 Достижения", callback_data="achievements")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = WEEKLY_STATS_KEYBOARD
     
     await callback.message.edit_text(weekly_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -284,33 +223,14 @@ async def callback_achievements(callback: CallbackQuery):
     achievements = await stats_manager.get_achievements(user_id)
     
     if not achievements:
-        achievements_text = """
-🏆 *Достижения*
-
-У вас пока нет достижений, но это только начало!
-
-*Доступные достижения:*
-• 🏆 Неделя дисциплины - 7 дней подряд
-• 👑 Месяц мастерства - 30 дней подряд
-• 💎 Идеальный день - 100% цели за день
-
-Продолжайте пить воду регулярно!
-"""
+        achievements_text = ACHIEVEMENTS_EMPTY_TEXT
     else:
         achievements_text = "🏆 *Ваши достижения:*\n\n"
         for achievement in achievements:
             achievements_text += f"{achievement['icon']} *{achievement['name']}*\n{achievement['description']}\n\n"
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📊 Статистика", callback_data="stats"),
-            InlineKeyboardButton(text="💫 Мотивация", callback_data="motivate")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = ACHIEVEMENTS_KEYBOARD
     
     await callback.message.edit_text(achievements_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -329,15 +249,7 @@ async def callback_motivate(callback: CallbackQuery):
         motivation_text = "💧 *Помните:* каждый глоток воды - это забота о себе! ✨"
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="💫 Еще мотивации", callback_data="motivate"),
-            InlineKeyboardButton(text="🔬 Научные факты", callback_data="scientific_facts")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = MOTIVATE_KEYBOARD
     
     await callback.message.edit_text(motivation_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -353,15 +265,7 @@ async def callback_scientific_facts(callback: CallbackQuery):
     fact_text = await motivation_manager.get_scientific_fact(user_id)
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🔬 Еще факты", callback_data="scientific_facts"),
-            InlineKeyboardButton(text="💫 Мотивация", callback_data="motivate")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = FACTS_KEYBOARD
     
     await callback.message.edit_text(fact_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -380,34 +284,16 @@ async def callback_settings(callback: CallbackQuery):
         return
     
     # Определяем статус уведомлений из модели пользователя
-    notification_status = "🔔 Включены" if user.notifications_enabled else "🔕 Выключены"
+    notification_status = NOTIFICATION_STATUS[bool(user.notifications_enabled)]
     
-    settings_text = f"""
-⚙️ *Настройки WaterReminder*
-
-*Текущая дневная цель:* {user.daily_goal} мл
-*Время напоминаний:* {user.start_hour:02d}:00 - {user.end_hour:02d}:00
-*Интервал:* каждые 1 час 45 минут
-*Объем за прием:* 250 мл
-*Уведомления:* {notification_status}
-
-Выберите, что хотите изменить:
-"""
+    settings_text = SETTINGS_TEMPLATE.render(
+        daily_goal=user.daily_goal,
+        start_hour=user.start_hour,
+        end_hour=user.end_hour,
+        notification_status=notification_status
+    )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🎯 Изменить цель", callback_data="change_goal")
-        ],
-        [
-            InlineKeyboardButton(text="⏰ Изменить время", callback_data="change_time")
-        ],
-        [
-            InlineKeyboardButton(text="🔔 Уведомления", callback_data="toggle_notifications")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = SETTINGS_KEYBOARD
     
     await callback.message.edit_text(settings_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -425,19 +311,7 @@ async def callback_change_goal(callback: CallbackQuery, state: FSMContext):
     current_goal = user.daily_goal if user else 2000
     
     # Показываем варианты целей
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="1500мл", callback_data="goal_1500"),
-            InlineKeyboardButton(text="2000мл", callback_data="goal_2000")
-        ],
-        [
-            InlineKeyboardButton(text="2500мл", callback_data="goal_2500"),
-            InlineKeyboardButton(text="3000мл", callback_data="goal_3000")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="settings")
-        ]
-    ])
+    keyboard = GOAL_CHOICE_KEYBOARD
     
     await callback.message.edit_text(
         f"🎯 *Выберите новую дневную цель:*\n\n*Текущая цель:* {current_goal}мл",
@@ -464,12 +338,7 @@ async def callback_set_goal(callback: CallbackQuery, state: FSMContext):
     await scheduler.schedule_daily_reminders(user_id)
     
     # Создаем кнопки для возврата
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🔙 Назад к настройкам", callback_data="settings"),
-            InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = SETTINGS_UPDATED_KEYBOARD
     
     # Отправляем подтверждение
     await callback.message.edit_text(
@@ -518,12 +387,7 @@ async def callback_toggle_notifications(callback: CallbackQuery):
         status_icon = "🔕"
     
     # Показываем результат
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🔙 Назад к настройкам", callback_data="settings"),
-            InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = SETTINGS_UPDATED_KEYBOARD
     
     await callback.message.edit_text(
         f"{status_icon} *Уведомления {status_text}!*\n\n"
@@ -550,19 +414,7 @@ async def callback_change_time(callback: CallbackQuery, state: FSMContext):
     start_hour, end_hour = user.start_hour, user.end_hour
     
     # Показываем варианты времени
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="7:00 - 21:00", callback_data="time_7_21"),
-            InlineKeyboardButton(text="8:00 - 22:00", callback_data="time_8_22")
-        ],
-        [
-            InlineKeyboardButton(text="9:00 - 23:00", callback_data="time_9_23"),
-            InlineKeyboardButton(text="6:00 - 20:00", callback_data="time_6_20")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="settings")
-        ]
-    ])
+    keyboard = TIME_CHOICE_KEYBOARD
     
     await callback.message.edit_text(
         f"⏰ *Выберите время работы напоминаний:*\n\n"
@@ -592,12 +444,7 @@ async def callback_set_time(callback: CallbackQuery, state: FSMContext):
     await scheduler.schedule_daily_reminders(user_id)
     
     # Создаем кнопки для возврата
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🔙 Назад к настройкам", callback_data="settings"),
-            InlineKeyboardButton(text="🏠 Главное меню", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = SETTINGS_UPDATED_KEYBOARD
     
     # Отправляем подтверждение
     await callback.message.edit_text(
@@ -626,10 +473,7 @@ async def callback_intake_history(callback: CallbackQuery):
             "📋 *История приемов*\n\n"
             "За сегодня приемов воды не было.\n"
             "Начните свой путь к здоровью прямо сейчас! 💧",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="💧 Выпить воду", callback_data="water_intake_250")],
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="stats")]
-            ]),
+            reply_markup=HISTORY_EMPTY_KEYBOARD,
             parse_mode="Markdown"
         )
         return
@@ -651,15 +495,7 @@ async def callback_intake_history(callback: CallbackQuery):
     history_text += f"\n*Общий объем:* {total_ml} мл"
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="💧 Добавить прием", callback_data="water_intake_250"),
-            InlineKeyboardButton(text="📊 Статистика", callback_data="stats")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="stats")
-        ]
-    ])
+    keyboard = HISTORY_KEYBOARD
     
     await callback.message.edit_text(
         history_text,
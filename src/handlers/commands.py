@@ -1,20 +1,39 @@
 """
 Обработчики команд бота
 """
+import os
+from datetime import datetime, timedelta
+
 from aiogram import Router, F
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command
+from aiogram.types import Message, FSInputFile
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 
-from src.database import db_manager
+from src.database import db_manager, intake_buffer
 from src.motivation import motivation_manager
 from src.stats import stats_manager
+from src.stats.export import EXPORT_FORMATS, export_intake, export_filename
 from src.scheduler import scheduler
+from src.texts import texts
 from config import settings
+from .keyboards import (
+    MOTIVATE_KEYBOARD,
+    SETTINGS_KEYBOARD,
+    START_KEYBOARD,
+    STATS_COMMAND_KEYBOARD,
+    reminder_keyboard
+)
 
 # Создаем роутер
 router = Router()
 
+# Тексты из каталога сообщений: готовые строки и скомпилированные шаблоны
+WELCOME_TEXT = texts["welcome"]
+STATS_TEMPLATE = texts.template("stats")
+SETTINGS_TEMPLATE = texts.template("settings")
+NOTIFICATION_STATUS = {True: texts["notifications_on"], False: texts["notifications_off"]}
+EXPORT_USAGE = texts["export_usage"]
+
 
 @router.message(Command("start"))
 async def cmd_start(message: Message, state: FSMContext):
@@ -28,43 +47,11 @@ async def cmd_start(message: Message, state: FSMContext):
     # Планируем ежедневные напоминания
     await scheduler.schedule_daily_reminders(user_id)
     
-    # Приветственное сообщение
-    welcome_text = """
-💧 *Добро пожаловать в WaterReminder!* 🌊
-
-Я ваш персональный гид к здоровой привычке пить воду! 
-
-🎯 *Моя цель:* помочь вам выпивать 2 литра воды в день
-⏰ *Расписание:* напоминания с 8:00 до 22:00
-📊 *Статистика:* отслеживание прогресса и мотивация
-💫 *Мотивация:* вдохновляющие сообщения и научные факты
-
-*Что я буду делать:*
-• Напоминать пить воду каждые 1 час 45 минут
-• Отслеживать ваш прогресс к цели 2000мл
-• Мотивировать интересными фактами о воде
-• Показывать статистику и достижения
-
-🚀 *Начнем наш путь к здоровью!*
-
-Используйте команды:
-/stats - ваша статистика за сегодня
-/settings - настройки цели
-/motivate - случайная мотивация
-
-💝 *Помните:* каждый глоток воды - это забота о себе!
-"""
+    # Приветственное сообщение (готовый текст)
+    welcome_text = WELCOME_TEXT
     
     # Создаем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🚀 Начать путь", callback_data="start_journey"),
-            InlineKeyboardButton(text="⚙️ Настройки", callback_data="settings")
-        ],
-        [
-            InlineKeyboardButton(text="💫 Мотивация", callback_data="motivate")
-        ]
-    ])
+    keyboard = START_KEYBOARD
     
     await message.answer(welcome_text, reply_markup=keyboard, parse_mode="Markdown")
     await state.clear()
@@ -83,32 +70,10 @@ async def cmd_stats(message: Message):
         return
     
     # Формируем сообщение со статистикой
-    stats_text = f"""
-📊 *Ваша статистика за сегодня*
-
-{stats['progress_bar']}
-
-*Текущий результат:* {stats['current_ml']}/{stats['goal_ml']} мл
-*Процент выполнения:* {stats['percentage']:.1f}%
-*Статус:* {stats['status_text']}
-
-*Приемов воды:* {stats['intake_count']}
-*Средний объем за прием:* {stats['avg_per_intake']:.0f} мл
-*Следующее напоминание:* {stats['next_reminder']}
-
-{motivation_manager.get_progress_bar(stats['current_ml'], stats['goal_ml'])}
-"""
+    stats_text = STATS_TEMPLATE.render(**stats)
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="📈 Недельная статистика", callback_data="weekly_stats"),
-            InlineKeyboardButton(text="🏆 Достижения", callback_data="achievements")
-        ],
-        [
-            InlineKeyboardButton(text="📋 История приемов", callback_data="intake_history")
-        ]
-    ])
+    keyboard = STATS_COMMAND_KEYBOARD
     
     await message.answer(stats_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -124,31 +89,14 @@ async def cmd_settings(message: Message):
         await message.answer("❌ Ошибка получения настроек. Попробуйте позже.")
         return
     
-    settings_text = f"""
-⚙️ *Настройки WaterReminder*
-
-*Текущая дневная цель:* {user.daily_goal} мл
-*Время напоминаний:* 8:00 - 22:00
-*Интервал:* каждые 1 час 45 минут
-*Объем за прием:* 250 мл
-
-Выберите, что хотите изменить:
-"""
+    settings_text = SETTINGS_TEMPLATE.render(
+        daily_goal=user.daily_goal,
+        start_hour=user.start_hour,
+        end_hour=user.end_hour,
+        notification_status=NOTIFICATION_STATUS[bool(user.notifications_enabled)]
+    )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🎯 Изменить цель", callback_data="change_goal")
-        ],
-        [
-            InlineKeyboardButton(text="⏰ Изменить время", callback_data="change_time")
-        ],
-        [
-            InlineKeyboardButton(text="🔔 Уведомления", callback_data="toggle_notifications")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = SETTINGS_KEYBOARD
     
     await message.answer(settings_text, reply_markup=keyboard, parse_mode="Markdown")
 
@@ -165,22 +113,48 @@ async def cmd_motivate(message: Message):
         motivation_text = "💧 *Помните:* каждый глоток воды - это забота о себе! ✨"
     
     # Добавляем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="💫 Еще мотивации", callback_data="motivate"),
-            InlineKeyboardButton(text="🔬 Научные факты", callback_data="scientific_facts")
-        ],
-        [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main")
-        ]
-    ])
+    keyboard = MOTIVATE_KEYBOARD
     
     await message.answer(motivation_text, reply_markup=keyboard, parse_mode="Markdown")
 
 
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    """Обработчик команды /export [csv|json] [дней] - выгрузка истории приемов воды"""
+    user_id = message.from_user.id
+    args = (command.args or "").lower().split()
+    
+    export_format = next((arg for arg in args if arg in EXPORT_FORMATS), "csv")
+    # Кроме формата допустимо только число дней больше нуля
+    extra = [arg for arg in args if arg not in EXPORT_FORMATS]
+    if len(extra) > 1 or (extra and not (extra[0].isdigit() and int(extra[0]) > 0)):
+        await message.answer(EXPORT_USAGE)
+        return
+    days = int(extra[0]) if extra else None
+    # Приемы хранятся с временем UTC - период отсчитываем от текущего дня по UTC
+    since = datetime.utcnow().date() - timedelta(days=days - 1) if days else None
+    
+    # Приемы из буфера отложенной записи тоже должны попасть в выгрузку
+    await intake_buffer.flush()
+    
+    path, count = await export_intake(db_manager.iter_intake(user_id, since=since), export_format)
+    try:
+        if not count:
+            await message.answer("📭 История приемов воды пока пуста.")
+            return
+        
+        period = f"за {days} дн." if days else "за все время"
+        await message.answer_document(
+            FSInputFile(path, filename=export_filename(user_id, export_format)),
+            caption=f"📄 История приемов воды {period}: {count} записей"
+        )
+    finally:
+        os.remove(path)
+
+
 # Функция для отправки напоминаний (используется планировщиком)
-async def send_reminder_message(user_id: int, reminder_id: int, reminder_type: str):
-    """Отправить напоминание пользователю"""
+async def send_reminder_message(user_id: int, reminder_id: int, reminder_type: str) -> bool:
+    """Отправить напоминание пользователю. Возвращает True, если сообщение доставлено"""
     from src.bot import bot
     
     try:
@@ -193,26 +167,19 @@ async def send_reminder_message(user_id: int, reminder_id: int, reminder_type: s
             message_text = await motivation_manager.get_water_reminder(user_id)
         
         # Создаем кнопки
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="✅ Выпил(250мл)", callback_data=f"water_intake_250_{reminder_id}"),
-                InlineKeyboardButton(text="🔄 Выпил больше", callback_data=f"water_intake_custom_{reminder_id}")
-            ],
-            [
-                InlineKeyboardButton(text="⏰ Напомнить позже", callback_data=f"postpone_{reminder_id}"),
-                InlineKeyboardButton(text="💫 Мотивация!", callback_data="motivate")
-            ]
-        ])
+        keyboard = reminder_keyboard(reminder_id)
         
         # Отправляем сообщение
         await bot.send_message(user_id, message_text, reply_markup=keyboard, parse_mode="Markdown")
         
         # Отмечаем напоминание как отправленное
         await db_manager.mark_reminder_completed(reminder_id)
+        return True
         
     except Exception as e:
         print(f"Ошибка отправки напоминания: {e}")
         # Отмечаем напоминание как пропущенное при ошибке
         await db_manager.mark_reminder_skipped(reminder_id)
+        return False
 
 
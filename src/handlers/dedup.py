@@ -0,0 +1,115 @@
+"""
+Защита от повторной обработки callback-кнопок
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from config import settings
+
+# Кнопки, повторное нажатие которых приводит к лишней записи в БД
+INTAKE_CALLBACK_PREFIXES = ("water_intake_250", "water_volume_")
+
+
+class ExpiringKeys:
+    """Множество ключей с общим временем жизни
+
+    Так как время жизни одинаково для всех ключей, порядок вставки совпадает
+    с порядком истечения, и устаревшие ключи удаляются с начала очереди.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._keys: OrderedDict = OrderedDict()
+
+    def add_if_new(self, key) -> bool:
+        """Добавить ключ. Возвращает False, если ключ уже был в пределах окна"""
+        now = time.monotonic()
+        while self._keys:
+            oldest_key, expires_at = next(iter(self._keys.items()))
+            if expires_at > now:
+                break
+            del self._keys[oldest_key]
+
+        if key in self._keys:
+            return False
+        self._keys[key] = now + self.ttl
+        return True
+
+
+class CallbackDedupMiddleware(BaseMiddleware):
+    """Отбрасывает повторно доставленные callback'и и двойные нажатия до обработчиков"""
+
+    def __init__(self):
+        self.callback_ids = ExpiringKeys(settings.CALLBACK_DEDUP_TTL_SECONDS)
+        self.intake_taps = ExpiringKeys(settings.INTAKE_TAP_WINDOW_SECONDS)
+        self.dropped = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not self._is_new(event):
+            self.dropped += 1
+            # Отвечаем, чтобы у клиента пропал индикатор загрузки
+            try:
+                await event.answer()
+            except Exception:
+                pass
+            return None
+
+        return await handler(event, data)
+
+    def _is_new(self, callback: CallbackQuery) -> bool:
+        """Проверить, не обрабатывался ли уже этот callback"""
+        # Повторная доставка того же callback'а клиентом
+        if not self.callback_ids.add_if_new(callback.id):
+            return False
+
+        # Двойное нажатие кнопки приема воды на том же сообщении
+        if callback.data and callback.data.startswith(INTAKE_CALLBACK_PREFIXES):
+            message_id = callback.message.message_id if callback.message else None
+            tap_key = (callback.from_user.id, message_id, callback.data)
+            if not self.intake_taps.add_if_new(tap_key):
+                return False
+
+        return True
+
+
+class EditCoalescer:
+    """Объединяет частые редактирования одного сообщения
+
+    Пока предыдущее редактирование сообщения еще выполняется, новые тексты
+    не отправляются, а заменяют друг друга; после завершения отправляется
+    только последний из них.
+    """
+
+    def __init__(self):
+        self._latest: Dict[Tuple[int, int], Tuple[str, Dict[str, Any]]] = {}
+        self._in_flight = set()
+
+    async def edit_text(self, message: Message, text: str, **kwargs):
+        """Отредактировать сообщение, пропуская устаревшие промежуточные тексты"""
+        key = (message.chat.id, message.message_id)
+        self._latest[key] = (text, kwargs)
+        if key in self._in_flight:
+            return
+
+        self._in_flight.add(key)
+        try:
+            while key in self._latest:
+                text, kwargs = self._latest.pop(key)
+                await message.edit_text(text, **kwargs)
+        finally:
+            self._latest.pop(key, None)
+            self._in_flight.discard(key)
+
+
+# Глобальные экземпляры
+callback_dedup = CallbackDedupMiddleware()
+edit_coalescer = EditCoalescer()
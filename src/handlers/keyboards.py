@@ -0,0 +1,168 @@
+"""
+Клавиатуры бота
+
+Статические клавиатуры создаются один раз при импорте и переиспользуются
+всеми обработчиками: создание и валидация pydantic-моделей aiogram заметно
+дороже, чем передача готового объекта. Клавиатуры напоминаний собираются
+из готовых шаблонов: копируются только кнопки с id напоминания, без
+повторной валидации.
+"""
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+# Подстановка id напоминания в callback_data кнопок шаблона
+REMINDER_ID = "{reminder_id}"
+
+
+def _button(text: str, callback_data: str) -> InlineKeyboardButton:
+    """Создать кнопку"""
+    return InlineKeyboardButton(text=text, callback_data=callback_data)
+
+
+def _keyboard(*rows) -> InlineKeyboardMarkup:
+    """Создать клавиатуру из рядов кнопок"""
+    return InlineKeyboardMarkup(inline_keyboard=[list(row) for row in rows])
+
+
+def _bind(template: InlineKeyboardMarkup, reminder_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура из шаблона с id напоминания в callback_data
+
+    Копии кнопок создаются без валидации (model_copy), кнопки без
+    подстановки переиспользуются как есть.
+    """
+    rows = [
+        [
+            button.model_copy(update={'callback_data': button.callback_data.format(reminder_id=reminder_id)})
+            if REMINDER_ID in button.callback_data else button
+            for button in row
+        ]
+        for row in template.inline_keyboard
+    ]
+    return template.model_copy(update={'inline_keyboard': rows})
+
+
+# Часто повторяющиеся кнопки
+BACK_BUTTON = _button("🔙 Назад", "back_to_main")
+BACK_TO_SETTINGS_BUTTON = _button("🔙 Назад", "settings")
+STATS_BUTTON = _button("📊 Статистика", "stats")
+MOTIVATE_BUTTON = _button("💫 Мотивация", "motivate")
+ACHIEVEMENTS_BUTTON = _button("🏆 Достижения", "achievements")
+SETTINGS_BUTTON = _button("⚙️ Настройки", "settings")
+
+# Приветствие (/start)
+START_KEYBOARD = _keyboard(
+    [_button("🚀 Начать путь", "start_journey"), SETTINGS_BUTTON],
+    [MOTIVATE_BUTTON]
+)
+
+# Главное меню
+JOURNEY_KEYBOARD = _keyboard(
+    [_button("✅ Выпил(250мл)", "water_intake_250"), _button("🔄 Выпил больше", "water_intake_custom")],
+    [STATS_BUTTON, SETTINGS_BUTTON]
+)
+
+# Ответ на прием воды
+INTAKE_RESULT_KEYBOARD = _keyboard(
+    [STATS_BUTTON, MOTIVATE_BUTTON],
+    [BACK_BUTTON]
+)
+
+
+# Выбор объема воды
+def _volume_keyboard(suffix: str) -> InlineKeyboardMarkup:
+    return _keyboard(
+        [_button("150мл", f"water_volume_150{suffix}"), _button("200мл", f"water_volume_200{suffix}")],
+        [_button("250мл", f"water_volume_250{suffix}"), _button("300мл", f"water_volume_300{suffix}")],
+        [_button("500мл", f"water_volume_500{suffix}")],
+        [BACK_BUTTON]
+    )
+
+
+VOLUME_CHOICE_KEYBOARD = _volume_keyboard("")
+_VOLUME_REMINDER_TEMPLATE = _volume_keyboard(f"_{REMINDER_ID}")
+
+
+def volume_keyboard(reminder_id: int = None) -> InlineKeyboardMarkup:
+    """Выбор объема воды; из напоминания - с привязкой к нему"""
+    if not reminder_id:
+        return VOLUME_CHOICE_KEYBOARD
+    return _bind(_VOLUME_REMINDER_TEMPLATE, reminder_id)
+
+# Дневная статистика
+_STATS_ROWS = (
+    [_button("📈 Недельная статистика", "weekly_stats"), ACHIEVEMENTS_BUTTON],
+    [_button("📋 История приемов", "intake_history")]
+)
+STATS_COMMAND_KEYBOARD = _keyboard(*_STATS_ROWS)
+STATS_KEYBOARD = _keyboard(*_STATS_ROWS, [BACK_BUTTON])
+
+# Недельная статистика
+WEEKLY_STATS_KEYBOARD = _keyboard(
+    [_button("📊 Дневная статистика", "stats"), ACHIEVEMENTS_BUTTON],
+    [BACK_BUTTON]
+)
+
+# Достижения
+ACHIEVEMENTS_KEYBOARD = INTAKE_RESULT_KEYBOARD
+
+# Мотивация
+MOTIVATE_KEYBOARD = _keyboard(
+    [_button("💫 Еще мотивации", "motivate"), _button("🔬 Научные факты", "scientific_facts")],
+    [BACK_BUTTON]
+)
+
+# Научные факты
+FACTS_KEYBOARD = _keyboard(
+    [_button("🔬 Еще факты", "scientific_facts"), MOTIVATE_BUTTON],
+    [BACK_BUTTON]
+)
+
+# Настройки
+SETTINGS_KEYBOARD = _keyboard(
+    [_button("🎯 Изменить цель", "change_goal")],
+    [_button("⏰ Изменить время", "change_time")],
+    [_button("🔔 Уведомления", "toggle_notifications")],
+    [BACK_BUTTON]
+)
+
+# Выбор дневной цели
+GOAL_CHOICE_KEYBOARD = _keyboard(
+    [_button("1500мл", "goal_1500"), _button("2000мл", "goal_2000")],
+    [_button("2500мл", "goal_2500"), _button("3000мл", "goal_3000")],
+    [BACK_TO_SETTINGS_BUTTON]
+)
+
+# Выбор времени напоминаний
+TIME_CHOICE_KEYBOARD = _keyboard(
+    [_button("7:00 - 21:00", "time_7_21"), _button("8:00 - 22:00", "time_8_22")],
+    [_button("9:00 - 23:00", "time_9_23"), _button("6:00 - 20:00", "time_6_20")],
+    [BACK_TO_SETTINGS_BUTTON]
+)
+
+# После изменения настроек
+SETTINGS_UPDATED_KEYBOARD = _keyboard(
+    [_button("🔙 Назад к настройкам", "settings"), _button("🏠 Главное меню", "back_to_main")]
+)
+
+# История приемов
+HISTORY_EMPTY_KEYBOARD = _keyboard(
+    [_button("💧 Выпить воду", "water_intake_250")],
+    [_button("🔙 Назад", "stats")]
+)
+HISTORY_KEYBOARD = _keyboard(
+    [_button("💧 Добавить прием", "water_intake_250"), STATS_BUTTON],
+    [_button("🔙 Назад", "stats")]
+)
+
+# Напоминание (кнопка мотивации не зависит от напоминания)
+_REMINDER_TEMPLATE = _keyboard(
+    [
+        _button("✅ Выпил(250мл)", f"water_intake_250_{REMINDER_ID}"),
+        _button("🔄 Выпил больше", f"water_intake_custom_{REMINDER_ID}")
+    ],
+    [_button("⏰ Напомнить позже", f"postpone_{REMINDER_ID}"), _button("💫 Мотивация!", "motivate")]
+)
+
+
+def reminder_keyboard(reminder_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура напоминания с привязкой к конкретному напоминанию"""
+    return _bind(_REMINDER_TEMPLATE, reminder_id)
@@ -0,0 +1,24 @@
+"""
+Модули метрик производительности
+"""
+from .manager import MetricsManager
+from .profiler import SamplingProfiler, query_log
+from .watchdog import LoopWatchdog
+
+# Глобальный экземпляр менеджера метрик
+metrics = MetricsManager()
+
+# Глобальный экземпляр профилировщика
+profiler = SamplingProfiler()
+
+# Глобальный сторож цикла событий и пулов потоков
+watchdog = LoopWatchdog(metrics)
+
+
+def __getattr__(name: str):
+    # Middleware зависят от aiogram: импортируем их при первом обращении,
+    # чтобы БД и планировщик загружались без тяжелого импорта aiogram
+    if name in ('MetricsMiddleware', 'SlowUpdateMiddleware'):
+        from . import middleware
+        return getattr(middleware, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
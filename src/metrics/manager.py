@@ -0,0 +1,154 @@
+"""
+Менеджер метрик в формате Prometheus
+"""
+import bisect
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from config import settings
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# Границы корзин гистограмм (секунды)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Задержка отправки напоминаний - от секунд до часа
+LAG_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+HELP = {
+    'water_handler_latency_seconds': 'Время обработки обновления обработчиком',
+    'water_db_query_seconds': 'Время выполнения запроса к БД',
+    'water_db_executor_wait_seconds': 'Время ожидания запроса в очереди пула потоков по классу нагрузки',
+    'water_reminder_lag_seconds': 'Задержка отправки напоминания относительно scheduled_time',
+    'water_reminders_sent_total': 'Отправленные напоминания по результату',
+    'water_reminders_suppressed_total': 'Неотправленные напоминания пользователям на графике по причине',
+    'water_reminder_slots_skipped_total': 'Слоты расписания, пропущенные из-за низкой конверсии',
+    'water_cache_requests_total': 'Обращения к кэшу хранилища по результату',
+    'water_loop_lag_seconds': 'Отставание цикла событий от расписания',
+    'water_loop_stalls_total': 'Блокировки цикла событий дольше порога',
+    'water_executor_queue_depth': 'Задачи в очереди пула потоков',
+    'water_executor_busy_threads': 'Занятые потоки пула',
+    'water_executor_max_workers': 'Максимальный размер пула',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Учесть значение"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsManager:
+    """Сбор метрик в памяти и отдача их на /metrics
+
+    Запись метрики - это несколько операций со словарем, текст в формате
+    Prometheus формируется только при запросе /metrics.
+    """
+
+    def __init__(self):
+        self.enabled = settings.METRICS_ENABLED
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self._runner: Optional['web.AppRunner'] = None
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        """Записать значение в гистограмму"""
+        if not self.enabled:
+            return
+        series = self.histograms.setdefault(name, {})
+        key = tuple(labels.items())
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Увеличить счетчик"""
+        if not self.enabled:
+            return
+        series = self.counters.setdefault(name, {})
+        key = tuple(labels.items())
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Установить значение показателя"""
+        if not self.enabled:
+            return
+        self.gauges.setdefault(name, {})[tuple(labels.items())] = value
+
+    def render(self) -> str:
+        """Сформировать текст в формате Prometheus"""
+        lines: List[str] = []
+
+        for name, series in self.histograms.items():
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, series in self.counters.items():
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, series in self.gauges.items():
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, host: str = None, port: int = None):
+        """Запустить HTTP-сервер с эндпоинтом /metrics"""
+        if not self.enabled or self._runner:
+            return
+
+        # aiohttp.web нужен только с включенными метриками - не замедляем запуск без них
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host or settings.METRICS_HOST, port or settings.METRICS_PORT).start()
+
+    async def stop_server(self):
+        """Остановить HTTP-сервер метрик"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request: 'web.Request') -> 'web.Response':
+        """Обработчик /metrics"""
+        from aiohttp import web
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
+
+
+def _format_labels(labels: Labels) -> str:
+    """Форматировать метки Prometheus"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
@@ -0,0 +1,91 @@
+"""
+Middleware для замера времени обработчиков и захвата медленных обновлений
+
+Модуль зависит от aiogram, поэтому src.metrics импортирует его только при
+обращении к MetricsMiddleware или SlowUpdateMiddleware.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from .profiler import SamplingProfiler, SlowUpdate, async_stack, query_log
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Записывает время работы каждого обработчика в гистограмму"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not self.metrics.enabled:
+            return await handler(event, data)
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_object = data.get('handler')
+            name = handler_object.callback.__name__ if handler_object else 'unknown'
+            self.metrics.observe('water_handler_latency_seconds', time.perf_counter() - started, handler=name)
+
+
+class SlowUpdateMiddleware(BaseMiddleware):
+    """Захват асинхронного стека и запросов к БД для медленных обновлений
+
+    Если обновление обрабатывается дольше порога, в этот момент снимается
+    стек его задачи - он показывает, на каком await она застряла.
+    """
+
+    def __init__(self, profiler: SamplingProfiler):
+        self.profiler = profiler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not self.profiler.slow_capture:
+            return await handler(event, data)
+
+        task = asyncio.current_task()
+        threshold = self.profiler.slow_threshold_ms / 1000
+        captured: List[List[str]] = []
+        timer = asyncio.get_running_loop().call_later(threshold, lambda: captured.append(async_stack(task)))
+
+        queries: List[Tuple[str, float]] = []
+        token = query_log.set(queries)
+        started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            timer.cancel()
+            query_log.reset(token)
+            duration = time.perf_counter() - started
+            if duration >= threshold:
+                slow = SlowUpdate(
+                    update_id=event.update_id if isinstance(event, Update) else 0,
+                    duration_ms=duration * 1000,
+                    started_at=started_at,
+                    stack=captured[0] if captured else [],
+                    queries=queries
+                )
+                self.profiler.slow_updates.append(slow)
+                logger.warning(
+                    f"Slow update {slow.update_id}: {slow.duration_ms:.0f} ms, "
+                    f"{len(queries)} queries, stuck at {slow.stack[-2] if len(slow.stack) > 1 else 'unknown'}"
+                )
@@ -0,0 +1,160 @@
+"""
+Сэмплирующий профилировщик и захват медленных обновлений
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Запросы к БД, выполненные в рамках текущего обновления (None - не собираем)
+query_log: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('query_log', default=None)
+
+
+@dataclass
+class SlowUpdate:
+    """Медленное обновление"""
+    update_id: int
+    duration_ms: float
+    started_at: datetime
+    stack: List[str] = field(default_factory=list)
+    queries: List[Tuple[str, float]] = field(default_factory=list)
+
+
+def format_frame(frame) -> str:
+    """Кадр стека в виде 'функция (файл:строка)'"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def async_stack(task: asyncio.Task) -> List[str]:
+    """Асинхронный стек задачи: цепочка корутин от внешней к той, что ожидает"""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, 'cr_frame', None) or getattr(awaitable, 'gi_frame', None)
+        if frame is None:
+            # Дошли до future или завершенной корутины
+            stack.append(type(awaitable).__name__)
+            break
+        stack.append(format_frame(frame))
+        awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'gi_yieldfrom', None)
+    return stack
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик потоков цикла событий и пула БД
+
+    Отдельный поток с заданным интервалом снимает стеки через
+    sys._current_frames() и накапливает их в свернутом формате
+    (folded stacks), который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self):
+        self.interval_ms = settings.PROFILER_SAMPLE_INTERVAL_MS
+        self.samples: Counter = Counter()
+        self.slow_capture = settings.SLOW_UPDATE_CAPTURE
+        self.slow_threshold_ms = settings.SLOW_UPDATE_THRESHOLD_MS
+        self.slow_updates: deque = deque(maxlen=settings.SLOW_UPDATES_KEEP)
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def sampling(self) -> bool:
+        """Идет ли сэмплирование"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = None):
+        """Начать сэмплирование (вызывается из потока цикла событий)"""
+        if self.sampling:
+            return
+        if interval_ms:
+            self.interval_ms = interval_ms
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановить сэмплирование"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def toggle(self):
+        """Переключить сэмплирование (для обработчика сигнала)"""
+        if self.sampling:
+            self.stop()
+        else:
+            self.start()
+
+    def reset(self):
+        """Сбросить накопленные сэмплы"""
+        self.samples.clear()
+
+    def _run(self):
+        """Цикл сэмплирования"""
+        own_id = threading.get_ident()
+        interval = self.interval_ms / 1000
+
+        while not self._stop.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id == self._loop_thread_id:
+                    label = "event_loop"
+                elif names.get(thread_id, "").startswith(("ThreadPoolExecutor", "db-")):
+                    label = "executor"
+                else:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(format_frame(frame))
+                    frame = frame.f_back
+                stack.append(label)
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Накопленные сэмплы в формате folded stacks"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def dump(self, directory: str = None) -> str:
+        """Записать сэмплы и медленные обновления в файлы, вернуть путь к файлу сэмплов"""
+        directory = directory or settings.PROFILER_OUTPUT_DIR
+        os.makedirs(directory, exist_ok=True)
+        suffix = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        path = os.path.join(directory, f"profile_{suffix}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+
+        if self.slow_updates:
+            with open(os.path.join(directory, f"slow_updates_{suffix}.txt"), 'w', encoding='utf-8') as f:
+                f.write(self.format_slow_updates())
+
+        logger.info(f"Profile dumped to {path}")
+        return path
+
+    def format_slow_updates(self) -> str:
+        """Текстовый отчет о медленных обновлениях"""
+        blocks = []
+        for slow in self.slow_updates:
+            lines = [f"update {slow.update_id} at {slow.started_at:%H:%M:%S}: {slow.duration_ms:.0f} ms"]
+            lines.extend(f"  at {frame}" for frame in slow.stack)
+            lines.extend(f"  query {name}: {seconds * 1000:.1f} ms" for name, seconds in slow.queries)
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks) + "\n"
@@ -0,0 +1,209 @@
+"""
+Детектор блокировок цикла событий и монитор загрузки пулов потоков
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExecutorWindow:
+    """Накопленная статистика пула за окно отчета"""
+    samples: int = 0
+    busy_ratio_sum: float = 0.0
+    max_queue: int = 0
+    max_busy: int = 0
+
+    @property
+    def avg_utilization(self) -> float:
+        """Средняя доля занятых потоков"""
+        return self.busy_ratio_sum / self.samples if self.samples else 0.0
+
+
+class LoopWatchdog:
+    """Сторож цикла событий
+
+    Задача в цикле событий каждые LOOP_LAG_INTERVAL_MS измеряет, насколько
+    позже запланированного она проснулась (отставание цикла), и обновляет
+    «пульс». Отдельный поток следит за пульсом: если цикл не отвечает дольше
+    LOOP_STALL_THRESHOLD_MS, он снимает стек потока цикла событий - это и
+    есть код, который блокирует цикл. Попутно снимается загрузка пулов потоков
+    и раз в EXECUTOR_REPORT_INTERVAL_SECONDS выдается рекомендация по их размеру.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.interval = settings.LOOP_LAG_INTERVAL_MS / 1000
+        self.stall_threshold = settings.LOOP_STALL_THRESHOLD_MS / 1000
+        self.report_interval = settings.EXECUTOR_REPORT_INTERVAL_SECONDS
+
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_report: List[str] = []
+
+        # Имя пула -> функция, возвращающая пул (пул по умолчанию создается лениво)
+        self._executors: Dict[str, Callable[[], Optional[ThreadPoolExecutor]]] = {}
+        self._windows: Dict[str, ExecutorWindow] = {}
+
+        self._heartbeat = time.monotonic()
+        self._stall_reported = False
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def monitor_executor(self, name: str, get_executor: Callable[[], Optional[ThreadPoolExecutor]]):
+        """Добавить пул потоков под наблюдение"""
+        self._executors[name] = get_executor
+        self._windows[name] = ExecutorWindow()
+
+    async def start(self):
+        """Запустить сторожа (вызывается из цикла событий)"""
+        if self._task:
+            return
+
+        loop = asyncio.get_running_loop()
+        if "default" not in self._executors:
+            self.monitor_executor("default", lambda: getattr(loop, "_default_executor", None))
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._tick_loop())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Остановить сторожа"""
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    async def _tick_loop(self):
+        """Замер отставания цикла событий и загрузки пулов"""
+        next_report = time.monotonic() + self.report_interval
+
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(now - expected, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+            self.metrics.observe('water_loop_lag_seconds', lag)
+
+            self._sample_executors()
+            if now >= next_report:
+                self.report()
+                next_report = now + self.report_interval
+
+    def _watch(self):
+        """Поток-сторож: ловит блокировку цикла и снимает стек виновника"""
+        while not self._stop.wait(self.interval):
+            silent = time.monotonic() - self._heartbeat - self.interval
+            if silent <= self.stall_threshold:
+                self._stall_reported = False
+                continue
+            if self._stall_reported:
+                continue
+
+            self._stall_reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "стек недоступен\n"
+            logger.warning(f"Event loop blocked for {silent * 1000:.0f} ms, loop thread stack:\n{stack}")
+            # Счетчик из чужого потока: пишем через цикл событий
+            self._call_in_loop(lambda: self.metrics.inc('water_loop_stalls_total'))
+
+    def _call_in_loop(self, callback):
+        """Выполнить функцию в цикле событий"""
+        task = self._task
+        if task is not None:
+            task.get_loop().call_soon_threadsafe(callback)
+
+    def _sample_executors(self):
+        """Снять очередь и занятость потоков каждого пула"""
+        for name, get_executor in self._executors.items():
+            executor = get_executor()
+            if executor is None:
+                continue
+
+            max_workers = executor._max_workers
+            threads = len(executor._threads)
+            queue = executor._work_queue.qsize()
+            if queue:
+                # Пока есть очередь, свободных потоков нет
+                busy = threads
+            else:
+                idle_semaphore = getattr(executor, "_idle_semaphore", None)
+                idle = idle_semaphore._value if idle_semaphore is not None else 0
+                busy = max(threads - idle, 0)
+
+            window = self._windows[name]
+            window.samples += 1
+            window.busy_ratio_sum += busy / max_workers
+            window.max_queue = max(window.max_queue, queue)
+            window.max_busy = max(window.max_busy, busy)
+
+            self.metrics.set_gauge('water_executor_queue_depth', queue, executor=name)
+            self.metrics.set_gauge('water_executor_busy_threads', busy, executor=name)
+            self.metrics.set_gauge('water_executor_max_workers', max_workers, executor=name)
+
+    def _summary(self):
+        """Строки сводки за текущее окно и предупреждения о перегруженных пулах"""
+        lines = [f"Цикл событий: макс. отставание {self.max_lag * 1000:.0f} мс, блокировок {self.stalls}"]
+        warnings = []
+
+        for name, get_executor in self._executors.items():
+            executor = get_executor()
+            window = self._windows[name]
+            if executor is None or not window.samples:
+                continue
+
+            max_workers = executor._max_workers
+            utilization = window.avg_utilization
+            line = (f"Пул {name}: загрузка {utilization:.0%}, занято до {window.max_busy}/{max_workers}, "
+                    f"очередь до {window.max_queue}")
+            if window.max_queue > 0 and utilization > 0.8:
+                line += f" - пул перегружен, увеличьте до ~{max_workers * 2} потоков"
+                warnings.append(line)
+            elif utilization < 0.1 and max_workers > 4:
+                line += f" - пул недогружен, можно уменьшить до ~{max(window.max_busy * 2, 4)} потоков"
+            lines.append(line)
+
+        return lines, warnings
+
+    def snapshot(self) -> List[str]:
+        """Сводка за текущее окно без его сброса (для /loop)"""
+        lines, _ = self._summary()
+        return lines
+
+    def report(self) -> List[str]:
+        """Сводка за окно с рекомендацией по размеру пулов и начало нового окна
+
+        Вызывается только из периодического замера: окно сбрасывается.
+        """
+        lines, warnings = self._summary()
+        for line in warnings:
+            logger.warning(line)
+
+        for name in self._windows:
+            self._windows[name] = ExecutorWindow()
+        self.max_lag = 0.0
+        self.last_report = lines
+        return lines
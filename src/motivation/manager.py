@@ -32,7 +32,7 @@ class MotivationManager:
         """Получить сообщение подтверждения приема воды"""
         percentage = (current_ml / goal_ml) * 100
         message_template = self.messages.get_intake_confirmation(percentage)
-        message = message_template.format(current=current_ml)
+        message = message_template.render(current=current_ml)
         await db_manager.log_motivation(user_id, 'intake_confirmation', message)
         return message
     
@@ -4,79 +4,38 @@
 import random
 from typing import List, Dict, Any
 
+from src.stats import render
+from src.texts import MessageCatalog, Template, texts
+
 
 class MotivationMessages:
-    """Класс для хранения мотивационных сообщений"""
+    """Класс для хранения мотивационных сообщений
     
-    def __init__(self):
-        self.messages = {
-            # Напоминания о воде (категория A)
-            'water_reminders': [
-                "💧 *Время пить воду!* Выпейте 250мл чистой воды. Ваше тело скажет вам спасибо! ✨",
-                "🚰 *Водная пауза!* 250мл воды помогут сохранить энергию и ясность ума на весь день! 🌟",
-                "💦 *Глоток здоровья!* Не забывайте - вода ускоряет метаболизм и улучшает работу мозга! 🧠",
-                "🌊 *Перерыв на гидратацию!* 250мл воды = заряд бодрости + красивая кожа + здоровые органы! 💫"
-            ],
-            
-            # Подтверждения приема (категория B)
-            'intake_confirmations': {
-                'low': "✅ *Отлично!* Вы выпили 250мл. Всего сегодня: {current}/2000мл\n*Продолжайте в том же духе!* 💪",
-                'medium': "🎉 *Супер!* Еще 250мл на пути к здоровью! Всего: {current}/2000мл\n*Вы на полпути к цели!* 🌟",
-                'high': "🔥 *Великолепно!* {current}мл уже выпито! Ваши клетки танцуют от радости! 💃",
-                'almost': "💎 *Идеально!* {current}мл пройдено! Ваша кожа сияет, органы работают как часы! ✨"
-            },
-            
-            # Вехи прогресса (категория C)
-            'milestones': {
-                50: "🏆 *50% пройдено!* Вы уже на середине пути к 2 литрам! Осталось всего 1000мл! 🚀",
-                75: "⭐ *75% выполнено!* Всего 500мл до полной победы! Вы почти у цели! 💫",
-                95: "🎊 *95% достигнуто!* Финишная прямая! Всего один глоток до полного успеха! 🌈"
-            },
-            
-            # Достижение цели (категория D)
-            'goal_achieved': "🌈 *ПОБЕДА!* Вы достигли цели дня - 2000мл воды! 🎉\n*Ваше тело благодарит вас за:*\n• 💆‍♂️ Увлажненную кожу\n• 🧠 Ясное мышление\n• 💪 Энергию на весь день\n• 🏃‍♂️ Ускоренный метаболизм\n*Гордитесь собой! Завтра повторим!* ✨",
-            
-            # Повторные напоминания (категория E)
-            'follow_ups': [
-                "⏰ *Напоминаем о воде!* Прошло 5 минут - не пропустите прием 250мл воды для вашего здоровья! 💧",
-                "💡 *Не забыли о воде?* Всего 250мл помогут сохранить продуктивность и хорошее самочувствие! 🌟"
-            ],
-            
-            # Утренние мотивации (категория F)
-            'morning': "🌅 *Доброе утро!* Начните день с 250мл воды натощак - это запустит метаболизм и очистит организм! 💫",
-            
-            # Вечерние статистики (категория G)
-            'evening_stats': "📊 *Итоги дня:* Вы выпили {current}/2000мл! {motivational_phrase}",
-            
-            # Особые мотивации (категория H)
-            'special': [
-                "💝 *Любите себя!* Каждый глоток воды - это забота о своем здоровье и красоте! ✨",
-                "🎯 *Дисциплина = свобода!* Регулярное питье воды дает энергию для достижения всех целей! 🚀",
-                "🌿 *Природа благодарит!* Пить воду - значит помогать своему телу работать в гармонии с природой! 💚"
-            ],
-            
-            # Научные факты (категория I)
-            'facts': [
-                "🔬 *Знаете ли вы?* Всего 2% обезвоживания снижают концентрацию на 20%. Пейте воду для ясного ума! 🧠",
-                "🧪 *Интересный факт!* Вода составляет 60% массы тела взрослого человека. Поддерживайте этот баланс! ⚖️",
-                "🔍 *Научно доказано!* Питье воды натощак ускоряет метаболизм на 30%! Начните день правильно! 🚀"
-            ]
-        }
+    Тексты берутся из раздела motivation каталога сообщений (по умолчанию -
+    на языке бота), шаблоны с подстановками компилируются один раз здесь.
+    """
+    
+    def __init__(self, catalog: MessageCatalog = None):
+        section = (catalog or texts).section('motivation')
+        self.messages = dict(section)
+        # В JSON ключи - строки, вехи ищутся по проценту
+        self.messages['milestones'] = {int(key): value for key, value in section['milestones'].items()}
         
         # Мотивационные фразы для вечерней статистики
-        self.evening_phrases = {
-            'excellent': "Отличная работа! Вы на правильном пути к здоровью! 🌟",
-            'good': "Хороший результат! Завтра будет еще лучше! 💪",
-            'average': "Неплохо! Попробуйте увеличить количество воды завтра! 🌱",
-            'low': "Не расстраивайтесь! Каждый день - новая возможность! 🌈"
+        self.evening_phrases = section['evening_phrases']
+        
+        # Предкомпилированные шаблоны
+        self.intake_templates = {
+            category: Template(text) for category, text in self.messages['intake_confirmations'].items()
         }
+        self.evening_template = Template(self.messages['evening_stats'])
     
     def get_water_reminder(self) -> str:
         """Получить случайное напоминание о воде"""
         return random.choice(self.messages['water_reminders'])
     
-    def get_intake_confirmation(self, percentage: float) -> str:
-        """Получить сообщение подтверждения приема воды"""
+    def get_intake_confirmation(self, percentage: float) -> Template:
+        """Получить шаблон подтверждения приема воды (подстановка {current})"""
         if percentage <= 25:
             category = 'low'
         elif percentage <= 50:
@@ -86,7 +45,7 @@ class MotivationMessages:
         else:
             category = 'almost'
         
-        return self.messages['intake_confirmations'][category]
+        return self.intake_templates[category]
     
     def get_milestone_message(self, percentage: int) -> str:
         """Получить сообщение о достижении вехи"""
@@ -117,10 +76,7 @@ class MotivationMessages:
         else:
             phrase = self.evening_phrases['low']
         
-        return self.messages['evening_stats'].format(
-            current=current_ml, 
-            motivational_phrase=phrase
-        )
+        return self.evening_template.render(current=current_ml, motivational_phrase=phrase)
     
     def get_special_motivation(self) -> str:
         """Получить особую мотивацию"""
@@ -144,11 +100,4 @@ class MotivationMessages:
     
     def get_progress_bar(self, current_ml: int, goal_ml: int) -> str:
         """Создать прогресс-бар"""
-        percentage = min((current_ml / goal_ml) * 100, 100)
-        filled_blocks = int(percentage / 10)
-        empty_blocks = 10 - filled_blocks
-        
-        bar = "💧" * filled_blocks + "⚪" * empty_blocks
-        return f"[{bar}] {percentage:.0f}% ({current_ml}/{goal_ml} мл)"
-
-
+        return render.progress_bar(current_ml, goal_ml, render.level(current_ml, goal_ml))
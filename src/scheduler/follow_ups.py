@@ -0,0 +1,148 @@
+"""
+Отслеживание неотвеченных напоминаний и планирование повторных
+"""
+import asyncio
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Set, Tuple
+
+from config import settings
+from src.database import db_manager
+
+
+class FollowUpTracker:
+    """Трекер отправленных, но неотвеченных напоминаний
+
+    Состояние хранится только в памяти: отправленное напоминание ставится
+    в очередь с дедлайном, нажатие кнопки приема воды снимает его с учета.
+    Когда дедлайн прошел, повторные напоминания создаются одной пачкой.
+    При остановке ожидающие напоминания сохраняются в контрольную точку
+    и восстанавливаются при следующем запуске.
+    """
+
+    def __init__(self):
+        # reminder_id -> (user_id, дедлайн, номер попытки)
+        self.pending: Dict[int, Tuple[int, datetime, int]] = {}
+        self.by_user: Dict[int, Set[int]] = {}
+        self._heap: List[Tuple[datetime, int]] = []
+        self._wakeup = asyncio.Event()
+
+    def track(self, reminder_id: int, user_id: int, attempt_number: int = 0):
+        """Начать ожидание ответа на отправленное напоминание"""
+        # Лимит повторных напоминаний исчерпан - ждать ответа незачем
+        if attempt_number >= settings.MAX_FOLLOW_UPS:
+            return
+
+        deadline = datetime.now() + timedelta(minutes=settings.FOLLOW_UP_DELAY_MINUTES)
+        self._add(reminder_id, user_id, deadline, attempt_number)
+
+    def _add(self, reminder_id: int, user_id: int, deadline: datetime, attempt_number: int):
+        """Поставить напоминание в очередь с заданным дедлайном"""
+        self.pending[reminder_id] = (user_id, deadline, attempt_number)
+        self.by_user.setdefault(user_id, set()).add(reminder_id)
+
+        # Будим таймер, если новый дедлайн раньше текущего
+        if not self._heap or deadline < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (deadline, reminder_id))
+
+    def acknowledge(self, reminder_id: int):
+        """Снять с учета напоминание, на которое ответил пользователь"""
+        entry = self.pending.pop(reminder_id, None)
+        if entry:
+            user_reminders = self.by_user.get(entry[0])
+            if user_reminders:
+                user_reminders.discard(reminder_id)
+                if not user_reminders:
+                    del self.by_user[entry[0]]
+
+    def acknowledge_user(self, user_id: int):
+        """Снять с учета все напоминания пользователя"""
+        for reminder_id in self.by_user.pop(user_id, ()):
+            self.pending.pop(reminder_id, None)
+
+    def checkpoint(self, path: str) -> int:
+        """Сохранить ожидающие ответа напоминания в файл; возвращает их количество"""
+        entries = [
+            [reminder_id, user_id, deadline.isoformat(), attempt_number]
+            for reminder_id, (user_id, deadline, attempt_number) in self.pending.items()
+        ]
+        # Через временный файл, чтобы сбой при записи не оставил обрезанную точку
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file)
+        os.replace(temp_path, path)
+        return len(entries)
+
+    def restore(self, path: str) -> int:
+        """Восстановить ожидающие ответа напоминания из контрольной точки
+
+        Файл удаляется после чтения: после аварийного завершения (без новой
+        точки) те же повторные напоминания не будут созданы второй раз.
+        Устаревшие дольше REMINDER_STALE_HOURS пропускаются.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path, encoding='utf-8') as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения контрольной точки планировщика: {e}")
+            entries = []
+        os.remove(path)
+
+        stale_before = datetime.now() - timedelta(hours=settings.REMINDER_STALE_HOURS)
+        restored = 0
+        for reminder_id, user_id, deadline, attempt_number in entries:
+            deadline = datetime.fromisoformat(deadline)
+            if deadline >= stale_before and reminder_id not in self.pending:
+                self._add(reminder_id, user_id, deadline, attempt_number)
+                restored += 1
+        return restored
+
+    def _pop_due(self, now: datetime) -> List[Tuple[int, datetime, int]]:
+        """Извлечь все напоминания, дедлайн которых наступил"""
+        horizon = now + timedelta(seconds=settings.FOLLOW_UP_BATCH_WINDOW_SECONDS)
+        due = []
+
+        while self._heap and self._heap[0][0] <= horizon:
+            deadline, reminder_id = heapq.heappop(self._heap)
+            entry = self.pending.get(reminder_id)
+            # Запись уже снята с учета или перезаписана более новым дедлайном
+            if not entry or entry[1] != deadline:
+                continue
+
+            self.acknowledge(reminder_id)
+            user_id, _, attempt_number = entry
+            due.append((user_id, deadline, attempt_number + 1))
+
+        return due
+
+    async def run(self):
+        """Цикл таймера: спит до ближайшего дедлайна и создает повторные напоминания"""
+        while True:
+            self._wakeup.clear()
+
+            if self._heap:
+                timeout = (self._heap[0][0] - datetime.now()).total_seconds()
+            else:
+                timeout = None
+
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due(datetime.now())
+            if not due:
+                continue
+
+            try:
+                await db_manager.create_follow_up_reminders(due)
+            except Exception as e:
+                print(f"Ошибка создания повторных напоминаний: {e}")
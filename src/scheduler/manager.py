@@ -2,11 +2,15 @@
 Планировщик напоминаний о воде
 """
 import asyncio
-from datetime import datetime, timedelta, time
-from typing import List, Dict, Any
+from datetime import datetime, date, timedelta, time
+from typing import List, Dict, Any, Optional, Set
 
 from config import settings
 from src.database import db_manager
+from src.metrics import metrics
+from src.metrics.manager import LAG_BUCKETS
+from .follow_ups import FollowUpTracker
+from .suppression import OnTrackFilter
 
 
 class ReminderScheduler:
@@ -15,6 +19,11 @@ class ReminderScheduler:
     def __init__(self):
         self.running = False
         self.tasks = {}
+        self.follow_ups = FollowUpTracker()
+        self.on_track = OnTrackFilter()
+        # Забранные из БД (статус 'sending'), но еще не отправленные напоминания
+        self._claimed: Set[int] = set()
+        self._stopping = asyncio.Event()
     
     async def start(self):
         """Запустить планировщик"""
@@ -22,33 +31,176 @@ class ReminderScheduler:
             return
         
         self.running = True
-        asyncio.create_task(self._scheduler_loop())
+        self._stopping.clear()
+        restored = self.follow_ups.restore(settings.SCHEDULER_CHECKPOINT_PATH)
+        if restored:
+            print(f"Восстановлено ожидающих ответа напоминаний: {restored}")
+        if settings.REMINDER_CATCH_UP_ENABLED:
+            await self.catch_up(datetime.now())
+        self.tasks['scheduler'] = asyncio.create_task(self._scheduler_loop())
+        self.tasks['archive'] = asyncio.create_task(self._archive_loop())
+        self.tasks['follow_ups'] = asyncio.create_task(self.follow_ups.run())
     
-    async def stop(self):
-        """Остановить планировщик"""
+    async def stop(self, timeout: Optional[float] = None):
+        """Остановить планировщик
+
+        Новые напоминания больше не забираются, текущее дописывается (не
+        дольше timeout секунд), забранные, но не отправленные возвращаются
+        в ожидание, а ожидающие ответа сохраняются в контрольную точку.
+        """
+        if not self.tasks:
+            return
+        
         self.running = False
-        for task in self.tasks.values():
+        self._stopping.set()
+        
+        loop_task = self.tasks.pop('scheduler', None)
+        if loop_task is not None:
+            _, pending = await asyncio.wait({loop_task}, timeout=timeout)
+            if pending:
+                print("Планировщик не завершил отправку до истечения времени остановки")
+        
+        tasks = list(self.tasks.values()) + ([loop_task] if loop_task else [])
+        for task in tasks:
             task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         self.tasks.clear()
+        
+        # Напоминание, прерванное посреди отправки, остается в 'sending':
+        # возможно, оно уже доставлено, поэтому сразу не повторяется, а
+        # забирается снова только по истечении REMINDER_CLAIM_LEASE_SECONDS
+        if self._claimed:
+            await db_manager.release_reminders(list(self._claimed))
+            print(f"Возвращено в ожидание напоминаний: {len(self._claimed)}")
+            self._claimed.clear()
+        
+        try:
+            self.follow_ups.checkpoint(settings.SCHEDULER_CHECKPOINT_PATH)
+        except OSError as e:
+            print(f"Ошибка записи контрольной точки планировщика: {e}")
+    
+    async def catch_up(self, now: datetime) -> Dict[str, int]:
+        """Разобрать напоминания, пропущенные за время простоя, до первой рассылки
+
+        Без этого после перезапуска все наступившие напоминания ушли бы разом:
+        по нескольку устаревших на пользователя и с ошибками 429. Устаревшие
+        (старше REMINDER_CATCH_UP_STALE_MINUTES) не отправляются, у каждого
+        пользователя остается одно, а оставшиеся распределяются по окну
+        REMINDER_CATCH_UP_RAMP_MINUTES. Если другие узлы продолжали рассылку
+        (забирали напоминания в пределах аренды), простоя не было, и догон
+        пропускается, чтобы не трогать напоминания, которые они вот-вот заберут.
+        """
+        stale_before = now - timedelta(minutes=settings.REMINDER_CATCH_UP_STALE_MINUTES)
+        lease_before = now - timedelta(seconds=settings.REMINDER_CLAIM_LEASE_SECONDS)
+        try:
+            result = await db_manager.catch_up_reminders(
+                now, stale_before, settings.REMINDER_CATCH_UP_RAMP_MINUTES * 60, lease_before
+            )
+        except Exception as e:
+            print(f"Ошибка догона пропущенных напоминаний: {e}")
+            return {}
+        
+        if result is None:
+            print("Догон пропущенных напоминаний не нужен: рассылку ведет другой узел")
+            return {}
+        
+        for outcome, count in result.items():
+            if count:
+                metrics.inc('water_reminders_catch_up_total', count, outcome=outcome)
+        if any(result.values()):
+            print(f"Пропущенные напоминания: устарело {result['expired']}, объединено {result['merged']}, "
+                  f"распределено {result['spread']} на {settings.REMINDER_CATCH_UP_RAMP_MINUTES} мин")
+        return result
+    
+    async def _sleep(self, seconds: float):
+        """Пауза цикла, прерываемая остановкой планировщика"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
     
     async def _scheduler_loop(self):
         """Основной цикл планировщика"""
+        loop = asyncio.get_running_loop()
         while self.running:
             try:
                 current_time = datetime.now()
+                batch_size = settings.REMINDER_CLAIM_BATCH_SIZE
+                lease_before = current_time - timedelta(seconds=settings.REMINDER_CLAIM_LEASE_SECONDS)
                 
-                # Получаем все ожидающие напоминания
-                pending_reminders = await db_manager.get_pending_reminders(current_time)
-                
-                for reminder in pending_reminders:
-                    await self._process_reminder(reminder)
+                # Забираем наступившие напоминания пачками: при общей базе
+                # каждое напоминание достается только одному узлу, а брошенные
+                # упавшим узлом забираются снова по истечении аренды
+                while self.running:
+                    due_reminders = await db_manager.claim_due_reminders(current_time, batch_size, lease_before)
+                    self._claimed.update(reminder.id for reminder in due_reminders)
+                    renewed_at = loop.time()
+                    to_send = await self._suppress_on_track(due_reminders, current_time)
+                    for reminder in to_send:
+                        # При остановке оставшиеся напоминания пачки вернутся в ожидание
+                        if not self.running:
+                            break
+                        # Долгая пачка: продлеваем аренду, пока ее не забрал другой узел
+                        if loop.time() - renewed_at >= settings.REMINDER_CLAIM_LEASE_SECONDS / 3:
+                            await self._renew_claims()
+                            renewed_at = loop.time()
+                        if reminder.id not in self._claimed:
+                            continue
+                        self._claimed.discard(reminder.id)
+                        await self._process_reminder(reminder)
+                    if len(due_reminders) < batch_size:
+                        break
                 
                 # Ждем 30 секунд перед следующей проверкой
-                await asyncio.sleep(30)
+                await self._sleep(30)
                 
             except Exception as e:
                 print(f"Ошибка в планировщике: {e}")
-                await asyncio.sleep(60)
+                await self._sleep(60)
+    
+    async def _renew_claims(self):
+        """Продлить аренду еще не отправленных напоминаний; потерявшие ее не отправляются"""
+        held = await db_manager.renew_reminder_claims(list(self._claimed), datetime.now())
+        lost = len(self._claimed) - len(held)
+        self._claimed.intersection_update(held)
+        if lost:
+            print(f"Аренда истекла, напоминания забрал другой узел: {lost}")
+    
+    async def _suppress_on_track(self, reminders: List, current_time: datetime) -> List:
+        """Отсеять напоминания пользователям, которые и так на графике; вернуть оставшиеся"""
+        to_send, suppressed = await self.on_track.split(reminders, current_time)
+        if suppressed:
+            await db_manager.mark_reminders_suppressed([reminder.id for reminder, _ in suppressed])
+            self._claimed.difference_update(reminder.id for reminder, _ in suppressed)
+            for _, reason in suppressed:
+                metrics.inc('water_reminders_suppressed_total', reason=reason)
+        return to_send
+    
+    async def _archive_loop(self):
+        """Фоновый перенос завершенных напоминаний в архив"""
+        while self.running:
+            try:
+                await self.archive_finished_reminders()
+            except Exception as e:
+                print(f"Ошибка архивации напоминаний: {e}")
+            
+            await asyncio.sleep(settings.REMINDER_ARCHIVE_INTERVAL_MINUTES * 60)
+    
+    async def archive_finished_reminders(self) -> int:
+        """Перенести завершенные и устаревшие напоминания в архив небольшими пачками"""
+        stale_before = datetime.now() - timedelta(hours=settings.REMINDER_STALE_HOURS)
+        batch_size = settings.REMINDER_ARCHIVE_BATCH_SIZE
+        total = 0
+        
+        while True:
+            moved = await db_manager.archive_reminders_batch(stale_before, batch_size)
+            total += moved
+            if moved < batch_size:
+                break
+            # Отдаем управление, чтобы не задерживать обработку пользователей
+            await asyncio.sleep(0)
+        
+        return total
     
     async def _process_reminder(self, reminder):
         """Обработать одно напоминание"""
@@ -64,7 +216,15 @@ class ReminderScheduler:
         
         # Отправляем напоминание (это будет реализовано в handlers)
         from src.handlers import send_reminder_message
-        await send_reminder_message(user_id, reminder_id, reminder_type)
+        sent = await send_reminder_message(user_id, reminder_id, reminder_type)
+        metrics.inc('water_reminders_sent_total', result='ok' if sent else 'error')
+        if sent:
+            if reminder.scheduled_time:
+                lag = (datetime.now() - reminder.scheduled_time).total_seconds()
+                metrics.observe('water_reminder_lag_seconds', lag, buckets=LAG_BUCKETS)
+            
+            # Ждем ответа пользователя, чтобы при его отсутствии напомнить повторно
+            self.follow_ups.track(reminder_id, user_id, attempt_number)
     
     async def schedule_daily_reminders(self, user_id: int):
         """Запланировать ежедневные напоминания для пользователя"""
@@ -91,17 +251,7 @@ class ReminderScheduler:
     
     async def _clear_user_reminders(self, user_id: int):
         """Удалить все напоминания пользователя"""
-        def _clear_reminders():
-            import sqlite3
-            with sqlite3.connect(db_manager.db_path) as conn:
-                conn.execute(
-                    "DELETE FROM reminders WHERE user_id = ? AND status = 'pending'",
-                    (user_id,)
-                )
-                conn.commit()
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _clear_reminders)
+        await db_manager.delete_pending_reminders(user_id)
     
     async def create_follow_up_reminder(self, user_id: int, original_reminder_id: int):
         """Создать повторное напоминание"""
@@ -119,24 +269,7 @@ class ReminderScheduler:
     
     async def postpone_reminder(self, reminder_id: int, minutes: int = 10):
         """Отложить напоминание на указанное количество минут"""
-        def _postpone():
-            import sqlite3
-            with sqlite3.connect(db_manager.db_path) as conn:
-                # Получаем текущее время напоминания
-                cursor = conn.execute(
-                    "SELECT scheduled_time FROM reminders WHERE id = ?", (reminder_id,)
-                )
-                row = cursor.fetchone()
-                if row:
-                    new_time = datetime.fromisoformat(row[0]) + timedelta(minutes=minutes)
-                    conn.execute(
-                        "UPDATE reminders SET scheduled_time = ? WHERE id = ?",
-                        (new_time, reminder_id)
-                    )
-                    conn.commit()
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _postpone)
+        await db_manager.postpone_reminder(reminder_id, minutes)
     
     def get_reminder_schedule(self) -> List[time]:
         """Получить расписание напоминаний на день"""
@@ -167,11 +300,17 @@ class ReminderScheduler:
             return
         
         # Создаем расписание напоминаний
+        today = date.today()
         schedule = self._create_reminder_schedule(start_hour, end_hour)
         
+        # Убираем слоты, на которые пользователь почти никогда не отвечает
+        slot_stats = await db_manager.get_reminder_slot_stats(user_id)
+        selected = self.select_converting_slots(schedule, slot_stats, today)
+        if len(selected) < len(schedule):
+            metrics.inc('water_reminder_slots_skipped_total', len(schedule) - len(selected))
+        schedule = selected
+        
         # Создаем напоминания в базе данных
-        from datetime import datetime, date
-        today = date.today()
         
         for reminder_time in schedule:
             # Конвертируем time в datetime для сегодняшнего дня
@@ -183,19 +322,36 @@ class ReminderScheduler:
                 reminder_type='water_reminder'
             )
     
+    def select_converting_slots(self, schedule: List[time], slot_stats: Dict[int, tuple], day: date) -> List[time]:
+        """Слоты расписания без тех, что плохо конвертируются в прием воды
+        
+        Слот пропускается, если отправлен хотя бы SLOT_MIN_SENT раз и доля
+        ответов ниже SLOT_MIN_CONVERSION. Первый слот дня остается всегда, а
+        раз в SLOT_PROBE_EVERY_DAYS дней планируются все слоты, чтобы их
+        статистика обновлялась.
+        """
+        if day.toordinal() % settings.SLOT_PROBE_EVERY_DAYS == 0:
+            return schedule
+        
+        selected = []
+        for index, slot_time in enumerate(schedule):
+            sent, converted = slot_stats.get(slot_time.hour * 60 + slot_time.minute, (0, 0))
+            low = sent >= settings.SLOT_MIN_SENT and converted < sent * settings.SLOT_MIN_CONVERSION
+            if index == 0 or not low:
+                selected.append(slot_time)
+        return selected
+    
+    async def snooze_reminder(self, user_id: int, reminder_id: int, minutes: int = None):
+        """Напомнить еще раз через minutes минут вместо повторных напоминаний"""
+        self.follow_ups.acknowledge(reminder_id)
+        minutes = minutes or settings.REMINDER_POSTPONE_MINUTES
+        await db_manager.create_reminder(user_id, datetime.now() + timedelta(minutes=minutes), 'postponed')
+    
     async def cancel_user_reminders(self, user_id: int):
         """Отменить все напоминания пользователя"""
-        def _cancel_reminders():
-            import sqlite3
-            with sqlite3.connect(db_manager.db_path) as conn:
-                conn.execute(
-                    "DELETE FROM reminders WHERE user_id = ? AND status = 'pending'",
-                    (user_id,)
-                )
-                conn.commit()
-        
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _cancel_reminders)
+        self.follow_ups.acknowledge_user(user_id)
+        
+        await db_manager.delete_pending_reminders(user_id)
     
     def _create_reminder_schedule(self, start_hour: int, end_hour: int) -> List[time]:
         """Создать расписание напоминаний для пользователя"""
@@ -207,6 +363,8 @@ class ReminderScheduler:
             schedule.append(current_time)
             # Добавляем интервал
             total_minutes = current_time.hour * 60 + current_time.minute + settings.REMINDER_INTERVAL_MINUTES
+            if total_minutes >= 24 * 60:
+                break  # Следующее напоминание выпало бы на завтра
             hours = total_minutes // 60
             minutes = total_minutes % 60
             current_time = time(hours, minutes)
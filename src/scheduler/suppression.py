@@ -0,0 +1,83 @@
+"""
+Подавление напоминаний для пользователей, которые и так на графике
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from config import settings
+from src.database import db_manager, intake_buffer
+from src.database.models import Reminder
+
+# Напоминания, которые можно не отправлять: утреннее задает начало дня,
+# а отложенное пользователь попросил сам
+SUPPRESSIBLE_TYPES = ('regular', 'water_reminder', 'follow_up')
+
+
+class OnTrackFilter:
+    """Фильтр пачки наступивших напоминаний перед отправкой
+
+    Прогресс всей пачки берется одним запросом, а итоги из буфера приемов
+    (еще не записанные в БД) имеют приоритет. Напоминание подавляется, если
+    пользователь уже выполнил норму или опережает равномерный график по
+    своему окну напоминаний на REMINDER_AHEAD_MARGIN_ML. Несколько
+    напоминаний одного пользователя в пачке сливаются в одно.
+    """
+
+    def expected_intake(self, goal: int, start_hour: int, end_hour: int, now: datetime) -> float:
+        """Сколько воды пользователь выпил бы к now при равномерном графике"""
+        window_start = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        window = (end_hour - start_hour) * 3600
+        elapsed = (now - window_start).total_seconds()
+        return goal * min(max(elapsed / window, 0.0), 1.0) if window > 0 else goal
+
+    def classify(self, reminder: Reminder, progress: tuple, now: datetime) -> str:
+        """Причина подавления напоминания или пустая строка, если его нужно отправить"""
+        if reminder.reminder_type not in SUPPRESSIBLE_TYPES or progress is None:
+            return ""
+
+        goal, total, start_hour, end_hour = progress
+        if total >= goal:
+            return "goal_reached"
+        if total - self.expected_intake(goal, start_hour, end_hour, now) >= settings.REMINDER_AHEAD_MARGIN_ML:
+            return "ahead"
+        return ""
+
+    async def split(self, reminders: List[Reminder], now: datetime) -> Tuple[List[Reminder], List[Tuple[Reminder, str]]]:
+        """Разделить пачку на напоминания к отправке и подавленные (с причиной)"""
+        if not settings.REMINDER_SUPPRESSION_ENABLED or not reminders:
+            return reminders, []
+
+        # Из нескольких напоминаний пользователя в пачке отправляем одно:
+        # неподавляемое (утреннее, отложенное), иначе самое позднее
+        def priority(item: Reminder):
+            return item.reminder_type not in SUPPRESSIBLE_TYPES, item.scheduled_time or now
+
+        latest: Dict[int, Reminder] = {}
+        suppressed = []
+        for reminder in reminders:
+            current = latest.get(reminder.user_id)
+            if current is None:
+                latest[reminder.user_id] = reminder
+                continue
+            dropped, kept = sorted((current, reminder), key=priority)
+            latest[reminder.user_id] = kept
+            suppressed.append((dropped, "merged"))
+
+        # Время приемов хранится в UTC, итоги в буфере - по дате UTC
+        today = datetime.utcnow().date()
+        progress = await db_manager.get_daily_progress(list(latest), today)
+        for user_id, (goal, total, start_hour, end_hour) in progress.items():
+            buffered = intake_buffer.totals.get((user_id, today))
+            if buffered is not None:
+                progress[user_id] = (goal, buffered, start_hour, end_hour)
+
+        to_send = []
+        for user_id, reminder in latest.items():
+            reason = self.classify(reminder, progress.get(user_id), now)
+            if reason:
+                suppressed.append((reminder, reason))
+            else:
+                to_send.append(reminder)
+
+        to_send.sort(key=lambda item: item.scheduled_time or now)
+        return to_send, suppressed
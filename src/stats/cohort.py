@@ -0,0 +1,241 @@
+"""
+Когортная аналитика по истории приемов воды (NumPy)
+
+История загружается из хранилища пачками в колонки NumPy, после чего все
+показатели считаются векторными проходами по всем пользователям сразу:
+доля достигших нормы по дням, распределение серий дней с нормой,
+гистограмма приемов по часам и конверсия напоминаний в приемы воды.
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Dict, List
+
+from config import settings
+from src.database import Storage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class IntakeColumns:
+    """Приемы воды по колонкам (int64)"""
+    user_ids: Any
+    volumes: Any
+    timestamps: Any  # Секунды Unix, UTC
+    reminder_ids: Any  # 0 - прием без напоминания
+
+
+@dataclass
+class ReminderColumns:
+    """Отправленные напоминания по колонкам (int64)"""
+    ids: Any
+    user_ids: Any
+    scheduled: Any  # Секунды Unix, время по расписанию
+
+
+def _columns(rows: list, width: int):
+    """Пачка строк -> матрица int64 (строка на запись)"""
+    return np.array(rows, dtype=np.int64).reshape(-1, width)
+
+
+async def _load_columns(rows: AsyncIterator[list], width: int):
+    """Пачки строк из хранилища -> матрица int64
+
+    Каждая пачка переводится в массив сразу по прибытии, и список кортежей
+    освобождается: в памяти одновременно только одна пачка Python-объектов,
+    а не вся история. Преобразование идет в потоке, чтобы не блокировать
+    цикл событий.
+    """
+    arrays = []
+    async for chunk in rows:
+        arrays.append(await asyncio.to_thread(_columns, chunk, width))
+        del chunk  # Не держим кортежи пачки, пока ждем следующую
+    if not arrays:
+        return np.empty((0, width), dtype=np.int64)
+    if len(arrays) == 1:
+        return arrays[0]
+    return await asyncio.to_thread(np.concatenate, arrays)
+
+
+class CohortAnalytics:
+    """Показатели по всем пользователям за период
+
+    Дни считаются по UTC, как в get_daily_intake. Для пользователей,
+    которых уже нет в таблице users, норма - DAILY_GOAL_ML.
+    """
+
+    def __init__(self, intake: IntakeColumns, reminders: ReminderColumns, goals):
+        self.intake = intake
+        self.reminders = reminders
+        # goals: матрица (user_id, daily_goal), отсортированная по user_id
+        self.goals = goals
+        self._daily_totals = None
+
+    @classmethod
+    async def load(cls, storage: Storage, since: date = None, chunk_size: int = None) -> "CohortAnalytics":
+        """Загрузить историю из хранилища начиная с даты since"""
+        if np is None:
+            raise RuntimeError("Для когортной аналитики нужен пакет numpy")
+
+        intake = await _load_columns(storage.iter_intake_rows(since, chunk_size), 5)
+        reminders = await _load_columns(storage.iter_sent_reminder_rows(since, chunk_size), 3)
+
+        goals = await asyncio.to_thread(_columns, await storage.get_user_goals(), 2)
+        goals = goals[np.argsort(goals[:, 0], kind='stable')] if len(goals) else goals
+
+        return cls(
+            IntakeColumns(intake[:, 1], intake[:, 2], intake[:, 3], intake[:, 4]),
+            ReminderColumns(reminders[:, 0], reminders[:, 1], reminders[:, 2]),
+            goals
+        )
+
+    @property
+    def rows(self) -> int:
+        """Количество загруженных приемов воды"""
+        return len(self.intake.user_ids)
+
+    def _goals_for(self, user_ids):
+        """Нормы для массива user_id"""
+        if not len(self.goals):
+            return np.full(len(user_ids), settings.DAILY_GOAL_ML)
+        goal_ids, goal_values = self.goals[:, 0], self.goals[:, 1]
+        index = np.minimum(np.searchsorted(goal_ids, user_ids), len(goal_ids) - 1)
+        return np.where(goal_ids[index] == user_ids, goal_values[index], settings.DAILY_GOAL_ML)
+
+    def daily_totals(self):
+        """Объем за каждый день каждого пользователя: (user_ids, days, totals), по возрастанию (user, day)"""
+        if self._daily_totals is None:
+            self._daily_totals = self._compute_daily_totals()
+        return self._daily_totals
+
+    def _compute_daily_totals(self):
+        """Посчитать дневные итоги для daily_totals"""
+        days = self.intake.timestamps // SECONDS_PER_DAY
+        if not len(days):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        # Пара (пользователь, день) -> один ключ int64, суммы - через bincount по обратному индексу
+        first_day = days.min()
+        span = days.max() - first_day + 1
+        keys = self.intake.user_ids * span + (days - first_day)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.intake.volumes).astype(np.int64)
+        return unique_keys // span, unique_keys % span + first_day, totals
+
+    def goal_attainment_by_day(self) -> List[Dict[str, Any]]:
+        """По дням: активные пользователи, достигшие нормы и их доля"""
+        user_ids, days, totals = self.daily_totals()
+        if not len(days):
+            return []
+
+        achieved = totals >= self._goals_for(user_ids)
+        first_day = days.min()
+        offsets = days - first_day
+        active_per_day = np.bincount(offsets)
+        achieved_per_day = np.bincount(offsets, weights=achieved).astype(np.int64)
+
+        result = []
+        for offset in np.flatnonzero(active_per_day):
+            active, reached = int(active_per_day[offset]), int(achieved_per_day[offset])
+            result.append({
+                'date': (date(1970, 1, 1) + timedelta(days=int(first_day + offset))).isoformat(),
+                'active': active,
+                'achieved': reached,
+                'rate': reached / active
+            })
+        return result
+
+    def streak_distribution(self) -> Dict[int, int]:
+        """Самая длинная серия дней подряд с выполненной нормой -> сколько пользователей с такой серией"""
+        user_ids, days, totals = self.daily_totals()
+        achieved = totals >= self._goals_for(user_ids)
+        user_ids, days = user_ids[achieved], days[achieved]
+        if not len(days):
+            return {}
+
+        # Дни уже отсортированы по (пользователь, день): серия рвется при смене
+        # пользователя или пропуске дня
+        breaks = np.ones(len(days), dtype=bool)
+        breaks[1:] = (user_ids[1:] != user_ids[:-1]) | (days[1:] != days[:-1] + 1)
+        run_ids = np.cumsum(breaks) - 1
+        run_lengths = np.bincount(run_ids)
+        run_users = user_ids[breaks]
+
+        # Самая длинная серия каждого пользователя: серии тоже идут по пользователям
+        user_starts = np.flatnonzero(np.r_[True, run_users[1:] != run_users[:-1]])
+        longest = np.maximum.reduceat(run_lengths, user_starts)
+
+        lengths, counts = np.unique(longest, return_counts=True)
+        return {int(length): int(count) for length, count in zip(lengths, counts)}
+
+    def intake_by_hour(self) -> Dict[str, Any]:
+        """Количество и объем приемов по часам UTC (списки из 24 значений)"""
+        hours = (self.intake.timestamps % SECONDS_PER_DAY) // 3600
+        return {
+            'count': np.bincount(hours, minlength=24).tolist(),
+            'volume': np.bincount(hours, weights=self.intake.volumes, minlength=24).astype(np.int64).tolist()
+        }
+
+    def reminder_conversion(self) -> Dict[str, Any]:
+        """Доля отправленных напоминаний, после которых записан прием воды, всего и по часам расписания"""
+        sent = len(self.reminders.ids)
+        converted = np.isin(self.reminders.ids, self.intake.reminder_ids[self.intake.reminder_ids > 0])
+        hours = (self.reminders.scheduled % SECONDS_PER_DAY) // 3600
+        sent_by_hour = np.bincount(hours, minlength=24)
+        converted_by_hour = np.bincount(hours, weights=converted, minlength=24).astype(np.int64)
+        return {
+            'sent': sent,
+            'converted': int(converted.sum()),
+            'rate': float(converted.sum()) / sent if sent else 0.0,
+            'sent_by_hour': sent_by_hour.tolist(),
+            'converted_by_hour': converted_by_hour.tolist()
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Все показатели одним словарем"""
+        return {
+            'rows': self.rows,
+            'users': int(len(np.unique(self.intake.user_ids))),
+            'goal_attainment': self.goal_attainment_by_day(),
+            'streaks': self.streak_distribution(),
+            'intake_by_hour': self.intake_by_hour(),
+            'reminder_conversion': self.reminder_conversion()
+        }
+
+
+def format_report(report: Dict[str, Any], days: int) -> str:
+    """Краткий текстовый отчет для администратора"""
+    lines = [
+        f"📊 *Когорта за {days} дн.*",
+        f"Приемов: {report['rows']}, пользователей: {report['users']}",
+        "",
+        "*Норма по дням (достигли / активны):*"
+    ]
+    for day in report['goal_attainment'][-7:]:
+        lines.append(f"{day['date']}: {day['achieved']}/{day['active']} ({day['rate']:.0%})")
+
+    streaks = report['streaks']
+    if streaks:
+        total = sum(streaks.values())
+        lines += ["", "*Лучшая серия дней с нормой:*"]
+        for label, low, high in (("1", 1, 1), ("2-3", 2, 3), ("4-7", 4, 7), ("8-30", 8, 30), ("31+", 31, None)):
+            count = sum(c for length, c in streaks.items() if length >= low and (high is None or length <= high))
+            lines.append(f"{label} дн.: {count} ({count / total:.0%})")
+
+    counts = report['intake_by_hour']['count']
+    top_hours = sorted(range(24), key=lambda hour: counts[hour], reverse=True)[:3]
+    lines += ["", "*Пиковые часы (UTC):* " + ", ".join(f"{hour:02d}:00" for hour in top_hours if counts[hour])]
+
+    conversion = report['reminder_conversion']
+    lines += [
+        "",
+        f"*Конверсия напоминаний:* {conversion['converted']}/{conversion['sent']} ({conversion['rate']:.0%})"
+    ]
+    return "\n".join(lines)
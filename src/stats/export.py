@@ -0,0 +1,66 @@
+"""
+Выгрузка истории приемов воды в CSV и JSON
+"""
+import csv
+import json
+import os
+import tempfile
+from datetime import date
+from typing import AsyncIterator
+
+from src.database import WaterIntake
+
+EXPORT_FORMATS = ("csv", "json")
+
+# Поля выгрузки; время приемов хранится в UTC
+EXPORT_FIELDS = ("timestamp_utc", "volume_ml", "reminder_id")
+
+
+def _row(intake: WaterIntake) -> tuple:
+    """Прием воды -> значения полей выгрузки"""
+    return intake.timestamp.strftime('%Y-%m-%d %H:%M:%S'), intake.volume, intake.reminder_id
+
+
+async def write_csv(intakes: AsyncIterator[WaterIntake], file) -> int:
+    """Записать приемы в CSV по мере чтения, вернуть их количество"""
+    writer = csv.writer(file)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    async for intake in intakes:
+        writer.writerow(_row(intake))
+        count += 1
+    return count
+
+
+async def write_json(intakes: AsyncIterator[WaterIntake], file) -> int:
+    """Записать приемы JSON-массивом по мере чтения, вернуть их количество"""
+    file.write("[")
+    count = 0
+    async for intake in intakes:
+        file.write(",\n" if count else "\n")
+        file.write(json.dumps(dict(zip(EXPORT_FIELDS, _row(intake)))))
+        count += 1
+    file.write("\n]\n" if count else "]\n")
+    return count
+
+
+async def export_intake(intakes: AsyncIterator[WaterIntake], export_format: str) -> tuple:
+    """Выгрузить приемы во временный файл, вернуть (путь, количество)
+
+    Файл пишется построчно по мере чтения из БД, так что память не зависит
+    от длины истории. Удалить файл после отправки - задача вызывающего.
+    """
+    writer = write_json if export_format == "json" else write_csv
+    fd, path = tempfile.mkstemp(prefix="water_export_", suffix=f".{export_format}")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as file:
+            count = await writer(intakes, file)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
+
+
+def export_filename(user_id: int, export_format: str) -> str:
+    """Имя файла выгрузки для пользователя"""
+    return f"water_history_{user_id}_{date.today().isoformat()}.{export_format}"
@@ -0,0 +1,85 @@
+"""
+Таблицы для отрисовки статистики
+
+Строки прогресс-баров, статусы и резюме (тексты - из каталога сообщений)
+готовятся один раз при импорте для каждого целого процента 0..100.
+Отрисовка - выбор по индексу без пересчета процентов, цепочек условий и
+склейки символов. Процент считается один раз на обновление (level) и
+передается во все функции.
+"""
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from src.texts import Template, texts
+
+BAR_WIDTH = 10
+LEVELS = range(101)
+
+
+def level(current_ml: int, goal_ml: int) -> int:
+    """Целый процент выполнения нормы (0..100) - индекс в таблицах"""
+    return min(current_ml * 100 // goal_ml, 100) if goal_ml > 0 else 100
+
+
+def _bars(filled: str, empty: str) -> Tuple[str, ...]:
+    """Полоса из BAR_WIDTH символов для каждого целого процента"""
+    return tuple(filled * (value // BAR_WIDTH) + empty * (BAR_WIDTH - value // BAR_WIDTH) for value in LEVELS)
+
+
+# Прогресс за день и график недели
+PROGRESS_BARS = _bars("💧", "⚪")
+WEEKLY_BARS = _bars("█", "░")
+
+# Нижняя граница процента для статусов, от большего к меньшему
+_STATUS_THRESHOLDS = (
+    (100, "goal_achieved"),
+    (75, "almost_there"),
+    (50, "halfway"),
+    (25, "getting_started"),
+    (0, "just_started")
+)
+
+
+def _status(value: int) -> str:
+    for threshold, status in _STATUS_THRESHOLDS:
+        if value >= threshold:
+            return status
+
+
+# Тексты статусов и резюме ({remaining} - сколько мл осталось до цели) - из каталога сообщений
+_STATUS_TEXTS = texts.section('status_texts')
+_SUMMARIES = {status: Template(text) for status, text in texts.section('summaries').items()}
+
+# (status, status_text) и шаблон резюме для каждого целого процента
+STATUS_BY_LEVEL = tuple((_status(value), _STATUS_TEXTS[_status(value)]) for value in LEVELS)
+SUMMARY_BY_LEVEL = tuple(_SUMMARIES[status] for status, _ in STATUS_BY_LEVEL)
+
+# Названия дней по date.weekday()
+WEEKDAY_NAMES = tuple(texts.section('weekdays'))
+
+WEEKLY_CHART_HEADER = texts['weekly_chart_header']
+
+
+def progress_bar(current_ml: int, goal_ml: int, value: int) -> str:
+    """Прогресс-бар за день для процента value"""
+    return f"[{PROGRESS_BARS[value]}] {value}% ({current_ml}/{goal_ml} мл)"
+
+
+def status(value: int) -> Tuple[str, str]:
+    """(status, status_text) для процента value"""
+    return STATUS_BY_LEVEL[value]
+
+
+def summary(current_ml: int, goal_ml: int, value: int) -> str:
+    """Мотивационное резюме для процента value"""
+    return SUMMARY_BY_LEVEL[value].render(remaining=goal_ml - current_ml)
+
+
+def weekly_chart(days: List[Dict[str, Any]], goal_ml: int) -> str:
+    """Текстовый график недели: строка на каждый день с его настоящим днем недели"""
+    lines = [WEEKLY_CHART_HEADER]
+    for day in days:
+        value = level(day['total'], goal_ml)
+        weekday = WEEKDAY_NAMES[date.fromisoformat(day['date']).weekday()]
+        lines.append(f"{weekday}: {WEEKLY_BARS[value]} {value}% ({day['total']}мл)")
+    return "\n".join(lines)
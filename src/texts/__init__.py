@@ -0,0 +1,8 @@
+"""
+Тексты сообщений бота
+"""
+from config import settings
+from .catalog import MessageCatalog, Template, load_catalog
+
+# Каталог сообщений на языке бота (settings.LOCALE)
+texts = load_catalog(settings.LOCALE)
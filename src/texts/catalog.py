@@ -0,0 +1,103 @@
+"""
+Каталоги сообщений и предкомпилированные шаблоны
+"""
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LOCALES_DIR = Path(__file__).parent / "locales"
+DEFAULT_LOCALE = "ru"
+
+
+# Допустимая спецификация формата подстановки ({volume:>5}, {percentage:.1f})
+_FORMAT_SPEC = re.compile(r"[\w<>=^+\- #,.%]*")
+
+
+class Template:
+    """Шаблон сообщения, разобранный при загрузке
+
+    Текст разбирается на постоянные части и подстановки вида {name} или
+    {name:spec} один раз: подстановки проверяются, а render() - метод
+    format нормализованной строки, без промежуточных вызовов в Python.
+    Шаблон без подстановок хранится уже готовой строкой (static).
+    """
+
+    __slots__ = ("source", "static", "fields", "render")
+
+    def __init__(self, source: str):
+        pieces, fields = [], []
+        for text, name, spec, conversion in Formatter().parse(source):
+            pieces.append(text.replace("{", "{{").replace("}", "}}"))
+            if name is None:
+                continue
+            if not name.isidentifier() or conversion or not _FORMAT_SPEC.fullmatch(spec):
+                raise ValueError(f"Неподдерживаемая подстановка {{{name}}} в шаблоне {source[:40]!r}")
+            pieces.append(f"{{{name}:{spec}}}" if spec else f"{{{name}}}")
+            fields.append(name)
+
+        self.source = source
+        self.fields: Tuple[str, ...] = tuple(dict.fromkeys(fields))
+        self.static: Optional[str] = source.format() if not fields else None
+        if self.static is not None:
+            static = self.static
+            self.render: Callable[..., str] = lambda **values: static
+        else:
+            # Только простые имена без индексов, преобразований и вложенных спецификаций
+            self.render = "".join(pieces).format
+
+
+class MessageCatalog:
+    """Сообщения одного языка
+
+    Строки верхнего уровня файла компилируются в шаблоны при загрузке,
+    вложенные разделы (например, motivation) отдаются как есть через
+    section(). Ключи, которых нет в каталоге, берутся из каталога языка
+    по умолчанию.
+    """
+
+    def __init__(self, locale: str, data: Dict[str, Any], fallback: "MessageCatalog" = None):
+        self.locale = locale
+        self._sections: Dict[str, Any] = {}
+        self._templates: Dict[str, Template] = {}
+        if fallback is not None:
+            self._sections.update(fallback._sections)
+            self._templates.update(fallback._templates)
+        for key, value in data.items():
+            if isinstance(value, str):
+                self._templates[key] = Template(value)
+            else:
+                self._sections[key] = value
+
+    def __getitem__(self, key: str) -> str:
+        """Готовый текст статического сообщения"""
+        text = self._templates[key].static
+        if text is None:
+            raise KeyError(f"Сообщение {key!r} содержит подстановки, используйте render()")
+        return text
+
+    def template(self, key: str) -> Template:
+        """Шаблон сообщения"""
+        return self._templates[key]
+
+    def render(self, key: str, **values: Any) -> str:
+        """Отрисовать сообщение по шаблону"""
+        return self._templates[key].render(**values)
+
+    def section(self, key: str) -> Any:
+        """Вложенный раздел каталога (списки и словари строк)"""
+        return self._sections[key]
+
+
+@lru_cache(maxsize=None)
+def load_catalog(locale: str = DEFAULT_LOCALE) -> MessageCatalog:
+    """Загрузить каталог языка из locales/<locale>.json (один раз на процесс)"""
+    path = LOCALES_DIR / f"{locale}.json"
+    if not path.exists():
+        raise ValueError(f"Нет каталога сообщений для языка {locale!r} ({path})")
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    fallback = load_catalog(DEFAULT_LOCALE) if locale != DEFAULT_LOCALE else None
+    return MessageCatalog(locale, data, fallback)